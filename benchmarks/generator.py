@@ -0,0 +1,66 @@
+"""Generates a rashell file shaped like examples/movies.ra with any number of movies.
+
+Every director has fan_out movies on average. With a skew above 0, the directors of the movies follow a Zipf
+distribution: the director of rank i is chosen with a weight of 1 / i ** skew. A few more directors, without any
+movie, can be deleted without breaking the foreign key:
+    python benchmarks/generator.py 1000000 --fan-out 10 --skew 1.0 -o movies_1m.ra
+"""
+import argparse
+import random
+from itertools import accumulate
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family', 'Fantasy',
+          'History', 'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Sport', 'Thriller', 'War',
+          'Western']
+NATIONALITIES = ['US', 'FR', 'UK', 'DZ', 'IT', 'JP', 'KR', 'DE', 'ES', 'IN']
+FIRST_YEAR, LAST_YEAR = 1920, 2024
+# movies generated at once
+CHUNK_SIZE = 100000
+
+SCHEMA = '''Movie(_Code, Title, Genre, Year, #DirectorID)
+  DirectorID references Director.Id
+Director(_Id, Name, Nationality)
+
+'''
+
+
+def director_counts(movies, fan_out):
+    # directors of the movies, and directors without movies added after them
+    referenced_directors = max(movies // max(fan_out, 1), 1)
+    return referenced_directors, max(referenced_directors // 100, 1)
+
+
+def write_movies(file_name, movies, fan_out=10, skew=0.0, seed=0):
+    rng = random.Random(seed)
+    referenced_directors, spare_directors = director_counts(movies, fan_out)
+    cumulative_weights = list(accumulate(1 / rank ** skew for rank in range(1, referenced_directors + 1)))
+    director_ids = range(1, referenced_directors + 1)
+    with open(file_name, 'w') as f:
+        f.write(SCHEMA)
+        for director_id in range(1, referenced_directors + spare_directors + 1):
+            f.write("Director.insert({}, 'Director {}', '{}')\n".format(
+                director_id, director_id, rng.choice(NATIONALITIES)))
+        f.write('\n')
+        for start in range(1, movies + 1, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, movies + 1 - start)
+            chosen_directors = rng.choices(director_ids, cum_weights=cumulative_weights, k=count)
+            f.writelines("Movie.insert({}, 'Movie {}', '{}', {}, {})\n".format(
+                code, code, rng.choice(GENRES), rng.randint(FIRST_YEAR, LAST_YEAR), director_id)
+                for code, director_id in zip(range(start, start + count), chosen_directors))
+    return referenced_directors, spare_directors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates a movies and directors model')
+    parser.add_argument('movies', type=lambda value: int(float(value)), help='number of movies, 1e6 is accepted')
+    parser.add_argument('--fan-out', type=int, default=10, help='movies per director (default: %(default)s)')
+    parser.add_argument('--skew', type=float, default=0.0,
+                        help='Zipf exponent of the directors of the movies, 0 is uniform (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help='rashell file written')
+    arguments = parser.parse_args()
+    write_movies(arguments.output, arguments.movies, arguments.fan_out, arguments.skew, arguments.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Measures the startup time of rashell and checks it against a budget.
+
+Every step is timed in a fresh interpreter, the median of several runs is reported:
+    python benchmarks/startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# milliseconds, from the start of the interpreter to a loaded example model
+STARTUP_BUDGET = 400
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'movies.ra')
+
+STEPS = [
+    ('interpreter', ''),
+    ('import engine', 'import rashell.relational_engine'),
+    ('create engine', 'from rashell.relational_engine import RelationalEngine; e = RelationalEngine()'),
+    ('open example', 'from rashell.relational_engine import RelationalEngine; e = RelationalEngine(); '
+                     'e.open_from_file({!r})'.format(EXAMPLE_FILE)),
+]
+
+TIMED_SCRIPT = '''
+import time
+start = time.perf_counter()
+{}
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def time_step(code, runs):
+    # the interpreter itself is timed from the outside, the other steps from the inside
+    timings = []
+    for _ in range(runs):
+        if code:
+            output = subprocess.run([sys.executable, '-c', TIMED_SCRIPT.format(code)], check=True,
+                                    capture_output=True, text=True).stdout
+            timings.append(float(output))
+        else:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', 'pass'], check=True)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timings = {}
+    for name, code in STEPS:
+        timings[name] = time_step(code, runs)
+        print('{:<15} {:8.1f} ms'.format(name, timings[name]))
+    total = timings['interpreter'] + timings['open example']
+    print('{:<15} {:8.1f} ms (budget {} ms)'.format('total', total, STARTUP_BUDGET))
+    if total > STARTUP_BUDGET:
+        sys.exit('Startup is over budget by {:.1f} ms'.format(total - STARTUP_BUDGET))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Times rashell on generated models of increasing size and compares the results with a baseline.
+
+For each size, a model is generated with generator.py (and kept in --data-dir for the next runs) and measured in a
+fresh interpreter: open_from_file, every relational algebra operation, inserts and deletes checking foreign keys,
+with the peak memory of the process after each step. The startup steps of startup.py are measured as well:
+    python benchmarks/suite.py --sizes 1e3 1e4 1e5 --output baseline.json
+    python benchmarks/suite.py --sizes 1e3 1e4 1e5 --baseline baseline.json --threshold 0.25
+The second command exits with an error if a step is slower (or uses more memory) than in the baseline by more than
+the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from generator import director_counts, write_movies
+from startup import STEPS, time_step
+
+# one query by operation, the products are kept small whatever the size
+QUERIES = {
+    'projection': 'π Genre, Year (Movie)',
+    'restriction': 'σ Year > 2000 AND Genre = "Drama" (Movie)',
+    'aggregation': 'γ DirectorID; count(*), avg(Year) (Movie)',
+    'join': 'Movie ⋈ Director | DirectorID = Id',
+    'semi_join': 'Director ⋉ Movie | Id = DirectorID',
+    'anti_join': 'Director ▷ (σ Year > 2000 (Movie)) | Id = DirectorID',
+    'division': '(π DirectorID, Genre (Movie)) ÷ (π Genre (σ Genre = "Drama" OR Genre = "War" (Movie)))',
+    'union': '(π DirectorID (Movie)) U (π Id (Director))',
+    'intersection': '(π DirectorID (Movie)) ∩ (π Id (Director))',
+    'difference': '(π Id (Director)) - (π DirectorID (Movie))',
+    'cartesian_product': '(π Genre (Movie)) X (σ Id <= 1000 (Director))',
+}
+# movies inserted one command at a time
+INSERTS = 1000
+DEFAULT_SIZES = ['1e3', '1e4', '1e5']
+
+
+def peak_memory():
+    # MiB, None where the resource module is not available
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def timed(function, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(timings), 'peak_memory_mib': peak_memory()}
+
+
+def measure(file_name, referenced_directors, repeat):
+    from rashell.exceptions import ForeignKeyConstaintFailedException
+    from rashell.relational_engine import RelationalEngine
+
+    engine = RelationalEngine()
+    # every query is computed again instead of being read from the cache
+    engine.result_cache.set_memory_limit(0)
+    steps = {'open_from_file': timed(lambda: engine.open_from_file(file_name))}
+
+    for name, query in QUERIES.items():
+        operation = engine.instruction_mm.model_from_str(query).operation_type
+        steps['compute_' + name] = timed(lambda: engine.compute_relational_algebra_operation(operation), repeat)
+
+    first_code = max(t[0] for t in engine.get_relation_by_name('Movie').tuples) + 1
+    commands = ["Movie.insert({}, 'New movie {}', 'Drama', 2024, {})".format(
+        code, code, code % referenced_directors + 1) for code in range(first_code, first_code + INSERTS)]
+    steps['process_insert'] = timed(lambda: [engine.execute(command) for command in commands])
+    steps['process_insert']['rows_per_second'] = INSERTS / steps['process_insert']['seconds']
+
+    def rejected_delete():
+        # directors with movies, the deletion is refused by the foreign key
+        try:
+            engine.execute('Director.delete(Id <= 10)')
+        except ForeignKeyConstaintFailedException:
+            return
+        raise AssertionError('the foreign key of Movie did not prevent the deletion')
+
+    steps['delete_rejected'] = timed(rejected_delete, repeat)
+    # the directors without movies
+    steps['delete'] = timed(lambda: engine.execute('Director.delete(Id > {})'.format(referenced_directors)))
+    return steps
+
+
+def measure_size(movies, arguments):
+    # every size is measured in a new process, its peak memory is not raised by the previous sizes
+    file_name = os.path.join(arguments.data_dir, 'movies_{}_{}_{}_{}.ra'.format(
+        movies, arguments.fan_out, arguments.skew, arguments.seed))
+    referenced_directors, _ = director_counts(movies, arguments.fan_out)
+    if not os.path.exists(file_name):
+        os.makedirs(arguments.data_dir, exist_ok=True)
+        write_movies(file_name + '.tmp', movies, arguments.fan_out, arguments.skew, arguments.seed)
+        os.replace(file_name + '.tmp', file_name)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', file_name,
+                             '--referenced-directors', str(referenced_directors), '--repeat', str(arguments.repeat)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def regressions(results, baseline, threshold, minimum_seconds):
+    # steps slower or using more memory than in the baseline by more than threshold (a fraction), timings differing
+    # by less than minimum_seconds are noise
+    found = []
+    sections = [('startup', results['startup'], baseline.get('startup', {}))] + [
+        ('{} rows'.format(size), steps, baseline.get('sizes', {}).get(size, {})) for
+        size, steps in results['sizes'].items()]
+    for section, steps, baseline_steps in sections:
+        for step, metrics in steps.items():
+            baseline_metrics = baseline_steps.get(step)
+            if not baseline_metrics:
+                continue
+            seconds, baseline_seconds = metrics['seconds'], baseline_metrics['seconds']
+            if seconds > baseline_seconds * (1 + threshold) and seconds - baseline_seconds >= minimum_seconds:
+                found.append('{} {}: {:.1f} ms instead of {:.1f} ms'.format(
+                    section, step, seconds * 1000, baseline_seconds * 1000))
+            memory, baseline_memory = metrics.get('peak_memory_mib'), baseline_metrics.get('peak_memory_mib')
+            if memory and baseline_memory and memory > baseline_memory * (1 + threshold):
+                found.append('{} {}: {:.1f} MiB instead of {:.1f} MiB'.format(section, step, memory, baseline_memory))
+    return found
+
+
+def print_steps(section, steps):
+    for step, metrics in steps.items():
+        memory = metrics.get('peak_memory_mib')
+        print('{:<12} {:<26} {:10.1f} ms {}'.format(section, step, metrics['seconds'] * 1000,
+                                                    '' if memory is None else '{:8.1f} MiB'.format(memory)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks rashell on generated models')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='numbers of movies, from 1e3 to 1e7 (default: %(default)s)')
+    parser.add_argument('--fan-out', type=int, default=10, help='movies per director (default: %(default)s)')
+    parser.add_argument('--skew', type=float, default=0.0,
+                        help='Zipf exponent of the directors of the movies (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of each query, the median is kept (default: %(default)s)')
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'rashell-benchmarks'),
+                        help='directory of the generated models (default: %(default)s)')
+    parser.add_argument('--output', help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON file of previous results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='slowdown or memory increase reported as a regression (default: %(default)s)')
+    parser.add_argument('--minimum-seconds', type=float, default=0.005,
+                        help='smallest slowdown reported as a regression (default: %(default)s)')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--referenced-directors', type=int, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.measure:
+        json.dump(measure(arguments.measure, arguments.referenced_directors, arguments.repeat), sys.stdout)
+        return
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'generator': {'fan_out': arguments.fan_out, 'skew': arguments.skew, 'seed': arguments.seed},
+        'startup': {name: {'seconds': time_step(code, arguments.startup_runs) / 1000} for name, code in STEPS},
+        'sizes': {},
+    }
+    print_steps('startup', results['startup'])
+    for size in arguments.sizes:
+        movies = int(float(size))
+        results['sizes'][str(movies)] = measure_size(movies, arguments)
+        print_steps('{} rows'.format(movies), results['sizes'][str(movies)])
+
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            found = regressions(results, json.load(f), arguments.threshold, arguments.minimum_seconds)
+        if found:
+            sys.exit('Regressions:\n' + '\n'.join(found))
+        print('No regression against {}'.format(arguments.baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import marshal
+import tempfile
+
+from rashell.join_algorithms import value_sort_key
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+# groups held in memory before their partial aggregates are written to partitions on disk
+MAXIMUM_GROUPS = 1 << 20
+PARTITION_COUNT = 16
+# partitions still holding too many groups are partitioned again, at most that many times
+MAXIMUM_LEVEL = 4
+MARSHAL_VERSION = 4
+
+
+def is_number(value):
+    return type(value) in (int, float)
+
+
+def smallest(state, value):
+    return value if state is None or value_sort_key(value) < value_sort_key(state) else state
+
+
+def largest(state, value):
+    return value if state is None or value_sort_key(value) > value_sort_key(state) else state
+
+
+# every aggregate of a group is computed in a partial state: its initial value, how a value of a tuple is
+# accumulated in it, how two partial states of the same group are merged, and the final value of the state.
+# sum and avg ignore the values that are not numbers
+INITIAL_STATES = {'count': 0, 'sum': 0, 'min': None, 'max': None, 'avg': (0, 0)}
+ACCUMULATORS = {
+    'count': lambda state, value: state + 1,
+    'sum': lambda state, value: state + value if is_number(value) else state,
+    'min': smallest,
+    'max': largest,
+    'avg': lambda state, value: (state[0] + value, state[1] + 1) if is_number(value) else state,
+}
+MERGERS = {
+    'count': lambda state, other_state: state + other_state,
+    'sum': lambda state, other_state: state + other_state,
+    'min': lambda state, other_state: state if other_state is None else smallest(state, other_state),
+    'max': lambda state, other_state: state if other_state is None else largest(state, other_state),
+    'avg': lambda state, other_state: (state[0] + other_state[0], state[1] + other_state[1]),
+}
+FINALIZERS = {
+    'avg': lambda state: state[0] / state[1] if state[1] else None,
+}
+
+
+def aggregate_name(function, attribute_name):
+    return f'{function}_{attribute_name}' if attribute_name else function
+
+
+def format_aggregate(function, attribute_name):
+    return f'{function}({attribute_name or "*"})'
+
+
+def final_tuples(groups, functions):
+    finalizers = [FINALIZERS.get(function) for function in functions]
+    for key, states in groups.items():
+        yield key + tuple(finalizer(state) if finalizer else state for finalizer, state in zip(finalizers, states))
+
+
+def aggregate_group(key, tuples, aggregates):
+    # the aggregated tuple of a single group
+    groups = {key: [INITIAL_STATES[function] for function, _ in aggregates]}
+    accumulate(groups, tuples, lambda t: key, aggregates)
+    return next(final_tuples(groups, [function for function, _ in aggregates]))
+
+
+def accumulate(groups, tuples, group_key, aggregates, maximum_groups=None, partitions=None):
+    # accumulates tuples in the states of their group. Once groups holds maximum_groups groups, the partial states
+    # are written to partitions and accumulated again from scratch. Returns the partitions (None if not written)
+    accumulators = [(ACCUMULATORS[function], position) for function, position in aggregates]
+    initial_states = [INITIAL_STATES[function] for function, _ in aggregates]
+    for t in tuples:
+        key = group_key(t)
+        states = groups.get(key)
+        if states is None:
+            if maximum_groups is not None and len(groups) >= maximum_groups:
+                partitions = spill(groups, partitions, 0)
+            states = groups[key] = list(initial_states)
+        for index, (accumulator, position) in enumerate(accumulators):
+            states[index] = accumulator(states[index], None if position is None else t[position])
+    return partitions
+
+
+def spill(groups, partitions, level):
+    # partial states are partitioned by the hash of their group, all the states of a group end in one partition
+    if partitions is None:
+        partitions = [tempfile.TemporaryFile() for _ in range(PARTITION_COUNT)]
+    chunks = [[] for _ in partitions]
+    for key, states in groups.items():
+        chunks[hash((level, key)) % PARTITION_COUNT].append((key, states))
+    for partition, chunk in zip(partitions, chunks):
+        if chunk:
+            marshal.dump(chunk, partition, MARSHAL_VERSION)
+    groups.clear()
+    return partitions
+
+
+def read_chunks(partition):
+    partition.seek(0)
+    while True:
+        try:
+            yield from marshal.load(partition)
+        except EOFError:
+            return
+
+
+def merged_partitions(partitions, functions, maximum_groups, level):
+    # each partition holds whole groups, their partial states are merged one partition at a time
+    mergers = [MERGERS[function] for function in functions]
+    try:
+        for partition in partitions:
+            groups = {}
+            spilled_partitions = None
+            for key, states in read_chunks(partition):
+                current_states = groups.get(key)
+                if current_states is None:
+                    if len(groups) >= maximum_groups and level < MAXIMUM_LEVEL:
+                        spilled_partitions = spill(groups, spilled_partitions, level)
+                    groups[key] = states
+                else:
+                    for index, merger in enumerate(mergers):
+                        current_states[index] = merger(current_states[index], states[index])
+            partition.close()
+            if spilled_partitions is None:
+                yield from final_tuples(groups, functions)
+            else:
+                spill(groups, spilled_partitions, level)
+                yield from merged_partitions(spilled_partitions, functions, maximum_groups, level + 1)
+    finally:
+        for partition in partitions:
+            partition.close()
+
+
+def hash_aggregate(tuples, group_positions, aggregates, maximum_groups=MAXIMUM_GROUPS):
+    # single pass over tuples keeping the partial states of every group in a hash table, see accumulate.
+    # aggregates are pairs of a function and the position of its attribute (None for count(*))
+    functions = [function for function, _ in aggregates]
+    groups = {}
+    partitions = accumulate(groups, tuples, lambda t: tuple(t[position] for position in group_positions),
+                            aggregates, maximum_groups)
+    if partitions is None:
+        if not groups and not group_positions:
+            # the aggregates of an empty relation without grouping are a single tuple
+            groups[()] = [INITIAL_STATES[function] for function in functions]
+        yield from final_tuples(groups, functions)
+        return
+    spill(groups, partitions, 0)
+    yield from merged_partitions(partitions, functions, maximum_groups, 1)
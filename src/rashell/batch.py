@@ -0,0 +1,69 @@
+import re
+from itertools import groupby
+from operator import itemgetter
+
+from rashell.program_scanner import scan_insert, CHUNK_SIZE
+
+# a relation definition, the only command starting with a name followed by a parenthesis
+DEFINITION_PATTERN = re.compile(r'\s*[^\d\W]\w*\s*\(')
+
+
+def command_lines(commands=None, file_name=None, stream=None):
+    # lines of commands given with -c, read from a script or from a stream, the stream is read line by line
+    if commands is not None:
+        return commands.splitlines()
+    if file_name is not None:
+        with open(file_name) as f:
+            return f.read().splitlines()
+    return (line.rstrip('\n') for line in stream)
+
+
+def command_blocks(lines):
+    # yields the commands as (first line, text). A command goes on over the indented lines after it, and the
+    # relation definitions following each other, blank lines between them included, are a single model as in a
+    # file opened with open_from_file: their foreign keys can reference each other
+    first_line, block_lines, is_definition = None, [], False
+    for line_number, text in enumerate(lines, start=1):
+        if block_lines and (is_definition and (not text.strip() or DEFINITION_PATTERN.match(text)) or
+                            text[:1].isspace() and text.strip() and not scan_insert(text)):
+            block_lines.append(text)
+            continue
+        if block_lines:
+            yield first_line, '\n'.join(block_lines)
+        first_line, block_lines, is_definition = line_number, [text], bool(DEFINITION_PATTERN.match(text))
+    if block_lines:
+        yield first_line, '\n'.join(block_lines)
+
+
+def run_batch(engine, lines):
+    # runs the commands of command_blocks and stops at the first error. Consecutive single-line inserts are read
+    # by program_scanner and checked and added together as in a file opened with open_from_file, the other commands
+    # are parsed one by one with the grammar of the shell
+    inserts = []
+    try:
+        for line_number, text in command_blocks(lines):
+            insert = scan_insert(text)
+            if insert:
+                inserts.append((line_number,) + insert)
+                if len(inserts) < CHUNK_SIZE:
+                    continue
+            elif not text.strip():
+                continue
+            inserts, pending_inserts = [], inserts
+            insert_rows(engine, pending_inserts)
+            if insert:
+                continue
+            if text.strip() == '.exit':
+                return
+            engine.execute(text, line_number)
+    finally:
+        insert_rows(engine, inserts)
+
+
+def insert_rows(engine, inserts):
+    try:
+        for relation_name, relation_inserts in groupby(inserts, key=itemgetter(1)):
+            engine.insert_rows(relation_name, [(line, insert_type, values) for
+                                               line, _, insert_type, values in relation_inserts])
+    finally:
+        engine.commit_journal()
@@ -0,0 +1,213 @@
+import math
+from collections import Counter
+
+from rashell.join_algorithms import value_sort_key
+
+HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+class DistinctValueSketch:
+    # HyperLogLog sketch with 2^10 registers (about 3% standard error), values are mixed with the splitmix64
+    # finalizer because python hashes of small integers are the integers themselves
+    def __init__(self):
+        self.registers = bytearray(1 << 10)
+
+    def add(self, value):
+        h = (hash(value) + 0x9E3779B97F4A7C15) & HASH_MASK
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+        h ^= h >> 31
+        register = h >> 54
+        rank = 55 - (h & 0x3FFFFFFFFFFFFF).bit_length()
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def add_many(self, values):
+        registers = self.registers
+        for value in values:
+            h = (hash(value) + 0x9E3779B97F4A7C15) & HASH_MASK
+            h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+            h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+            h ^= h >> 31
+            register = h >> 54
+            rank = 55 - (h & 0x3FFFFFFFFFFFFF).bit_length()
+            if rank > registers[register]:
+                registers[register] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class AttributeStatistics:
+    def __init__(self):
+        self.null_count = 0
+        self.type_counts = Counter()
+        self.minimum = None
+        self.maximum = None
+        self.bounds_stale = False
+        self.sketch = DistinctValueSketch()
+        self.sketch_stale = False
+
+    def add(self, value):
+        if value is None:
+            self.null_count += 1
+            return
+        value_type = type(value)
+        self.type_counts[value_type.__name__] += 1
+        self.sketch.add(value)
+        if self.minimum is None:
+            self.minimum = self.maximum = value
+        elif value_type is type(self.minimum) and value_type is type(self.maximum):
+            if value < self.minimum:
+                self.minimum = value
+            elif value > self.maximum:
+                self.maximum = value
+        else:
+            if value_sort_key(value) < value_sort_key(self.minimum):
+                self.minimum = value
+            if value_sort_key(value) > value_sort_key(self.maximum):
+                self.maximum = value
+
+    def add_many(self, values):
+        values = list(values)
+        number_of_values = len(values)
+        values = [value for value in values if value is not None]
+        self.null_count += number_of_values - len(values)
+        if not values:
+            return
+        self.type_counts.update(type(value).__name__ for value in values)
+        self.sketch.add_many(values)
+        if self.minimum is not None:
+            values.extend((self.minimum, self.maximum))
+        try:
+            self.minimum, self.maximum = min(values), max(values)
+        except TypeError:
+            self.minimum, self.maximum = min(values, key=value_sort_key), max(values, key=value_sort_key)
+
+    def state(self):
+        # hashes of strings change from one process to another, their sketch has to be rebuilt
+        registers = bytes(self.sketch.registers) if set(self.type_counts) <= {'int', 'float'} else None
+        return self.null_count, dict(self.type_counts), self.minimum, self.maximum, registers
+
+    def restore(self, state):
+        self.null_count, type_counts, self.minimum, self.maximum, registers = state
+        self.type_counts = Counter(type_counts)
+        if registers is None:
+            self.sketch_stale = True
+        else:
+            self.sketch.registers = bytearray(registers)
+
+    def remove(self, value):
+        if value is None:
+            self.null_count -= 1
+            return
+        type_name = type(value).__name__
+        self.type_counts[type_name] -= 1
+        if not self.type_counts[type_name]:
+            del self.type_counts[type_name]
+        if value == self.minimum or value == self.maximum:
+            self.bounds_stale = True
+
+
+class RelationStatistics:
+    # the distinct value sketches cannot forget values, they are rebuilt once enough tuples were deleted
+    stale_deletion_ratio = 0.1
+
+    def __init__(self, relation):
+        self.relation = relation
+        self.rebuild()
+
+    def rebuild(self):
+        self.attributes = {a.name: AttributeStatistics() for a in self.relation.attributes}
+        self.deletions = 0
+        if not self.relation.is_loaded:
+            # statistics saved in a snapshot are restored without reading the tuples
+            if self.relation.tuple_source.statistics:
+                self.restore(self.relation.tuple_source.statistics)
+        elif self.relation.tuples:
+            self.add_columns(self.relation.columns())
+
+    def state(self):
+        self.refresh()
+        return [attribute_statistics.state() for attribute_statistics in self.attributes.values()]
+
+    def restore(self, state):
+        for attribute_statistics, attribute_state in zip(self.attributes.values(), state):
+            attribute_statistics.restore(attribute_state)
+
+    @property
+    def row_count(self):
+        return len(self.relation.tuples)
+
+    def add_many(self, tuples):
+        self.add_columns(zip(*tuples))
+
+    def add_columns(self, columns):
+        for attribute_statistics, values in zip(self.attributes.values(), columns):
+            attribute_statistics.add_many(values)
+
+    def remove(self, tuples):
+        for t in tuples:
+            for attribute_statistics, value in zip(self.attributes.values(), t):
+                attribute_statistics.remove(value)
+        self.deletions += len(tuples)
+
+    def refresh(self):
+        if self.deletions > self.stale_deletion_ratio * self.row_count or any(
+                attribute_statistics.bounds_stale or attribute_statistics.sketch_stale for attribute_statistics in
+                self.attributes.values()):
+            self.rebuild()
+
+    def distinct_values(self, attribute_name):
+        if attribute_name in self.relation.value_indexes:
+            return len(self.relation.value_indexes[attribute_name])
+        if self.relation.pk_positions == (self.relation.attribute_position(attribute_name),):
+            return self.row_count
+        self.refresh()
+        return min(self.attributes[attribute_name].sketch.estimate(), self.row_count)
+
+    def attribute(self, attribute_name):
+        self.refresh()
+        return self.attributes[attribute_name]
+
+
+class Catalog:
+    def __init__(self, columnar=False):
+        self.relations_by_name = {}
+        self.columnar = columnar
+
+    def __iter__(self):
+        return iter(list(self.relations_by_name.values()))
+
+    def __len__(self):
+        return len(self.relations_by_name)
+
+    def __contains__(self, name):
+        return name in self.relations_by_name
+
+    def get(self, name):
+        return self.relations_by_name.get(name)
+
+    def add(self, relation):
+        self.relations_by_name[relation.name] = relation
+        relation.set_columnar(self.columnar)
+        relation.statistics = RelationStatistics(relation)
+
+    def set_columnar(self, columnar):
+        self.columnar = columnar
+        for relation in self:
+            relation.set_columnar(columnar)
+
+    def update(self, relations):
+        for relation in relations:
+            self.add(relation)
+
+    def statistics(self, name):
+        relation = self.get(name)
+        return relation.statistics if relation else None
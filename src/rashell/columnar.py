@@ -0,0 +1,262 @@
+from array import array
+from collections.abc import MutableSet
+from itertools import repeat
+
+EMPTY = -1
+DELETED = -2
+MINIMUM_CAPACITY = 8
+# encoded columns with more distinct values than that, and than half of their rows, are stored as plain lists
+MAXIMUM_DICTIONARY_SIZE = 4096
+
+
+class Column:
+    # values of an attribute: a typed array while all of them are integers (or all floats), dictionary codes
+    # otherwise, or a plain list when almost all the values are distinct.
+    # The dictionary is keyed by type as well for numbers, 1 and 1.0 are different values.
+    def __init__(self):
+        self.value_type = None
+        self.data = array('q')
+        self.dictionary = None
+        self.codes = None
+        self.is_list = False
+
+    def append(self, value):
+        if self.is_list:
+            self.data.append(value)
+            return
+        if self.dictionary is not None:
+            self.data.append(self.code(value))
+            if self.has_large_dictionary():
+                self.decode()
+            return
+        if self.value_type is None:
+            if type(value) is int:
+                self.value_type, self.data = int, array('q')
+            elif type(value) is float:
+                self.value_type, self.data = float, array('d')
+            else:
+                self.encode()
+                self.data.append(self.code(value))
+                return
+        if type(value) is self.value_type:
+            try:
+                self.data.append(value)
+                return
+            except OverflowError:
+                pass
+        self.encode()
+        self.data.append(self.code(value))
+
+    def extend(self, values):
+        if self.is_list:
+            self.data.extend(values)
+            return
+        if self.dictionary is not None:
+            self.data.extend(map(self.code, values))
+            if self.has_large_dictionary():
+                self.decode()
+            return
+        value_types = set(map(type, values))
+        if len(value_types) == 1:
+            value_type = value_types.pop()
+            if self.value_type is None and value_type in (int, float):
+                self.value_type, self.data = value_type, array('q' if value_type is int else 'd')
+            if value_type is self.value_type:
+                size = len(self.data)
+                try:
+                    self.data.extend(values)
+                    return
+                except OverflowError:
+                    del self.data[size:]
+        for value in values:
+            self.append(value)
+
+    def has_large_dictionary(self):
+        return len(self.dictionary) > MAXIMUM_DICTIONARY_SIZE and 2 * len(self.dictionary) > len(self.data)
+
+    def encode(self):
+        values = self.data
+        self.dictionary = []
+        self.codes = {}
+        self.data = array('I', map(self.code, values))
+
+    def decode(self):
+        self.data = list(self.values())
+        self.dictionary = self.codes = None
+        self.is_list = True
+
+    def code(self, value):
+        key = value if type(value) is str else (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+
+    def get(self, row):
+        if self.dictionary is not None:
+            return self.dictionary[self.data[row]]
+        return self.data[row]
+
+    def move(self, source_row, target_row):
+        self.data[target_row] = self.data[source_row]
+
+    def pop(self):
+        self.data.pop()
+
+    def values(self):
+        if self.dictionary is not None:
+            return map(self.dictionary.__getitem__, self.data)
+        return iter(self.data)
+
+    def gather(self, rows):
+        if self.dictionary is not None:
+            return map(self.dictionary.__getitem__, map(self.data.__getitem__, rows))
+        return map(self.data.__getitem__, rows)
+
+    def mask(self, test):
+        # truth values of test for every row, evaluated once per distinct value of an encoded column
+        if self.dictionary is not None:
+            dictionary_mask = bytes(bool(test(value)) for value in self.dictionary)
+            return map(dictionary_mask.__getitem__, self.data)
+        return map(test, self.data)
+
+    def compact(self):
+        # codes of deleted values stay in the dictionary until the column is compacted
+        if self.dictionary is not None and len(self.dictionary) > 2 * len(self.data):
+            values = list(self.values())
+            self.dictionary, self.codes = [], {}
+            self.data = array('I', map(self.code, values))
+
+
+class ColumnarTuples(MutableSet):
+    # set of tuples stored column by column. The dedup index is an open addressing table of row numbers with
+    # linear probing, the hash of every row is kept to probe and to resize without reading the rows.
+    # Deleting a row moves the last row in its place so the columns stay dense
+    def __init__(self, arity, tuples=()):
+        self.columns = [Column() for _ in range(arity)]
+        self.hashes = array('q')
+        self.table = array('i', [EMPTY]) * MINIMUM_CAPACITY
+        self.used_slots = 0
+        # tuples being added by update, indexed but not yet appended to the columns
+        self.pending_tuples = []
+        self.update(tuples)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __iter__(self):
+        return zip(*(column.values() for column in self.columns))
+
+    def __contains__(self, t):
+        return self.find_slot(t, hash(t))[1] != EMPTY
+
+    def __repr__(self):
+        return f'{type(self).__name__}({set(self)})'
+
+    def row(self, row):
+        first_pending_row = len(self.hashes) - len(self.pending_tuples)
+        if row >= first_pending_row:
+            return self.pending_tuples[row - first_pending_row]
+        return tuple(column.get(row) for column in self.columns)
+
+    def find_slot(self, t, h):
+        # returns the slot of the row equal to t and that row, or the slot where t can be added and EMPTY
+        table, hashes = self.table, self.hashes
+        mask = len(table) - 1
+        slot = h & mask
+        free_slot = None
+        while True:
+            row = table[slot]
+            if row == EMPTY:
+                return (slot if free_slot is None else free_slot), EMPTY
+            if row == DELETED:
+                if free_slot is None:
+                    free_slot = slot
+            elif hashes[row] == h and self.row(row) == t:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def resize(self):
+        capacity = MINIMUM_CAPACITY
+        while capacity < 3 * len(self.hashes):
+            capacity *= 2
+        table = array('i', [EMPTY]) * capacity
+        mask = capacity - 1
+        for row, h in enumerate(self.hashes):
+            slot = h & mask
+            while table[slot] != EMPTY:
+                slot = (slot + 1) & mask
+            table[slot] = row
+        self.table = table
+        self.used_slots = len(self.hashes)
+
+    def add(self, t):
+        self.update((t,))
+
+    def discard(self, t):
+        h = hash(t)
+        slot, row = self.find_slot(t, h)
+        if row == EMPTY:
+            return
+        self.table[slot] = DELETED
+        last_row = len(self.hashes) - 1
+        if row != last_row:
+            last_hash = self.hashes[last_row]
+            last_slot = last_hash & (len(self.table) - 1)
+            while self.table[last_slot] != last_row:
+                last_slot = (last_slot + 1) & (len(self.table) - 1)
+            self.table[last_slot] = row
+            self.hashes[row] = last_hash
+            for column in self.columns:
+                column.move(last_row, row)
+        self.hashes.pop()
+        for column in self.columns:
+            column.pop()
+
+    def update(self, tuples):
+        # tuples are indexed one by one and appended to the columns together
+        pending_tuples = self.pending_tuples = []
+        arity = len(self.columns)
+        try:
+            for t in tuples:
+                h = hash(t)
+                slot, row = self.find_slot(t, h)
+                if row != EMPTY:
+                    continue
+                if len(t) != arity:
+                    raise ValueError(f'Tuple of arity {len(t)} added to columns of arity {arity}')
+                if self.table[slot] == EMPTY:
+                    self.used_slots += 1
+                self.table[slot] = len(self.hashes)
+                self.hashes.append(h)
+                pending_tuples.append(t)
+                if 2 * self.used_slots > len(self.table):
+                    self.resize()
+        finally:
+            for column, values in zip(self.columns, zip(*pending_tuples)):
+                column.extend(values)
+            self.pending_tuples = []
+
+    def difference_update(self, tuples):
+        for t in tuples:
+            self.discard(t)
+        for column in self.columns:
+            column.compact()
+        if 8 * len(self.hashes) < len(self.table) and len(self.table) > MINIMUM_CAPACITY:
+            self.resize()
+
+    def intersection(self, tuples):
+        return {t for t in tuples if t in self}
+
+    def gather(self, rows, positions):
+        # tuples of the given attribute positions, for all the rows when rows is None
+        if rows is None:
+            if not positions:
+                # one empty tuple per row, zip() would not yield any
+                return repeat((), len(self))
+            return zip(*(self.columns[position].values() for position in positions))
+        rows = list(rows)
+        if not positions:
+            return repeat((), len(rows))
+        return zip(*(self.columns[position].gather(rows) for position in positions))
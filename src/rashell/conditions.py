@@ -0,0 +1,165 @@
+from functools import partial, reduce
+from itertools import compress, count
+from operator import eq, ne, lt, le, gt, ge, and_, or_, not_, itemgetter
+
+OPERATORS = {'=': eq, '>': gt, '>=': ge, '<=': le, '<': lt, '!=': ne, '<>': ne}
+# same comparisons with the operands swapped, partial(function, value) compares an attribute value to value
+REFLECTED_OPERATORS = {'=': eq, '>': lt, '>=': le, '<=': ge, '<': gt, '!=': ne, '<>': ne}
+# selectivity of the comparisons other than equalities
+RANGE_SELECTIVITY = 1 / 3
+
+
+def format_value(value):
+    return repr(value) if isinstance(value, str) else str(value)
+
+
+def condition_from_model(condition):
+    rule_name = condition.__class__.__name__
+    if rule_name == 'Comparison':
+        return Comparison(condition.attribute_name, condition.operator, condition.value,
+                          condition.compared_attribute_name or None)
+    elif rule_name == 'Negation':
+        operand = condition_from_model(condition.operand)
+        return Negation(operand) if condition.negated else operand
+    operands = [condition_from_model(operand) for operand in condition.operands]
+    if len(operands) == 1:
+        return operands[0]
+    return Conjunction(operands) if rule_name == 'Conjunction' else Disjunction(operands)
+
+
+# conditions are compiled once for the attributes of the restricted relation into a kernel: a function computing
+# the truth values of the condition for a batch of tuples, with the comparisons mapped over the whole batch.
+# On columnar tuples, the truth values are computed column by column (see columnar.py)
+class Comparison:
+    def __init__(self, attribute_name, operator, value=None, compared_attribute_name=None):
+        self.attribute_name = attribute_name
+        self.operator = operator
+        self.value = value
+        self.compared_attribute_name = compared_attribute_name
+
+    @property
+    def attribute_names(self):
+        return {self.attribute_name, self.compared_attribute_name} - {None}
+
+    def conjuncts(self):
+        return [self]
+
+    def renamed(self, mapping):
+        return Comparison(mapping.get(self.attribute_name, self.attribute_name), self.operator, self.value,
+                          mapping.get(self.compared_attribute_name, self.compared_attribute_name))
+
+    def selectivity(self, operator):
+        if self.operator != '=':
+            return RANGE_SELECTIVITY
+        distinct_values = operator.estimated_distinct_values(self.attribute_name)
+        if self.compared_attribute_name:
+            distinct_values = max(distinct_values, operator.estimated_distinct_values(self.compared_attribute_name))
+        return 1 / max(distinct_values, 1)
+
+    def compile(self, attributes):
+        get_value = itemgetter(attributes.index(self.attribute_name))
+        if self.compared_attribute_name:
+            function = OPERATORS[self.operator]
+            get_compared_value = itemgetter(attributes.index(self.compared_attribute_name))
+            return lambda batch: map(function, map(get_value, batch), map(get_compared_value, batch))
+        test = partial(REFLECTED_OPERATORS[self.operator], self.value)
+        return lambda batch: map(test, map(get_value, batch))
+
+    def column_mask(self, tuples, attributes):
+        column = tuples.columns[attributes.index(self.attribute_name)]
+        if self.compared_attribute_name:
+            compared_column = tuples.columns[attributes.index(self.compared_attribute_name)]
+            return map(OPERATORS[self.operator], column.values(), compared_column.values())
+        return column.mask(partial(REFLECTED_OPERATORS[self.operator], self.value))
+
+    def matching_rows(self, tuples, attributes):
+        return compress(count(), self.column_mask(tuples, attributes))
+
+    def __str__(self):
+        return '{} {} {}'.format(self.attribute_name, self.operator,
+                                 self.compared_attribute_name or format_value(self.value))
+
+
+class CompoundCondition:
+    symbol = None
+    function = None
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    @property
+    def attribute_names(self):
+        return set().union(*(operand.attribute_names for operand in self.operands))
+
+    def conjuncts(self):
+        return [self]
+
+    def renamed(self, mapping):
+        return type(self)([operand.renamed(mapping) for operand in self.operands])
+
+    def compile(self, attributes):
+        function = type(self).function
+        kernels = [operand.compile(attributes) for operand in self.operands]
+        return lambda batch: reduce(partial(map, function), [kernel(batch) for kernel in kernels])
+
+    def column_mask(self, tuples, attributes):
+        return reduce(partial(map, type(self).function),
+                      [operand.column_mask(tuples, attributes) for operand in self.operands])
+
+    def matching_rows(self, tuples, attributes):
+        return compress(count(), self.column_mask(tuples, attributes))
+
+    def __str__(self):
+        return f' {self.symbol} '.join(
+            f'({operand})' if isinstance(operand, CompoundCondition) else str(operand) for operand in self.operands)
+
+
+class Conjunction(CompoundCondition):
+    symbol = 'AND'
+    function = and_
+
+    def conjuncts(self):
+        # restrictions on conjunctions are split, each conjunct is pushed down on its own
+        return [conjunct for operand in self.operands for conjunct in operand.conjuncts()]
+
+    def selectivity(self, operator):
+        return reduce(lambda product, operand: product * operand.selectivity(operator), self.operands, 1)
+
+
+class Disjunction(CompoundCondition):
+    symbol = 'OR'
+    function = or_
+
+    def selectivity(self, operator):
+        return 1 - reduce(lambda product, operand: product * (1 - operand.selectivity(operator)), self.operands, 1)
+
+
+class Negation:
+    def __init__(self, operand):
+        self.operand = operand
+
+    @property
+    def attribute_names(self):
+        return self.operand.attribute_names
+
+    def conjuncts(self):
+        return [self]
+
+    def renamed(self, mapping):
+        return Negation(self.operand.renamed(mapping))
+
+    def selectivity(self, operator):
+        return 1 - self.operand.selectivity(operator)
+
+    def compile(self, attributes):
+        kernel = self.operand.compile(attributes)
+        return lambda batch: map(not_, kernel(batch))
+
+    def column_mask(self, tuples, attributes):
+        return map(not_, self.operand.column_mask(tuples, attributes))
+
+    def matching_rows(self, tuples, attributes):
+        return compress(count(), self.column_mask(tuples, attributes))
+
+    def __str__(self):
+        return f'NOT {self.operand}' if isinstance(self.operand, Comparison) else f'NOT ({self.operand})'
@@ -12,6 +12,11 @@ class RelationAlreadyExistsException(RashellException):
         super().__init__('Line {}: Relation {} already exists'.format(line, name))
 
 
+class RecursiveViewException(RashellException):
+    def __init__(self, name, line):
+        super().__init__('Line {}: View {} cannot be defined on itself'.format(line, name))
+
+
 class DuplicateAttributesException(RashellException):
     def __init__(self, duplicate_attributes, line):
         super().__init__('Line {}: Duplicate attributes {}'.format(line, duplicate_attributes))
@@ -91,6 +96,12 @@ class ProjectionColumnsNotDefinedException(RashellException):
             'Line {}: Projection columns {} not defined in relation {}'.format(line, projection_columns, relation))
 
 
+class AggregationColumnsNotDefinedException(RashellException):
+    def __init__(self, relation, aggregation_columns, line):
+        super().__init__(
+            'Line {}: Aggregation columns {} not defined in relation {}'.format(line, aggregation_columns, relation))
+
+
 class RestrictionColumnNotDefinedException(RashellException):
     def __init__(self, relation, restriction_column, line):
         super().__init__(
@@ -118,7 +129,80 @@ class DifferenceRelationsHavingDifferentNumberOfAttribute(RashellException):
         super().__init__('Line {}: Difference relations {}, {} have different attributes'.format(line, left_r, right_r))
 
 
-class DeleteColumnNotDefinedException(Exception):
+class DivisionRelationsHavingIncompatibleAttributes(RashellException):
+    def __init__(self, left_r, right_r, line):
+        super().__init__(
+            'Line {}: Division relation {} attributes are not a strict subset of the attributes of {}'.format(
+                line, right_r, left_r))
+
+
+class DeleteColumnNotDefinedException(RashellException):
     def __init__(self, relation, restriction_column, line):
         super().__init__(
             'Line {}: Delete column {} not defined in relation {}'.format(line, restriction_column, relation))
+
+
+class IndexColumnNotDefinedException(RashellException):
+    def __init__(self, relation, index_column, line):
+        super().__init__('Line {}: Index column {} not defined in relation {}'.format(line, index_column, relation))
+
+
+class RestrictionValuesNotComparableException(RashellException):
+    def __init__(self, condition):
+        super().__init__('Restriction {} compares numbers with strings'.format(condition))
+
+
+class LoadFileNotFoundException(RashellException):
+    def __init__(self, file_name, line):
+        super().__init__('Line {}: File {} not found'.format(line, file_name))
+
+
+class LoadRowsRejectedException(RashellException):
+    def __init__(self, file_name, errors, number_of_errors, line):
+        super().__init__('Line {}: Loading {} failed, {} rejected rows\n{}'.format(
+            line,
+            file_name,
+            number_of_errors,
+            '\n'.join(errors)
+        ))
+
+
+class SnapshotFileNotFoundException(RashellException):
+    def __init__(self, file_name, line):
+        super().__init__('Line {}: Snapshot {} not found'.format(line, file_name))
+
+
+class InvalidSnapshotException(RashellException):
+    def __init__(self, file_name, line):
+        super().__init__('Line {}: {} is not a rashell snapshot'.format(line, file_name))
+
+
+class SnapshotNotSavedException(RashellException):
+    def __init__(self, file_name, reason, line):
+        super().__init__('Line {}: Snapshot {} not saved: {}'.format(line, file_name, reason))
+
+
+class JournalNotOpenedException(RashellException):
+    def __init__(self):
+        super().__init__('No journal opened, rashell has to be started with --journal')
+
+
+class CommandNotServedException(RashellException):
+    def __init__(self, rule_name):
+        super().__init__('{} commands are not available to the clients of rashell serve'.format(rule_name))
+
+
+class TransactionAlreadyOpenException(RashellException):
+    def __init__(self, line):
+        super().__init__('Line {}: A transaction is already open'.format(line))
+
+
+class NoTransactionOpenException(RashellException):
+    def __init__(self, statement, line):
+        super().__init__('Line {}: {} without BEGIN, no transaction is open'.format(line, statement))
+
+
+class CommandInTransactionException(RashellException):
+    def __init__(self, command, line):
+        super().__init__('Line {}: {} cannot be run in a transaction, COMMIT or ROLLBACK it first'.format(
+            line, command))
@@ -0,0 +1,19 @@
+import os
+
+from textx import metamodel_from_file
+
+from rashell.relational_model import Relation
+
+GRAMMAR_DIRECTORY = os.path.join(os.path.dirname(__file__), 'grammar_files')
+
+# metamodels are shared by all the engines of the process, textX builds them with dynamically created classes
+# which cannot be serialized, so they are not cached on disk. The grammars do not change while the process runs,
+# a metamodel is built once by grammar file
+metamodels = {}
+
+
+def get_metamodel(grammar_file_name):
+    if grammar_file_name not in metamodels:
+        metamodels[grammar_file_name] = metamodel_from_file(os.path.join(GRAMMAR_DIRECTORY, grammar_file_name),
+                                                            classes=[Relation], memoization=True)
+    return metamodels[grammar_file_name]
@@ -0,0 +1,99 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+
+INDEXED_OPERATORS = frozenset(('=', '<', '<=', '>', '>='))
+
+
+class SortedIndex:
+    # ordered secondary index of an attribute: the distinct values in sorted lists, numbers and strings apart as they
+    # cannot be compared, and the tuples having each value (a single tuple is not wrapped in a set)
+    def __init__(self, position, tuples=()):
+        self.position = position
+        self.tuples_by_value = {}
+        self.numbers = []
+        self.strings = []
+        self.size = 0
+        self.add(tuples)
+
+    def sorted_values(self, value):
+        return self.strings if isinstance(value, str) else self.numbers
+
+    def tuples_of(self, value):
+        entry = self.tuples_by_value[value]
+        return entry if type(entry) is set else (entry,)
+
+    def add(self, tuples):
+        tuples_by_value, position = self.tuples_by_value, self.position
+        new_values = []
+        for t in tuples:
+            value = t[position]
+            entry = tuples_by_value.get(value)
+            if entry is None:
+                tuples_by_value[value] = t
+                new_values.append(value)
+            elif type(entry) is set:
+                if t in entry:
+                    continue
+                entry.add(t)
+            elif entry == t:
+                continue
+            else:
+                tuples_by_value[value] = {entry, t}
+            self.size += 1
+        if len(new_values) > (len(self.numbers) + len(self.strings)) // 8:
+            # many new values are merged by sorting again, timsort takes advantage of the sorted runs
+            self.numbers.extend(value for value in new_values if not isinstance(value, str))
+            self.strings.extend(value for value in new_values if isinstance(value, str))
+            self.numbers.sort()
+            self.strings.sort()
+        else:
+            for value in new_values:
+                insort(self.sorted_values(value), value)
+
+    def remove(self, tuples):
+        tuples_by_value, position = self.tuples_by_value, self.position
+        removed_values = []
+        for t in tuples:
+            value = t[position]
+            entry = tuples_by_value.get(value)
+            if entry is None:
+                continue
+            if type(entry) is set:
+                if t not in entry:
+                    continue
+                entry.discard(t)
+                if len(entry) == 1:
+                    tuples_by_value[value] = next(iter(entry))
+            elif entry == t:
+                del tuples_by_value[value]
+                removed_values.append(value)
+            else:
+                continue
+            self.size -= 1
+        if len(removed_values) > 8:
+            removed_values = set(removed_values)
+            self.numbers = [value for value in self.numbers if value not in removed_values]
+            self.strings = [value for value in self.strings if value not in removed_values]
+        else:
+            for value in removed_values:
+                sorted_values = self.sorted_values(value)
+                del sorted_values[bisect_left(sorted_values, value)]
+
+    def lookup(self, operator, value):
+        # tuples whose value of the attribute compares to value, in O(log n + k)
+        if operator == '=':
+            return self.tuples_of(value) if value in self.tuples_by_value else ()
+        sorted_values = self.sorted_values(value)
+        other_values = self.numbers if sorted_values is self.strings else self.strings
+        if other_values:
+            # the values of the other kind are not skipped, comparing them fails as without the index
+            raise TypeError('{!r} {} {!r}'.format(other_values[0], operator, value))
+        if operator == '<':
+            selected_values = sorted_values[:bisect_left(sorted_values, value)]
+        elif operator == '<=':
+            selected_values = sorted_values[:bisect_right(sorted_values, value)]
+        elif operator == '>':
+            selected_values = sorted_values[bisect_right(sorted_values, value):]
+        else:
+            selected_values = sorted_values[bisect_left(sorted_values, value):]
+        return chain.from_iterable(map(self.tuples_of, selected_values))
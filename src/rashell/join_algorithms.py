@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+# tuples of the smaller input a hash join holds in its hash table. Past this limit, both inputs are sorted on the
+# join attribute and merged, the sorted lists only hold references to the tuples
+HASH_JOIN_LIMIT = 1 << 20
+
+
+def value_sort_key(value):
+    # integers, floats and strings cannot be compared with each other, numbers are ordered first
+    return (1, value) if isinstance(value, str) else (0, value)
+
+
+def hash_join(left_tuples, right_tuples, left_index, right_index, build_left=None):
+    # the build side is materialized in a hash table, the probe side is streamed
+    if build_left is None:
+        build_left = len(left_tuples) <= len(right_tuples)
+    if build_left:
+        hash_table = defaultdict(list)
+        for l_tuple in left_tuples:
+            hash_table[l_tuple[left_index]].append(l_tuple)
+        for r_tuple in right_tuples:
+            for l_tuple in hash_table.get(r_tuple[right_index], ()):
+                yield l_tuple + r_tuple
+    else:
+        hash_table = defaultdict(list)
+        for r_tuple in right_tuples:
+            hash_table[r_tuple[right_index]].append(r_tuple)
+        for l_tuple in left_tuples:
+            for r_tuple in hash_table.get(l_tuple[left_index], ()):
+                yield l_tuple + r_tuple
+
+
+def semi_join(left_tuples, right_tuples, left_index, right_index, build_left=False, anti=False):
+    # tuples of left with a matching tuple in right (without any with anti), each one produced once. Either the
+    # join values of right are collected in a set and left is streamed, or left is materialized in a hash table from
+    # which the groups of tuples are removed as right is streamed
+    if build_left:
+        hash_table = defaultdict(list)
+        for l_tuple in left_tuples:
+            hash_table[l_tuple[left_index]].append(l_tuple)
+        for r_tuple in right_tuples:
+            matching_tuples = hash_table.pop(r_tuple[right_index], None)
+            if matching_tuples and not anti:
+                yield from matching_tuples
+            if not hash_table:
+                return
+        if anti:
+            for unmatched_tuples in hash_table.values():
+                yield from unmatched_tuples
+    else:
+        right_values = {r_tuple[right_index] for r_tuple in right_tuples}
+        for l_tuple in left_tuples:
+            if (l_tuple[left_index] in right_values) != anti:
+                yield l_tuple
+
+
+def hash_division(dividend_tuples, divisor_tuples, quotient_positions, divisor_positions):
+    # quotient tuples combined in the dividend with every divisor tuple. The divisor is a set, and the dividend is
+    # aggregated in a hash table counting the divisor tuples found for each quotient tuple (the dividend tuples are
+    # distinct, so every divisor tuple is counted at most once)
+    divisor = set(divisor_tuples)
+    counts = {}
+    for t in dividend_tuples:
+        quotient_tuple = tuple(t[position] for position in quotient_positions)
+        if tuple(t[position] for position in divisor_positions) in divisor:
+            counts[quotient_tuple] = counts.get(quotient_tuple, 0) + 1
+        else:
+            counts.setdefault(quotient_tuple, 0)
+    return (quotient_tuple for quotient_tuple, count in counts.items() if count == len(divisor))
+
+
+def sort_merge_join(left_tuples, right_tuples, left_index, right_index):
+    # both inputs are sorted on their join attribute and merged, without any hash table
+    left_tuples = sorted(left_tuples, key=lambda t: value_sort_key(t[left_index]))
+    right_tuples = sorted(right_tuples, key=lambda t: value_sort_key(t[right_index]))
+    i, j = 0, 0
+    while i < len(left_tuples) and j < len(right_tuples):
+        left_key = value_sort_key(left_tuples[i][left_index])
+        right_key = value_sort_key(right_tuples[j][right_index])
+        if left_key < right_key:
+            i += 1
+        elif left_key > right_key:
+            j += 1
+        else:
+            i_end = i
+            while i_end < len(left_tuples) and value_sort_key(left_tuples[i_end][left_index]) == left_key:
+                i_end += 1
+            j_end = j
+            while j_end < len(right_tuples) and value_sort_key(right_tuples[j_end][right_index]) == right_key:
+                j_end += 1
+            for l_tuple in left_tuples[i:i_end]:
+                for r_tuple in right_tuples[j:j_end]:
+                    yield l_tuple + r_tuple
+            i, j = i_end, j_end
+
+
+def index_merge_join(left_index, right_index, left_positions=None, right_positions=None):
+    # both inputs are read from the sorted indexes of their join attribute: the sorted values of the indexes are
+    # merged, numbers and strings apart, and the tuples having a common value are combined without any hash table.
+    # The tuples of an input projected on positions are projected value by value
+    for left_values, right_values in ((left_index.numbers, right_index.numbers),
+                                      (left_index.strings, right_index.strings)):
+        i, j = 0, 0
+        while i < len(left_values) and j < len(right_values):
+            left_value, right_value = left_values[i], right_values[j]
+            if left_value < right_value:
+                i += 1
+            elif left_value > right_value:
+                j += 1
+            else:
+                right_tuples = projected_tuples(right_index.tuples_of(right_value), right_positions)
+                for l_tuple in projected_tuples(left_index.tuples_of(left_value), left_positions):
+                    for r_tuple in right_tuples:
+                        yield l_tuple + r_tuple
+                i += 1
+                j += 1
+
+
+def projected_tuples(tuples, positions):
+    if positions is None:
+        return tuples
+    return {tuple(t[position] for position in positions) for t in tuples}
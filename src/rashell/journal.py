@@ -0,0 +1,97 @@
+import marshal
+import os
+import struct
+import time
+import zlib
+
+# every record is its length and checksum followed by the marshaled record, a record torn by a crash is detected
+# by a short read or a wrong checksum and dropped with everything after it
+RECORD_HEADER = struct.Struct('<II')
+MARSHAL_VERSION = 4
+
+FSYNC_ALWAYS = 'always'
+FSYNC_INTERVAL = 'interval'
+FSYNC_NEVER = 'never'
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+
+def checkpoint_file_name(file_name):
+    return file_name + '.checkpoint'
+
+
+def encode_record(record):
+    payload = marshal.dumps(record, MARSHAL_VERSION)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(file_name):
+    # returns the records of the journal and the size of its valid part
+    records = []
+    valid_size = 0
+    if not os.path.isfile(file_name):
+        return records, valid_size
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    while valid_size + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, valid_size)
+        start = valid_size + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            break
+        records.append(marshal.loads(payload))
+        valid_size = start + length
+    return records, valid_size
+
+
+class Journal:
+    # records are buffered and written by commit, once per command (group commit), so that a file of thousands
+    # of inserts costs a single write. The buffer is also written once it holds group_size bytes.
+    # fsync makes the written records survive a crash of the system and not only of rashell:
+    # after every commit (always), at most every fsync_interval seconds (interval) or when the system decides (never)
+    def __init__(self, file_name, valid_size, fsync=FSYNC_ALWAYS, fsync_interval=1.0, group_size=1 << 20):
+        self.file_name = file_name
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.group_size = group_size
+        self.buffer = []
+        self.buffer_size = 0
+        self.last_fsync = time.monotonic()
+        self.file = open(file_name, 'ab')
+        # a torn record at the end of the journal would hide the records appended after it
+        self.file.truncate(valid_size)
+
+    def append(self, record):
+        encoded_record = encode_record(record)
+        self.buffer.append(encoded_record)
+        self.buffer_size += len(encoded_record)
+        if self.buffer_size >= self.group_size:
+            self.write()
+
+    def write(self):
+        if self.buffer:
+            self.file.write(b''.join(self.buffer))
+            self.file.flush()
+            self.buffer = []
+            self.buffer_size = 0
+
+    def commit(self):
+        self.write()
+        if self.fsync == FSYNC_ALWAYS or (
+                self.fsync == FSYNC_INTERVAL and time.monotonic() - self.last_fsync >= self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+
+    def truncate(self):
+        # called once a checkpoint holds every record of the journal
+        self.buffer = []
+        self.buffer_size = 0
+        self.file.truncate(0)
+        self.sync()
+
+    def close(self):
+        self.write()
+        self.sync()
+        self.file.close()
@@ -0,0 +1,117 @@
+import csv
+import os
+
+from rashell.exceptions import LoadFileNotFoundException, LoadRowsRejectedException
+
+BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 10
+
+
+NUMBER_FIRST_CHARACTERS = frozenset('+-.0123456789')
+
+
+def coerce_value(text):
+    # same types as the values accepted by the grammar: integers, floats and strings. The spaces around a number
+    # are dropped, a column padded to align it still holds numbers
+    number_text = text.strip()
+    if number_text.isdigit():
+        return int(number_text)
+    if not number_text or number_text[0] not in NUMBER_FIRST_CHARACTERS:
+        return text
+    try:
+        return int(number_text)
+    except ValueError:
+        pass
+    try:
+        return float(number_text)
+    except ValueError:
+        return text
+
+
+def file_delimiter(file_name):
+    return '\t' if os.path.splitext(file_name)[1].lower() in ('.tsv', '.tab') else ','
+
+
+def read_batches(file_name, attribute_names):
+    with open(file_name, newline='') as f:
+        reader = csv.reader(f, delimiter=file_delimiter(file_name))
+        batch = []
+        for row in reader:
+            if reader.line_num == 1 and row == attribute_names:
+                continue
+            batch.append((reader.line_num, row))
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def read_tuples(relation, file_name, line):
+    # tuples of a file loaded in a transaction, their keys are checked at commit
+    if not os.path.isfile(file_name):
+        raise LoadFileNotFoundException(file_name, line)
+
+    errors = []
+    tuples = []
+    for batch in read_batches(file_name, [a.name for a in relation.attributes]):
+        tuples.extend(row_tuple(relation, row_number, row, errors) for row_number, row in batch)
+    if errors:
+        raise LoadRowsRejectedException(file_name, errors[:MAX_REPORTED_ERRORS], len(errors), line)
+    return tuples
+
+
+def row_tuple(relation, row_number, row, errors):
+    if len(row) != len(relation.attributes):
+        errors.append('row {}: Arity of tuple is {}. Expected {}'.format(row_number, len(row),
+                                                                         len(relation.attributes)))
+        return None
+    return tuple(coerce_value(cell) for cell in row)
+
+
+def check_batch(relation, batch, errors):
+    pk_positions = relation.pk_positions
+    batch_pk_tuples = set()
+    tuples = []
+    for row_number, row in batch:
+        t = row_tuple(relation, row_number, row, errors)
+        if t is None:
+            continue
+        if pk_positions:
+            pk_tuple = tuple(t[pk_position] for pk_position in pk_positions)
+            if pk_tuple in relation.pk_index or pk_tuple in batch_pk_tuples:
+                errors.append('row {}: Primary Key constraint failed {}'.format(row_number, pk_tuple))
+                continue
+            batch_pk_tuples.add(pk_tuple)
+        tuples.append((row_number, t))
+    return tuples
+
+
+def check_foreign_keys(relation, get_relation_by_name, tuples, errors):
+    # checked once the batch is inserted, a batch may reference its own tuples
+    for fk in relation.foreign_keys:
+        referencer_attribute_index = relation.attribute_position(fk.referencer_attribute_name)
+        referenced_relation = get_relation_by_name(fk.referenced_relation_name)
+        for row_number, t in tuples:
+            value = t[referencer_attribute_index]
+            if not referenced_relation.has_value(fk.referenced_attribute_name, value):
+                errors.append('row {}: Foreign Key constraint failed {}'.format(row_number, value))
+
+
+def load_relation(relation, file_name, get_relation_by_name, check_references, line):
+    if not os.path.isfile(file_name):
+        raise LoadFileNotFoundException(file_name, line)
+
+    errors = []
+    loaded_tuples = []
+    for batch in read_batches(file_name, [a.name for a in relation.attributes]):
+        tuples = check_batch(relation, batch, errors)
+        if not errors:
+            loaded_tuples.extend(relation.add_tuples(t for _, t in tuples))
+            if check_references:
+                check_foreign_keys(relation, get_relation_by_name, tuples, errors)
+        if errors:
+            # a load either succeeds as a whole or leaves the relation unchanged
+            relation.remove_tuples(loaded_tuples)
+            raise LoadRowsRejectedException(file_name, errors[:MAX_REPORTED_ERRORS], len(errors), line)
+    return loaded_tuples
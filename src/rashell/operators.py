@@ -0,0 +1,474 @@
+from itertools import compress, islice
+
+from rashell.aggregation import hash_aggregate, aggregate_name, format_aggregate
+from rashell.conditions import Comparison, Conjunction
+from rashell.exceptions import RestrictionValuesNotComparableException
+from rashell.indexes import INDEXED_OPERATORS
+from rashell.join_algorithms import HASH_JOIN_LIMIT, hash_join, semi_join, hash_division, index_merge_join, \
+    sort_merge_join
+
+# tuples are restricted by batches, the compiled condition is evaluated over a whole batch at once
+BATCH_SIZE = 1024
+
+
+def format_operand(operator):
+    return f'({operator})' if isinstance(operator, BinaryOperator) else str(operator)
+
+
+def joined_attributes(left_attributes, right_attributes):
+    return list(left_attributes) + [f'{a}{"_" if a in left_attributes else ""}' for a in right_attributes]
+
+
+def side_attribute(operator, attribute_name):
+    # maps an output attribute of a join or a product to the side it comes from and its name on that side
+    index = operator.attributes.index(attribute_name)
+    if index < len(operator.left.attributes):
+        return operator.left, operator.left.attributes[index]
+    return operator.right, operator.right.attributes[index - len(operator.left.attributes)]
+
+
+def side_distinct_values(operator, attribute_name):
+    side, side_attribute_name = side_attribute(operator, attribute_name)
+    return side.estimated_distinct_values(side_attribute_name)
+
+
+def indexed_conjunct(operator):
+    # the conjunct of a restriction of a scan that a sorted index of the relation can answer, equalities first
+    if not isinstance(operator.child, Scan) or not operator.child.relation.sorted_indexes:
+        return None
+    sorted_indexes = operator.child.relation.sorted_indexes
+    candidates = [conjunct for conjunct in operator.condition.conjuncts()
+                  if isinstance(conjunct, Comparison) and not conjunct.compared_attribute_name and
+                  conjunct.operator in INDEXED_OPERATORS and conjunct.attribute_name in sorted_indexes]
+    return min(candidates, key=lambda conjunct: conjunct.operator != '=', default=None)
+
+
+def sorted_join_input(operator, attribute_name):
+    # the sorted index of the join attribute reading a join input in order, for a scan or a projection of a scan,
+    # with the positions of the projected attributes (None for a scan), or None
+    positions = None
+    if isinstance(operator, Project) and isinstance(operator.child, Scan):
+        positions = [operator.child.attributes.index(c) for c in operator.columns]
+        attribute_name = operator.columns[operator.attributes.index(attribute_name)]
+        operator = operator.child
+    if isinstance(operator, Scan) and attribute_name in operator.relation.sorted_indexes:
+        return operator.relation.sorted_indexes[attribute_name], positions
+    return None
+
+
+def columnar_rows(operator):
+    # a scan of a columnar relation, restricted or not, is read column by column: returns the tuples and the
+    # matching rows (None for all of them), or None for other operators and for restrictions answered by an index
+    if isinstance(operator, Scan) and operator.relation.columnar:
+        return operator.relation.tuples, None
+    if isinstance(operator, Restrict) and isinstance(operator.child, Scan) and operator.child.relation.columnar:
+        if indexed_conjunct(operator):
+            return None
+        tuples = operator.child.relation.tuples
+        return tuples, operator.condition.matching_rows(tuples, operator.attributes)
+    return None
+
+
+def scans(operator):
+    if isinstance(operator, Scan):
+        return [operator]
+    return [scan for child in operator.children for scan in scans(child)]
+
+
+def base_relation_names(operator):
+    return {scan.relation.name for scan in scans(operator)}
+
+
+def materialized_set(operator):
+    # base relations are already stored as sets, they do not need to be copied
+    return operator.relation.tuples if isinstance(operator, Scan) else set(operator)
+
+
+class Operator:
+    children = ()
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def estimated_cardinality(self):
+        raise NotImplementedError
+
+    def estimated_distinct_values(self, attribute_name):
+        return self.estimated_cardinality()
+
+    def algorithm(self):
+        # how the tuples are computed, as shown by EXPLAIN
+        raise NotImplementedError
+
+
+def build_side(operator):
+    return 'left' if operator.builds_left() else 'right'
+
+
+class Scan(Operator):
+    def __init__(self, relation):
+        self.relation = relation
+        self.attributes = [a.name for a in relation.attributes]
+
+    def __iter__(self):
+        return iter(self.relation.tuples)
+
+    def __str__(self):
+        return self.relation.name
+
+    def algorithm(self):
+        return 'columnar scan' if self.relation.columnar else 'scan'
+
+    def estimated_cardinality(self):
+        return len(self.relation.tuples)
+
+    def estimated_distinct_values(self, attribute_name):
+        if self.relation.statistics:
+            return self.relation.statistics.distinct_values(attribute_name)
+        return self.estimated_cardinality()
+
+
+class Restrict(Operator):
+    def __init__(self, child, condition):
+        self.child = child
+        self.children = (child,)
+        self.attributes = child.attributes
+        self.condition = condition
+
+    def __iter__(self):
+        # a number and a string cannot be ordered, whether the tuples are read from an index, from columns or
+        # one by one
+        try:
+            yield from self.matching_tuples()
+        except TypeError:
+            raise RestrictionValuesNotComparableException(self.condition)
+
+    def matching_tuples(self):
+        conjunct = indexed_conjunct(self)
+        if conjunct:
+            return self.indexed_tuples(conjunct)
+        columnar = columnar_rows(self)
+        if columnar:
+            tuples, rows = columnar
+            return tuples.gather(rows, range(len(self.attributes)))
+        return self.restricted_tuples(self.condition.compile(self.attributes))
+
+    def indexed_tuples(self, conjunct):
+        # only the tuples found by the index are read, the other conjuncts are evaluated on them
+        sorted_index = self.child.relation.sorted_indexes[conjunct.attribute_name]
+        tuples = sorted_index.lookup(conjunct.operator, conjunct.value)
+        rest = [c for c in self.condition.conjuncts() if c is not conjunct]
+        if not rest:
+            return iter(tuples)
+        condition = rest[0] if len(rest) == 1 else Conjunction(rest)
+        return self.restricted_tuples(condition.compile(self.attributes), tuples)
+
+    def restricted_tuples(self, kernel, tuples=None):
+        tuples = iter(self.child if tuples is None else tuples)
+        while True:
+            batch = list(islice(tuples, BATCH_SIZE))
+            if not batch:
+                return
+            yield from compress(batch, kernel(batch))
+
+    def __str__(self):
+        return f'σ {self.condition} ({self.child})'
+
+    def algorithm(self):
+        conjunct = indexed_conjunct(self)
+        if conjunct:
+            return f'sorted index on {conjunct.attribute_name}'
+        return 'column filter' if columnar_rows(self) else 'batch filter'
+
+    def estimated_cardinality(self):
+        return int(self.child.estimated_cardinality() * self.condition.selectivity(self.child))
+
+    def estimated_distinct_values(self, attribute_name):
+        return min(self.child.estimated_distinct_values(attribute_name), self.estimated_cardinality())
+
+
+class Project(Operator):
+    def __init__(self, child, columns, attributes=None, distinct=True):
+        # non distinct projections only prune columns below a distinct one, see optimizer.py
+        self.child = child
+        self.children = (child,)
+        self.columns = list(columns)
+        self.attributes = list(attributes or columns)
+        self.distinct = distinct
+
+    def __iter__(self):
+        indexes = [self.child.attributes.index(c) for c in self.columns]
+        columnar = columnar_rows(self.child)
+        if columnar:
+            # only the projected columns are read
+            tuples, rows = columnar
+            projected_tuples = tuples.gather(rows, indexes)
+        else:
+            projected_tuples = (tuple(t[index] for index in indexes) for t in self.child)
+        if not self.distinct:
+            return projected_tuples
+        return self.distinct_tuples(projected_tuples)
+
+    @staticmethod
+    def distinct_tuples(projected_tuples):
+        seen = set()
+        for projected_tuple in projected_tuples:
+            if projected_tuple not in seen:
+                seen.add(projected_tuple)
+                yield projected_tuple
+
+    def __str__(self):
+        columns = [c if c == a else f'{c}→{a}' for c, a in zip(self.columns, self.attributes)]
+        return f'π {", ".join(columns)} ({self.child})'
+
+    def algorithm(self):
+        read = 'column gather' if columnar_rows(self.child) else 'tuple projection'
+        return f'{read}, hash distinct' if self.distinct else read
+
+    def estimated_cardinality(self):
+        return self.child.estimated_cardinality()
+
+    def estimated_distinct_values(self, attribute_name):
+        return self.child.estimated_distinct_values(self.columns[self.attributes.index(attribute_name)])
+
+
+class Aggregate(Operator):
+    def __init__(self, child, group_columns, aggregates):
+        # aggregates are pairs of a function and an attribute name (None for count(*))
+        self.child = child
+        self.children = (child,)
+        self.group_columns = list(group_columns)
+        self.aggregates = list(aggregates)
+        self.attributes = self.group_columns + [aggregate_name(function, attribute_name) for
+                                                function, attribute_name in self.aggregates]
+
+    def __iter__(self):
+        group_positions = [self.child.attributes.index(c) for c in self.group_columns]
+        aggregates = [(function, None if attribute_name is None else self.child.attributes.index(attribute_name))
+                      for function, attribute_name in self.aggregates]
+        return hash_aggregate(self.child, group_positions, aggregates)
+
+    def __str__(self):
+        aggregates = [format_aggregate(function, attribute_name) for function, attribute_name in self.aggregates]
+        return f'γ {", ".join(self.group_columns)}; {", ".join(aggregates)} ({self.child})'
+
+    def algorithm(self):
+        return 'hash aggregation'
+
+    def estimated_cardinality(self):
+        if not self.group_columns:
+            return 1
+        groups = 1
+        for c in self.group_columns:
+            groups *= max(self.child.estimated_distinct_values(c), 1)
+        return min(groups, self.child.estimated_cardinality())
+
+    def estimated_distinct_values(self, attribute_name):
+        if attribute_name in self.group_columns:
+            return min(self.child.estimated_distinct_values(attribute_name), self.estimated_cardinality())
+        return self.estimated_cardinality()
+
+
+class BinaryOperator(Operator):
+    symbol = None
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.children = (left, right)
+        self.attributes = left.attributes
+
+    def __str__(self):
+        return f'{format_operand(self.left)} {self.symbol} {format_operand(self.right)}'
+
+
+class Join(BinaryOperator):
+    symbol = '⋈'
+
+    def __init__(self, left, right, left_attribute, right_attribute, attributes=None):
+        super().__init__(left, right)
+        self.attributes = attributes or joined_attributes(left.attributes, right.attributes)
+        self.left_attribute = left_attribute
+        self.right_attribute = right_attribute
+
+    def __iter__(self):
+        sorted_inputs = self.sorted_inputs()
+        if sorted_inputs:
+            (left_index, left_positions), (right_index, right_positions) = sorted_inputs
+            return index_merge_join(left_index, right_index, left_positions, right_positions)
+        left_index = self.left.attributes.index(self.left_attribute)
+        right_index = self.right.attributes.index(self.right_attribute)
+        if self.sorts_inputs():
+            return sort_merge_join(self.left, self.right, left_index, right_index)
+        return hash_join(self.left, self.right, left_index, right_index, self.builds_left())
+
+    def sorted_inputs(self):
+        # both inputs ordered by sorted indexes of the join attributes are merged instead of hashed
+        left_input = sorted_join_input(self.left, self.left_attribute)
+        right_input = sorted_join_input(self.right, self.right_attribute)
+        return (left_input, right_input) if left_input and right_input else None
+
+    def builds_left(self):
+        return self.left.estimated_cardinality() <= self.right.estimated_cardinality()
+
+    def sorts_inputs(self):
+        # past HASH_JOIN_LIMIT tuples on both sides, the inputs are sorted and merged instead of hashed
+        return min(self.left.estimated_cardinality(), self.right.estimated_cardinality()) > HASH_JOIN_LIMIT
+
+    def __str__(self):
+        return f'{super().__str__()} | {self.left_attribute} = {self.right_attribute}'
+
+    def algorithm(self):
+        if self.sorted_inputs():
+            return f'sort-merge join on sorted indexes of {self.left_attribute} and {self.right_attribute}'
+        if self.sorts_inputs():
+            return 'sort-merge join, inputs sorted'
+        return f'hash join, build {build_side(self)}'
+
+    def estimated_cardinality(self):
+        distinct_values = max(self.left.estimated_distinct_values(self.left_attribute),
+                              self.right.estimated_distinct_values(self.right_attribute), 1)
+        return self.left.estimated_cardinality() * self.right.estimated_cardinality() // distinct_values
+
+    def estimated_distinct_values(self, attribute_name):
+        return min(side_distinct_values(self, attribute_name), self.estimated_cardinality())
+
+
+class CartesianProduct(BinaryOperator):
+    symbol = 'X'
+
+    def __init__(self, left, right, attributes=None):
+        super().__init__(left, right)
+        self.attributes = attributes or joined_attributes(left.attributes, right.attributes)
+
+    def __iter__(self):
+        if self.builds_left():
+            left_tuples = list(self.left)
+            return (l_tuple + r_tuple for r_tuple in self.right for l_tuple in left_tuples)
+        right_tuples = list(self.right)
+        return (l_tuple + r_tuple for l_tuple in self.left for r_tuple in right_tuples)
+
+    def builds_left(self):
+        return self.left.estimated_cardinality() <= self.right.estimated_cardinality()
+
+    def algorithm(self):
+        return f'nested loops, materialize {build_side(self)}'
+
+    def estimated_cardinality(self):
+        return self.left.estimated_cardinality() * self.right.estimated_cardinality()
+
+    def estimated_distinct_values(self, attribute_name):
+        return side_distinct_values(self, attribute_name)
+
+
+class SemiJoin(BinaryOperator):
+    symbol = '⋉'
+    anti = False
+
+    def __init__(self, left, right, left_attribute, right_attribute):
+        super().__init__(left, right)
+        self.left_attribute = left_attribute
+        self.right_attribute = right_attribute
+
+    def __iter__(self):
+        left_index = self.left.attributes.index(self.left_attribute)
+        right_index = self.right.attributes.index(self.right_attribute)
+        return semi_join(self.left, self.right, left_index, right_index, self.builds_left(), self.anti)
+
+    def builds_left(self):
+        return self.left.estimated_cardinality() < self.right.estimated_cardinality()
+
+    def __str__(self):
+        return f'{super().__str__()} | {self.left_attribute} = {self.right_attribute}'
+
+    def algorithm(self):
+        return f'hash {"anti" if self.anti else "semi"}-join, build {build_side(self)}'
+
+    def estimated_cardinality(self):
+        # fraction of the join values of left found in right
+        left_distinct_values = max(self.left.estimated_distinct_values(self.left_attribute), 1)
+        right_distinct_values = self.right.estimated_distinct_values(self.right_attribute)
+        return self.left.estimated_cardinality() * min(right_distinct_values, left_distinct_values) // \
+            left_distinct_values
+
+    def estimated_distinct_values(self, attribute_name):
+        return min(self.left.estimated_distinct_values(attribute_name), self.estimated_cardinality())
+
+
+class AntiJoin(SemiJoin):
+    symbol = '▷'
+    anti = True
+
+    def estimated_cardinality(self):
+        return self.left.estimated_cardinality()
+
+
+class Division(BinaryOperator):
+    symbol = '÷'
+
+    def __init__(self, left, right):
+        super().__init__(left, right)
+        self.attributes = [a for a in left.attributes if a not in right.attributes]
+
+    def __iter__(self):
+        quotient_positions = [self.left.attributes.index(a) for a in self.attributes]
+        divisor_positions = [self.left.attributes.index(a) for a in self.right.attributes]
+        return hash_division(self.left, self.right, quotient_positions, divisor_positions)
+
+    def algorithm(self):
+        return 'hash division'
+
+    def estimated_cardinality(self):
+        return self.left.estimated_cardinality() // max(self.right.estimated_cardinality(), 1)
+
+    def estimated_distinct_values(self, attribute_name):
+        return min(self.left.estimated_distinct_values(attribute_name), self.estimated_cardinality())
+
+
+class Union(BinaryOperator):
+    symbol = 'U'
+
+    def __iter__(self):
+        seen = set()
+        for t in self.left:
+            if t not in seen:
+                seen.add(t)
+                yield t
+        for t in self.right:
+            if t not in seen:
+                seen.add(t)
+                yield t
+
+    def algorithm(self):
+        return 'hash union'
+
+    def estimated_cardinality(self):
+        return self.left.estimated_cardinality() + self.right.estimated_cardinality()
+
+
+class Intersection(BinaryOperator):
+    symbol = '∩'
+
+    def __iter__(self):
+        right_tuples = materialized_set(self.right)
+        return (t for t in self.left if t in right_tuples)
+
+    def algorithm(self):
+        return 'hash probe of right'
+
+    def estimated_cardinality(self):
+        return min(self.left.estimated_cardinality(), self.right.estimated_cardinality())
+
+
+class Difference(BinaryOperator):
+    symbol = '-'
+
+    def __iter__(self):
+        right_tuples = materialized_set(self.right)
+        return (t for t in self.left if t not in right_tuples)
+
+    def algorithm(self):
+        return 'hash probe of right'
+
+    def estimated_cardinality(self):
+        return self.left.estimated_cardinality()
@@ -0,0 +1,202 @@
+from rashell.conditions import Comparison, Conjunction
+from rashell.operators import Restrict, Project, Aggregate, BinaryOperator, Join, CartesianProduct, SemiJoin, \
+    Division, Union, Intersection, Difference, side_attribute
+
+
+def optimize(plan):
+    plan = push_down_restrictions(plan)
+    plan = order_joins(plan)
+    plan = push_down_projections(plan)
+    return plan
+
+
+def copy_with_children(operator, children):
+    if isinstance(operator, Restrict):
+        return Restrict(children[0], operator.condition)
+    elif isinstance(operator, Project):
+        return Project(children[0], operator.columns, operator.attributes, operator.distinct)
+    elif isinstance(operator, Aggregate):
+        return Aggregate(children[0], operator.group_columns, operator.aggregates)
+    elif isinstance(operator, Join):
+        return Join(children[0], children[1], operator.left_attribute, operator.right_attribute,
+                    operator.attributes)
+    elif isinstance(operator, CartesianProduct):
+        return CartesianProduct(children[0], children[1], operator.attributes)
+    elif isinstance(operator, SemiJoin):
+        return type(operator)(children[0], children[1], operator.left_attribute, operator.right_attribute)
+    elif isinstance(operator, BinaryOperator):
+        return type(operator)(children[0], children[1])
+    return operator
+
+
+def push_down_restrictions(operator):
+    children = [push_down_restrictions(child) for child in operator.children]
+    if isinstance(operator, Restrict):
+        child = children[0]
+        for conjunct in operator.condition.conjuncts():
+            child = push_down_restriction(child, conjunct)
+        return child
+    return copy_with_children(operator, children)
+
+
+def push_down_restriction(operator, condition):
+    if isinstance(operator, (Join, CartesianProduct)):
+        sides = {a: side_attribute(operator, a) for a in condition.attribute_names}
+        if all(side is operator.left for side, _ in sides.values()):
+            left = push_down_restriction(operator.left, condition.renamed(
+                {a: side_attribute_name for a, (_, side_attribute_name) in sides.items()}))
+            return copy_with_children(operator, [left, operator.right])
+        if all(side is operator.right for side, _ in sides.values()):
+            right = push_down_restriction(operator.right, condition.renamed(
+                {a: side_attribute_name for a, (_, side_attribute_name) in sides.items()}))
+            return copy_with_children(operator, [operator.left, right])
+        if isinstance(operator, CartesianProduct) and isinstance(condition, Comparison) and condition.operator == '=':
+            # σ a = b (R X S) is the equi-join R ⋈ S | a = b
+            left_side, left_attribute = sides[condition.attribute_name]
+            _, right_attribute = sides[condition.compared_attribute_name]
+            if left_side is not operator.left:
+                left_attribute, right_attribute = right_attribute, left_attribute
+            return Join(operator.left, operator.right, left_attribute, right_attribute, operator.attributes)
+    elif isinstance(operator, (Union, Intersection, Difference)):
+        right_names = dict(zip(operator.attributes, operator.right.attributes))
+        left = push_down_restriction(operator.left, condition)
+        right = push_down_restriction(operator.right, condition.renamed(right_names))
+        return copy_with_children(operator, [left, right])
+    elif isinstance(operator, Project):
+        child_names = dict(zip(operator.attributes, operator.columns))
+        child = push_down_restriction(operator.child, condition.renamed(child_names))
+        return copy_with_children(operator, [child])
+    elif isinstance(operator, Aggregate) and condition.attribute_names <= set(operator.group_columns):
+        # a condition on the grouping attributes keeps or removes whole groups
+        return copy_with_children(operator, [push_down_restriction(operator.child, condition)])
+    elif isinstance(operator, (SemiJoin, Division)):
+        # the tuples of a semi-join are tuples of its left input, the quotient tuples of a division are parts of
+        # the tuples of the dividend
+        return copy_with_children(operator, [push_down_restriction(operator.left, condition), operator.right])
+    elif isinstance(operator, Restrict):
+        # the restriction already pushed down stays over whatever the condition reaches below it. The conjuncts
+        # stopped at the same input are a single restriction, the sorted index of a scanned relation can then answer
+        # any of them and the others are evaluated on the tuples it finds
+        child = push_down_restriction(operator.child, condition)
+        if isinstance(child, Restrict) and child.child is operator.child:
+            return Restrict(operator.child, Conjunction(operator.condition.conjuncts() + child.condition.conjuncts()))
+        return Restrict(child, operator.condition)
+    return Restrict(operator, condition)
+
+
+def collect_join_region(operator, offset, leaves, conditions):
+    # flattens a tree of joins and products, columns are identified by their position in the tree output
+    if isinstance(operator, (Join, CartesianProduct)):
+        right_offset = offset + len(operator.left.attributes)
+        collect_join_region(operator.left, offset, leaves, conditions)
+        collect_join_region(operator.right, right_offset, leaves, conditions)
+        if isinstance(operator, Join):
+            conditions.append((offset + operator.left.attributes.index(operator.left_attribute),
+                               right_offset + operator.right.attributes.index(operator.right_attribute)))
+    else:
+        leaves.append((offset, order_joins(operator)))
+
+
+def order_joins(operator):
+    if not isinstance(operator, (Join, CartesianProduct)):
+        return copy_with_children(operator, [order_joins(child) for child in operator.children])
+
+    leaves, conditions = [], []
+    collect_join_region(operator, 0, leaves, conditions)
+    if len(leaves) < 3:
+        return copy_with_children(operator, [order_joins(child) for child in operator.children])
+
+    def column_name(position):
+        return f'#{position}'
+
+    def leaf_positions(leaf):
+        offset, leaf_operator = leaf
+        return list(range(offset, offset + len(leaf_operator.attributes)))
+
+    def leaf_attribute(leaf, position):
+        offset, leaf_operator = leaf
+        return leaf_operator.attributes[position - offset]
+
+    # greedy ordering: start with the smallest input and always add the input giving the smallest estimated result,
+    # inputs connected by a join condition are preferred over cartesian products
+    remaining = sorted(leaves, key=lambda leaf: leaf[1].estimated_cardinality())
+    first = remaining.pop(0)
+    current, current_positions = first[1], leaf_positions(first)
+    current_names = dict(zip(current_positions, current.attributes))
+    conditions = list(conditions)
+    while remaining:
+        candidates = []
+        for leaf in remaining:
+            positions = set(leaf_positions(leaf))
+            leaf_conditions = [(p, q) if q in positions else (q, p) for p, q in conditions if
+                               (p in positions) != (q in positions) and
+                               (p in current_names or q in current_names)]
+            attributes = [column_name(p) for p in current_positions + leaf_positions(leaf)]
+            if leaf_conditions:
+                current_position, leaf_position = leaf_conditions[0]
+                candidate = Join(current, leaf[1], current_names[current_position],
+                                 leaf_attribute(leaf, leaf_position), attributes)
+            else:
+                candidate = CartesianProduct(current, leaf[1], attributes)
+            candidates.append((not leaf_conditions, candidate.estimated_cardinality(), leaf, leaf_conditions,
+                               candidate))
+        _, _, leaf, leaf_conditions, current = min(candidates, key=lambda candidate: candidate[:2])
+        remaining.remove(leaf)
+        current_positions = current_positions + leaf_positions(leaf)
+        current_names = {p: column_name(p) for p in current_positions}
+        for current_position, leaf_position in leaf_conditions[1:]:
+            current = Restrict(current, Comparison(column_name(current_position), '=',
+                                                   compared_attribute_name=column_name(leaf_position)))
+        conditions = [c for c in conditions if c not in leaf_conditions and (c[1], c[0]) not in leaf_conditions]
+
+    return Project(current, [current_names[p] for p in range(len(operator.attributes))], operator.attributes,
+                   distinct=False)
+
+
+def push_down_projections(operator):
+    if isinstance(operator, Project) and operator.distinct:
+        return Project(prune_columns(operator.child, set(operator.columns)), operator.columns, operator.attributes)
+    return copy_with_children(operator, [push_down_projections(child) for child in operator.children])
+
+
+def prune_columns(operator, needed):
+    # below a distinct projection, duplicates do not matter and unneeded columns can be dropped early
+    if isinstance(operator, (Join, CartesianProduct)):
+        left_needed, right_needed = set(), set()
+        for a in needed:
+            side, side_attribute_name = side_attribute(operator, a)
+            (left_needed if side is operator.left else right_needed).add(side_attribute_name)
+        if isinstance(operator, Join):
+            left_needed.add(operator.left_attribute)
+            right_needed.add(operator.right_attribute)
+        left = prune_input(operator.left, left_needed)
+        right = prune_input(operator.right, right_needed)
+        attributes = [a for a in operator.attributes if side_attribute(operator, a)[1] in
+                      (left_needed if side_attribute(operator, a)[0] is operator.left else right_needed)]
+        return copy_with_children(copy_with_attributes(operator, attributes), [left, right])
+    elif isinstance(operator, SemiJoin):
+        # only the join values of the right input are read
+        left = prune_input(operator.left, needed | {operator.left_attribute})
+        right = prune_input(operator.right, {operator.right_attribute})
+        return copy_with_children(operator, [left, right])
+    elif isinstance(operator, Restrict):
+        return Restrict(prune_columns(operator.child, needed | operator.condition.attribute_names),
+                        operator.condition)
+    elif isinstance(operator, Project):
+        kept = [(c, a) for c, a in zip(operator.columns, operator.attributes) if a in needed]
+        return Project(prune_columns(operator.child, {c for c, _ in kept}), [c for c, _ in kept],
+                       [a for _, a in kept], operator.distinct)
+    return push_down_projections(operator)
+
+
+def prune_input(operator, needed):
+    operator = prune_columns(operator, needed)
+    if len(needed) < len(operator.attributes):
+        return Project(operator, [a for a in operator.attributes if a in needed], distinct=False)
+    return operator
+
+
+def copy_with_attributes(operator, attributes):
+    if isinstance(operator, Join):
+        return Join(operator.left, operator.right, operator.left_attribute, operator.right_attribute, attributes)
+    return CartesianProduct(operator.left, operator.right, attributes)
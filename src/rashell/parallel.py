@@ -0,0 +1,211 @@
+import marshal
+from itertools import compress
+
+from rashell.join_algorithms import hash_join
+from rashell.operators import Scan, Restrict, Join, CartesianProduct, BATCH_SIZE, indexed_conjunct
+from rashell.optimizer import copy_with_children
+
+MARSHAL_VERSION = 4
+# operators reading fewer tuples than that are executed in the main process
+DEFAULT_THRESHOLD = 100000
+
+# the process pool is started on first use and kept for the next queries
+pool = None
+pool_workers = 0
+
+
+def get_pool(workers):
+    global pool, pool_workers
+    if pool is None or pool_workers != workers:
+        from concurrent.futures import ProcessPoolExecutor
+
+        if pool is not None:
+            pool.shutdown()
+        pool = ProcessPoolExecutor(workers)
+        pool_workers = workers
+    return pool
+
+
+# tuples are moved between processes as whole partitions: marshaled once into a shared memory segment that the
+# other process maps, instead of being pickled one by one through a pipe
+def share(tuples):
+    from multiprocessing import shared_memory
+
+    data = marshal.dumps(tuples if isinstance(tuples, list) else list(tuples), MARSHAL_VERSION)
+    segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    segment.buf[:len(data)] = data
+    segment.close()
+    return segment.name, len(data)
+
+
+def read_shared(shared_tuples):
+    from multiprocessing import shared_memory
+
+    name, size = shared_tuples
+    segment = shared_memory.SharedMemory(name)
+    with segment.buf[:size] as data:
+        tuples = marshal.loads(data)
+    segment.close()
+    return tuples
+
+
+def unlink(shared_tuples):
+    from multiprocessing import shared_memory
+
+    segment = shared_memory.SharedMemory(shared_tuples[0])
+    segment.close()
+    segment.unlink()
+
+
+class SharedInputs:
+    # segments of the inputs of the tasks of an operator, removed once its tuples are read or the reading stopped
+    def __init__(self):
+        self.segments = []
+
+    def share(self, tuples):
+        shared_tuples = share(tuples)
+        self.segments.append(shared_tuples)
+        return shared_tuples
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        for shared_tuples in self.segments:
+            unlink(shared_tuples)
+
+
+# tasks executed by the workers, each one returns its result in a new shared memory segment
+def restrict_partition(shared_tuples, condition, attributes):
+    tuples = read_shared(shared_tuples)
+    kernel = condition.compile(attributes)
+    restricted_tuples = []
+    for start in range(0, len(tuples), BATCH_SIZE):
+        batch = tuples[start:start + BATCH_SIZE]
+        restricted_tuples.extend(compress(batch, kernel(batch)))
+    return share(restricted_tuples)
+
+
+def join_partition(shared_left_tuples, shared_right_tuples, left_index, right_index):
+    left_tuples = read_shared(shared_left_tuples)
+    right_tuples = read_shared(shared_right_tuples)
+    return share(hash_join(left_tuples, right_tuples, left_index, right_index))
+
+
+def product_partition(shared_left_tuples, shared_right_tuples):
+    left_tuples = read_shared(shared_left_tuples)
+    right_tuples = read_shared(shared_right_tuples)
+    return share([l_tuple + r_tuple for l_tuple in left_tuples for r_tuple in right_tuples])
+
+
+def run_tasks(workers, task, task_arguments):
+    # yields the tuples of the results of the tasks as they are completed. The segments of the results that are not
+    # read when the iteration is stopped early are removed
+    from concurrent.futures import as_completed
+
+    futures = [get_pool(workers).submit(task, *arguments) for arguments in task_arguments]
+    read_futures = set()
+    try:
+        for future in as_completed(futures):
+            read_futures.add(future)
+            shared_result = future.result()
+            try:
+                tuples = read_shared(shared_result)
+            finally:
+                unlink(shared_result)
+            yield from tuples
+    finally:
+        for future in futures:
+            if future not in read_futures and not future.cancel() and not future.exception():
+                unlink(future.result())
+
+
+def chunks(tuples, count):
+    tuples = list(tuples)
+    size = -(-len(tuples) // count)
+    return [tuples[start:start + size] for start in range(0, len(tuples), max(size, 1))]
+
+
+def hash_partitions(tuples, index, count):
+    partitions = [[] for _ in range(count)]
+    for t in tuples:
+        partitions[hash(t[index]) % count].append(t)
+    return partitions
+
+
+class ParallelRestrict(Restrict):
+    # the tuples are split in as many chunks as workers, each one restricted by a worker
+    def __init__(self, child, condition, workers):
+        super().__init__(child, condition)
+        self.workers = workers
+
+    def matching_tuples(self):
+        with SharedInputs() as inputs:
+            shared_chunks = [inputs.share(chunk) for chunk in chunks(self.child, self.workers)]
+            yield from run_tasks(self.workers, restrict_partition,
+                                 [(shared_chunk, self.condition, self.attributes) for shared_chunk in shared_chunks])
+
+    def algorithm(self):
+        return f'parallel batch filter, {self.workers} workers'
+
+
+class ParallelJoin(Join):
+    # both inputs are partitioned by the hash of their join value, matching tuples are in partitions of the same
+    # number and each pair of partitions is joined by a worker
+    def __init__(self, left, right, left_attribute, right_attribute, attributes, workers):
+        super().__init__(left, right, left_attribute, right_attribute, attributes)
+        self.workers = workers
+
+    def __iter__(self):
+        left_index = self.left.attributes.index(self.left_attribute)
+        right_index = self.right.attributes.index(self.right_attribute)
+        with SharedInputs() as inputs:
+            shared_left = [inputs.share(p) for p in hash_partitions(self.left, left_index, self.workers)]
+            shared_right = [inputs.share(p) for p in hash_partitions(self.right, right_index, self.workers)]
+            yield from run_tasks(self.workers, join_partition, [(left, right, left_index, right_index) for
+                                                                left, right in zip(shared_left, shared_right)])
+
+    def algorithm(self):
+        return f'partitioned hash join, {self.workers} workers'
+
+
+class ParallelCartesianProduct(CartesianProduct):
+    # the largest input is split in chunks, the other one is shared once with every worker
+    def __init__(self, left, right, attributes, workers):
+        super().__init__(left, right, attributes)
+        self.workers = workers
+
+    def __iter__(self):
+        split_left = self.left.estimated_cardinality() >= self.right.estimated_cardinality()
+        with SharedInputs() as inputs:
+            shared_chunks = [inputs.share(chunk) for chunk in
+                             chunks(self.left if split_left else self.right, self.workers)]
+            shared_other = inputs.share(self.right if split_left else self.left)
+            yield from run_tasks(self.workers, product_partition, [
+                (shared_chunk, shared_other) if split_left else (shared_other, shared_chunk) for
+                shared_chunk in shared_chunks])
+
+    def algorithm(self):
+        return f'parallel nested loops, {self.workers} workers'
+
+
+def parallelize(operator, workers, threshold=DEFAULT_THRESHOLD):
+    # replaces the joins, products and restrictions of a plan reading at least threshold tuples by their parallel
+    # versions
+    children = [parallelize(child, workers, threshold) for child in operator.children]
+    if isinstance(operator, Join):
+        # joins merging the sorted indexes of their inputs are faster in the main process
+        if operator.left.estimated_cardinality() + operator.right.estimated_cardinality() >= threshold and \
+                not operator.sorted_inputs():
+            return ParallelJoin(children[0], children[1], operator.left_attribute, operator.right_attribute,
+                                operator.attributes, workers)
+    elif isinstance(operator, CartesianProduct):
+        if operator.estimated_cardinality() >= threshold:
+            return ParallelCartesianProduct(children[0], children[1], operator.attributes, workers)
+    elif isinstance(operator, Restrict):
+        # restrictions answered by an index or column by column are faster in the main process
+        scan = operator.child if isinstance(operator.child, Scan) else None
+        if operator.child.estimated_cardinality() >= threshold and not (
+                scan and (scan.relation.columnar or indexed_conjunct(operator))):
+            return ParallelRestrict(children[0], operator.condition, workers)
+    return copy_with_children(operator, children)
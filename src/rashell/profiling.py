@@ -0,0 +1,154 @@
+import time
+from contextlib import contextmanager
+
+from rashell.aggregation import format_aggregate
+from rashell.operators import Scan, Restrict, Project, Aggregate, Join, SemiJoin, BinaryOperator
+
+
+class CommandProfile:
+    # what a command cost, reported by .timing and given to the profile hooks of the engine. Tuples are computed
+    # while they are rendered, the time spent producing them is counted in execute_seconds and not in render_seconds
+    def __init__(self, text):
+        self.text = text
+        self.instruction = None
+        self.parse_seconds = 0.0
+        self.execute_seconds = 0.0
+        self.render_seconds = 0.0
+        # bytes allocated at most during the command, None when memory is not traced
+        self.peak_memory = None
+        # OperatorProfile of each operator of the query, for EXPLAIN ANALYZE and the hooks asking for them
+        self.operators = []
+        self.error = None
+
+
+class OperatorProfile:
+    def __init__(self, depth, label, algorithm, estimated_rows, input_rows=None, output_rows=None, seconds=None,
+                 self_seconds=None):
+        # the rows and times are None for an operator whose tuples were not read, for example a scan answered by an
+        # index or a query answered by the cache
+        self.depth = depth
+        self.label = label
+        self.algorithm = algorithm
+        self.estimated_rows = estimated_rows
+        self.input_rows = input_rows
+        self.output_rows = output_rows
+        self.seconds = seconds
+        self.self_seconds = self_seconds
+
+
+class OperatorStatistics:
+    def __init__(self):
+        self.read = False
+        self.rows = 0
+        self.seconds = 0.0
+
+
+class TimedTuples:
+    # iterator adding up the time spent producing the tuples
+    def __init__(self, tuples):
+        self.tuples = iter(tuples)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.tuples)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+@contextmanager
+def traced_memory(profile, enabled):
+    # tracemalloc slows Python allocations down, it only runs during the commands whose memory is asked for
+    if not enabled:
+        yield
+        return
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    initial_memory = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        profile.peak_memory = max(tracemalloc.get_traced_memory()[1] - initial_memory, 0)
+        if started:
+            tracemalloc.stop()
+
+
+# analyzed operators are instances of subclasses of their class counting their tuples and the time spent producing
+# them, their algorithms and the isinstance checks of the other operators do not change
+analyzed_classes = {}
+
+
+def analyzed_class(operator_class):
+    if operator_class not in analyzed_classes:
+        def analyzed_tuples(operator):
+            statistics = operator.statistics
+            statistics.read = True
+            start = time.perf_counter()
+            tuples = iter(operator_class.__iter__(operator))
+            statistics.seconds += time.perf_counter() - start
+            while True:
+                start = time.perf_counter()
+                try:
+                    t = next(tuples)
+                except StopIteration:
+                    return
+                finally:
+                    statistics.seconds += time.perf_counter() - start
+                statistics.rows += 1
+                yield t
+
+        analyzed_classes[operator_class] = type(operator_class.__name__, (operator_class,),
+                                                {'__iter__': analyzed_tuples})
+    return analyzed_classes[operator_class]
+
+
+def analyze(plan):
+    # instruments every operator of a plan built for a single query
+    for child in plan.children:
+        analyze(child)
+    plan.__class__ = analyzed_class(type(plan))
+    plan.statistics = OperatorStatistics()
+    return plan
+
+
+def operator_label(operator):
+    if isinstance(operator, Scan):
+        return operator.relation.name
+    elif isinstance(operator, Restrict):
+        return f'σ {operator.condition}'
+    elif isinstance(operator, Project):
+        return 'π ' + ', '.join(c if c == a else f'{c}→{a}' for c, a in zip(operator.columns, operator.attributes))
+    elif isinstance(operator, Aggregate):
+        aggregates = [format_aggregate(function, attribute_name) for function, attribute_name in operator.aggregates]
+        return f'γ {", ".join(operator.group_columns)}; {", ".join(aggregates)}'
+    elif isinstance(operator, (Join, SemiJoin)):
+        return f'{operator.symbol} {operator.left_attribute} = {operator.right_attribute}'
+    elif isinstance(operator, BinaryOperator):
+        return operator.symbol
+    return type(operator).__name__
+
+
+def operator_profiles(plan, depth=0):
+    # the operators of a plan from the root to the leaves, analyzed or not
+    profile = OperatorProfile(depth, operator_label(plan), plan.algorithm(), plan.estimated_cardinality())
+    statistics = getattr(plan, 'statistics', None)
+    if statistics and statistics.read:
+        children_statistics = [child.statistics for child in plan.children]
+        profile.output_rows = statistics.rows
+        profile.seconds = statistics.seconds
+        profile.self_seconds = statistics.seconds - sum(s.seconds for s in children_statistics)
+        if plan.children and all(s.read for s in children_statistics):
+            profile.input_rows = sum(s.rows for s in children_statistics)
+    profiles = [profile]
+    for child in plan.children:
+        profiles.extend(operator_profiles(child, depth + 1))
+    return profiles
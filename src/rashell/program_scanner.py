@@ -0,0 +1,68 @@
+import re
+
+# same tokens as the textX ID, STRICTFLOAT, INT and STRING rules used by the grammar
+ID = r'[^\d\W]\w*'
+STRICTFLOAT = r'[+-]?(?:(?:(?:\d+\.(?:\d*)?|\.\d+)(?:[eE][+-]?\d+)?)|(?:\d+[eE][+-]?\d+))(?<=[\w.])(?![\w.])'
+INT = r'[-+]?[0-9]+'
+STRING = r'"(?:\\"|[^"])*"|\'(?:\\\'|[^\'])*\''
+
+INSERT_PATTERN = re.compile(r'\s*({})\s*\.\s*(insert|force_insert)\s*\((.*)\)\s*$'.format(ID))
+VALUE_PATTERN = re.compile(r'\s*(?:({})|({})|({}))\s*'.format(STRICTFLOAT, INT, STRING))
+VALUE = r'\s*(?:{}|{}|{})\s*'.format(STRICTFLOAT, INT, STRING)
+VALUES_PATTERN = re.compile(r'{0}(?:,{0})*'.format(VALUE))
+
+CHUNK_SIZE = 10000
+
+
+def scan_values(text):
+    if not VALUES_PATTERN.fullmatch(text):
+        return None
+    values = []
+    for strict_float, integer, string in VALUE_PATTERN.findall(text):
+        if integer:
+            values.append(int(integer))
+        elif strict_float:
+            values.append(float(strict_float))
+        else:
+            values.append(string[1:-1].replace(r'\"', '"').replace(r"\'", "'"))
+    return values
+
+
+def scan_insert(line_text):
+    match = INSERT_PATTERN.match(line_text)
+    if not match:
+        return None
+    values = scan_values(match.group(3))
+    if values is None:
+        return None
+    return match.group(1), match.group(2), values
+
+
+def scan_program(file_name):
+    # yields, in file order, blocks of text to be parsed by textX as (first line, text) and chunks of
+    # single-line inserts as lists of (line, relation name, insert type, values)
+    text_lines = []
+    text_first_line = 1
+    inserts = []
+    with open(file_name) as f:
+        for line_number, line_text in enumerate(f, start=1):
+            insert = scan_insert(line_text)
+            if insert:
+                if text_lines:
+                    yield text_first_line, ''.join(text_lines)
+                    text_lines = []
+                inserts.append((line_number,) + insert)
+                if len(inserts) == CHUNK_SIZE:
+                    yield inserts
+                    inserts = []
+            elif line_text.strip() or text_lines:
+                if inserts:
+                    yield inserts
+                    inserts = []
+                if not text_lines:
+                    text_first_line = line_number
+                text_lines.append(line_text)
+    if text_lines:
+        yield text_first_line, ''.join(text_lines)
+    if inserts:
+        yield inserts
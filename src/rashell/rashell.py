@@ -1,25 +1,120 @@
+import argparse
 import sys
 
-from prompt_toolkit import PromptSession, HTML
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.key_binding import KeyBindings
-from rich import print
-from rich.text import Text
 from textx import TextXError
 
 from rashell.exceptions import RashellException
-from rashell.relational_engine import RelationalEngine
+from rashell.journal import FSYNC_POLICIES, FSYNC_ALWAYS
+from rashell.relational_engine import RelationalEngine, DEFAULT_CACHE_SIZE
+from rashell.rendering import OUTPUT_MODES
 
 
 def main():
+    if sys.argv[1:2] == ['serve']:
+        serve(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(prog='rashell', description='Relational Algebra Shell',
+                                     epilog='rashell serve shares a relational model with the clients of a socket, '
+                                            'see rashell serve --help')
+    add_engine_arguments(parser)
+    parser.add_argument('-c', '--commands', help='commands to run, one per line, instead of the interactive shell')
+    parser.add_argument('-f', '--script',
+                        help="file of commands to run, one per line, instead of the interactive shell ('-' reads "
+                             "them from the standard input, as when it is not a terminal)")
+    parser.add_argument('--output', choices=OUTPUT_MODES,
+                        help='format of the results (default: table in the interactive shell, csv otherwise)')
+    arguments = parser.parse_args()
+    batch = arguments.commands is not None or arguments.script is not None or not sys.stdin.isatty()
+
+    engine = open_engine(arguments)
+    engine.output_mode = arguments.output or ('csv' if batch else 'table')
+    try:
+        if batch:
+            run_script(engine, arguments.commands, arguments.script)
+        else:
+            run_repl(engine)
+    finally:
+        engine.close_journal()
+
+
+def serve(args):
+    from rashell.server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_CONNECTIONS, DEFAULT_THREADS, run_server
+
+    parser = argparse.ArgumentParser(prog='rashell serve',
+                                     description='Shares a relational model with the clients of a local socket')
+    add_engine_arguments(parser)
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address listened to (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port (default: %(default)s)')
+    parser.add_argument('--socket', help='Unix socket listened to instead of a TCP port')
+    parser.add_argument('--max-connections', type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help='clients connected at the same time (default: %(default)s)')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help='threads running the commands of the clients (default: %(default)s)')
+    arguments = parser.parse_args(args)
+
+    engine = open_engine(arguments)
+    try:
+        run_server(engine, arguments.host, arguments.port, arguments.socket, arguments.threads,
+                   arguments.max_connections)
+    except OSError as e:
+        sys.exit(str(e))
+    finally:
+        engine.close_journal()
+
+
+def add_engine_arguments(parser):
+    parser.add_argument('file', nargs='?', help='file defining and populating a relational model')
+    parser.add_argument('-s', '--snapshot', help='snapshot saved with .save to open before the file')
+    parser.add_argument('-j', '--journal', help='journal restoring the previous state and recording every change')
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_ALWAYS,
+                        help='when journal writes are synced to the disk (default: %(default)s)')
+    parser.add_argument('--fsync-interval', type=float, default=1.0,
+                        help='seconds between two syncs with --fsync interval (default: %(default)s)')
+    parser.add_argument('--storage', choices=['rows', 'columns'], default='rows',
+                        help='storage layout of the tuples (default: %(default)s)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help='MiB of memory used to cache query results, 0 disables the cache (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes running large joins, products and restrictions (default: %(default)s)')
+
+
+def open_engine(arguments):
     engine = RelationalEngine()
-    if len(sys.argv) > 1:
-        try:
-            engine.open_from_file(sys.argv[1])
-        except TextXError as e:
-            sys.exit('Line {}: {}'.format(e.line, e.message))
-        except Exception as e:
-            sys.exit(str(e))
+    engine.set_columnar_storage(arguments.storage == 'columns')
+    engine.result_cache.set_memory_limit(arguments.cache_size << 20)
+    engine.workers = max(arguments.workers, 1)
+    try:
+        if arguments.snapshot:
+            engine.open_snapshot(arguments.snapshot)
+        if arguments.journal:
+            engine.open_journal(arguments.journal, arguments.fsync, arguments.fsync_interval)
+        if arguments.file:
+            engine.open_from_file(arguments.file)
+    except TextXError as e:
+        sys.exit('Line {}: {}'.format(e.line, e.message))
+    except Exception as e:
+        sys.exit(str(e))
+    return engine
+
+
+def run_script(engine, commands, script):
+    from rashell.batch import command_lines, run_batch
+
+    try:
+        run_batch(engine, command_lines(commands, None if script in (None, '-') else script, sys.stdin))
+    except TextXError as e:
+        sys.exit('Line {}: {}'.format(e.line, e.message))
+    except (RashellException, OSError) as e:
+        sys.exit(str(e))
+
+
+def run_repl(engine):
+    # the interactive stack is the slowest part of the startup, it is only imported when needed
+    from prompt_toolkit import PromptSession, HTML
+    from prompt_toolkit.completion import WordCompleter
+    from prompt_toolkit.key_binding import KeyBindings
+    from rich import print
+    from rich.text import Text
 
     bindings = KeyBindings()
 
@@ -36,11 +131,16 @@ def main():
         return HTML(' | '.join([operations_hint, multiline_hint]))
 
     operation_completer = WordCompleter(
-        words=["⋈", "σ", "π", "U", "∩", "-", "X"],
+        words=["⋈", "⋉", "▷", "÷", "σ", "π", "γ", "U", "∩", "-", "X"],
         meta_dict={
             "⋈": HTML('Join <style fg="ansigray">(<b>Syntax:</b> <i>R</i> ⋈ <i>S</i> | <i>condition</i>)</style>'),
+            "⋉": HTML('Semi-join <style fg="ansigray">(<b>Syntax:</b> <i>R</i> ⋉ <i>S</i> | <i>condition</i>)</style>'),
+            "▷": HTML('Anti-join <style fg="ansigray">(<b>Syntax:</b> <i>R</i> ▷ <i>S</i> | <i>condition</i>)</style>'),
+            "÷": HTML('Division <style fg="ansigray">(<b>Syntax:</b> <i>R</i> ÷ <i>S</i>)</style>'),
             "σ": HTML('Restriction <style fg="ansigray">(<b>Syntax:</b> σ <i>condition</i> (<i>R</i>))</style>'),
             "π": HTML('Projection <style fg="ansigray">(<b>Syntax:</b> π <i>columns</i> (<i>R</i>))</style>'),
+            "γ": HTML('Aggregation <style fg="ansigray">(<b>Syntax:</b> γ <i>columns</i>; <i>aggregates</i> (<i>R</i>))'
+                      '</style>'),
             "U": HTML('Union <style fg="ansigray">(<b>Syntax:</b> <i>R</i> U <i>S</i>)</style>'),
             "∩": HTML('Intersection <style fg="ansigray">(<b>Syntax:</b> <i>R</i> ∩ <i>S</i>)</style>'),
             "-": HTML('Difference <style fg="ansigray">(<b>Syntax:</b> <i>R</i> - <i>S</i>)</style>'),
@@ -66,7 +166,7 @@ def main():
     while True:
         try:
             text = session.prompt()
-            engine.instruction_mm.model_from_str(text)
+            engine.execute(text)
         except KeyboardInterrupt:
             continue
         except EOFError:
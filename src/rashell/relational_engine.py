@@ -1,11 +1,11 @@
 import os
 import sys
+import time
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
 
-from rich import box, print
-from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
-from textx import metamodel_from_file, textx_isinstance, get_location
+from textx import TextXError, textx_isinstance, get_location
 
 from rashell.exceptions import DuplicateRelationDefinitionException, DuplicateAttributesException, \
     ForeignKeyNotExplainedException, ForeignKeyNotDefinedException, ReferencedRelationNotDefinedException, \
@@ -13,46 +13,192 @@ from rashell.exceptions import DuplicateRelationDefinitionException, DuplicateAt
     PrimaryKeyConstraintFailed, ForeignKeyConstaintFailedException, ProjectionColumnsNotDefinedException, \
     RestrictionColumnNotDefinedException, JoinColumnNotDefinedException, UnionRelationsHavingDifferentNumberOfAttribute, \
     RestrictionRelationsHavingDifferentNumberOfAttribute, DifferenceRelationsHavingDifferentNumberOfAttribute, \
-    RelationAlreadyExistsException, DeleteColumnNotDefinedException
+    RelationAlreadyExistsException, DeleteColumnNotDefinedException, SnapshotFileNotFoundException, \
+    InvalidSnapshotException, SnapshotNotSavedException, JournalNotOpenedException, IndexColumnNotDefinedException, \
+    RecursiveViewException, AggregationColumnsNotDefinedException, DivisionRelationsHavingIncompatibleAttributes, \
+    TransactionAlreadyOpenException, NoTransactionOpenException, CommandInTransactionException
+from rashell.catalog import Catalog
+from rashell.conditions import condition_from_model
+from rashell.grammar import get_metamodel
+from rashell.journal import Journal, FSYNC_ALWAYS, checkpoint_file_name, read_records
+from rashell.operators import Scan, Project, Restrict, Join, Union, Intersection, Difference, CartesianProduct, \
+    Aggregate, SemiJoin, AntiJoin, Division, base_relation_names, scans
+from rashell.loader import load_relation, read_tuples
+from rashell.optimizer import optimize
+from rashell.parallel import DEFAULT_THRESHOLD, parallelize
+from rashell.profiling import CommandProfile, TimedTuples, traced_memory, analyze, operator_profiles
+from rashell.program_scanner import scan_program
+from rashell.rendering import limited_tuples, render_tuples
+from rashell.result_cache import ResultCache
 from rashell.relational_model import Relation, Attribute
+from rashell.snapshot import read_snapshot, write_snapshot, relation_schema, relation_from_schema
+from rashell.transaction import Transaction
+from rashell.views import MaterializedView
+
+
+# memory used by cached query results by default, in MiB
+DEFAULT_CACHE_SIZE = 64
+# parsed commands kept to run the same commands again without parsing them
+PARSE_CACHE_SIZE = 1024
 
 
 class RelationalEngine:
     def __init__(self):
-        self.relations = set()
-        self.instruction_mm = metamodel_from_file(os.path.join(os.path.dirname(__file__),
-                                                               'grammar_files/rashell_grammar.tx'),
-                                                  classes=[Relation])
-        self.instruction_mm.register_obj_processors({
+        self.relations = Catalog()
+        self.views = {}
+        self.result_cache = ResultCache(DEFAULT_CACHE_SIZE << 20)
+        # rendering of relations and query results, see rendering.py
+        self.output_mode = 'table'
+        self.row_limit = None
+        self.row_offset = 0
+        self.pager = False
+        # joins, products and restrictions reading at least parallel_threshold tuples are run by a pool of workers
+        self.workers = 1
+        self.parallel_threshold = DEFAULT_THRESHOLD
+        self.optimize_queries = True
+        # .timing reports the cost of every command, the profile hooks receive it, see profiling.py
+        self.timing = False
+        self.profile_hooks = []
+        self.profile = None
+        self.journal = None
+        # changes staged between BEGIN and COMMIT, see transaction.py
+        self.transaction = None
+        self.instruction_mm = get_metamodel('rashell_grammar.tx')
+        self.parsed_instructions = OrderedDict()
+        # added to the lines of the parsed commands, commands read from a script are parsed one by one
+        self.line_offset = 0
+        self.instruction_processors = {
             'PartialRelationalModel': self.process_partial_relational_model,
             'Insert': self.process_insert,
             'PrintRelation': self.print_relation,
             'PrintModel': self.print_model,
+            'PrintStatistics': self.print_statistics,
             'Operation': self.process_operation,
             'Delete': self.process_delete,
+            'Load': self.process_load,
+            'Save': self.process_save,
+            'Open': self.process_open,
+            'Checkpoint': self.process_checkpoint,
+            'Storage': self.process_storage,
+            'CreateIndex': self.process_create_index,
+            'PrintIndexes': self.print_indexes,
+            'Cache': self.process_cache,
+            'RowLimit': self.process_row_limit,
+            'Output': self.process_output,
+            'Pager': self.process_pager,
+            'Workers': self.process_workers,
+            'Timing': self.process_timing,
+            'Explain': self.process_explain,
+            'Transaction': self.process_transaction,
             'Exit': self.process_exit
-        })
+        }
+
+    def execute(self, text, line=1):
+        # line is the line of the command in its script, for the error messages
+        self.line_offset = line - 1
+        try:
+            if not self.timing and not self.profile_hooks:
+                self.process_instruction(self.parse_instruction(text))
+                return
+
+            self.profile = profile = CommandProfile(text)
+            try:
+                with traced_memory(profile, self.timing or any(memory for _, _, memory in self.profile_hooks)):
+                    start = time.perf_counter()
+                    instruction = self.parse_instruction(text)
+                    profile.parse_seconds = time.perf_counter() - start
+                    self.process_instruction(instruction)
+                    profile.execute_seconds = time.perf_counter() - start - profile.parse_seconds - \
+                        profile.render_seconds
+            except BaseException as e:
+                profile.error = e
+                raise
+            finally:
+                self.profile = None
+                self.report_profile(profile)
+        finally:
+            self.line_offset = 0
+
+    def parse_instruction(self, text):
+        # models are not changed by the processors and can be run again, except relation definitions which become
+        # the relations of the model
+        instruction = self.parsed_instructions.get(text)
+        if instruction is not None:
+            self.parsed_instructions.move_to_end(text)
+            return instruction
+        try:
+            instruction = self.instruction_mm.model_from_str(text)
+        except TextXError as e:
+            e.line += self.line_offset
+            raise
+        if not textx_isinstance(instruction, self.instruction_mm['PartialRelationalModel']):
+            self.parsed_instructions[text] = instruction
+            if len(self.parsed_instructions) > PARSE_CACHE_SIZE:
+                self.parsed_instructions.popitem(last=False)
+        return instruction
+
+    def line_number(self, model):
+        return get_location(model)['line'] + self.line_offset
+
+    def add_profile_hook(self, hook, operators=False, memory=False):
+        # hook(profile) is called with the CommandProfile of every command executed. With operators, queries are
+        # run with analyzed operators and profile.operators is filled as with EXPLAIN ANALYZE, with memory the
+        # allocations of the commands are traced
+        self.profile_hooks.append((hook, operators, memory))
+
+    def remove_profile_hook(self, hook):
+        self.profile_hooks = [profile_hook for profile_hook in self.profile_hooks if profile_hook[0] != hook]
+
+    def report_profile(self, profile):
+        if self.timing and profile.error is None:
+            from rich import print
+
+            print('[dim]Parse {:.1f} ms, execute {:.1f} ms, render {:.1f} ms, peak memory {:.2f} MiB[/]'.format(
+                profile.parse_seconds * 1000, profile.execute_seconds * 1000, profile.render_seconds * 1000,
+                profile.peak_memory / (1 << 20)))
+        for hook, _, _ in self.profile_hooks:
+            hook(profile)
+
+    @staticmethod
+    def rule_name(instruction):
+        if isinstance(instruction, str):
+            # PrintModel, PrintIndexes, Checkpoint and Exit are match rules, textX gives the matched string instead
+            # of an object
+            return {'.exit': 'Exit', '.checkpoint': 'Checkpoint', '.indexes': 'PrintIndexes'}.get(
+                instruction, 'PrintModel')
+        return instruction.__class__.__name__
+
+    def process_instruction(self, instruction):
+        rule_name = self.rule_name(instruction)
+        if self.profile:
+            self.profile.instruction = rule_name
+        try:
+            self.instruction_processors[rule_name](instruction)
+        finally:
+            # what a failed instruction has already changed is journaled as well
+            self.commit_journal()
 
     def process_exit(self, exit):
         sys.exit('Goodbye!')
 
     def process_delete(self, delete):
-        line = get_location(delete)['line']
+        line = self.line_number(delete)
         r = self.get_relation_by_name(delete.relation_name)
         if not r:
             raise RelationNotFoundException(delete.relation_name, line)
 
-        if delete.condition.attribute_name not in {a.name for a in r.attributes}:
-            raise DeleteColumnNotDefinedException(delete.relation_name,
-                                                  delete.condition.attribute_name, line)
+        condition = condition_from_model(delete.condition)
+        unfound_delete_columns = condition.attribute_names - {a.name for a in r.attributes}
+        if unfound_delete_columns:
+            raise DeleteColumnNotDefinedException(delete.relation_name, ', '.join(sorted(unfound_delete_columns)),
+                                                  line)
 
-        for a in r.attributes:
-            if a.name == delete.condition.attribute_name:
-                break
-        index = r.attributes.index(a)
+        if self.transaction:
+            # foreign keys are checked at commit
+            self.transaction.delta(r).delete(condition, line, delete.delete_type == 'delete')
+            return
 
-        tuples_to_delete = {t for t in r.tuples if
-                            self.eval_condition(t[index], delete.condition.operator, delete.condition.value)}
+        tuples_to_delete = set(Restrict(Scan(r), condition))
 
         if delete.delete_type == 'delete':
             referencer_relations = {referencer_relation for referencer_relation in self.relations if
@@ -61,78 +207,390 @@ class RelationalEngine:
             for referencer_relation in referencer_relations:
                 for fk in referencer_relation.foreign_keys:
                     if fk.referenced_relation_name == delete.relation_name:
-                        for a in r.attributes:
-                            if a.name == fk.referenced_attribute_name:
-                                break
-                        referenced_attribute_index = r.attributes.index(a)
+                        referenced_attribute_index = r.attribute_position(fk.referenced_attribute_name)
                         referenced_attribute_values = {t[referenced_attribute_index] for t in tuples_to_delete}
-
-                        for a in referencer_relation.attributes:
-                            if a.name == fk.referencer_attribute_name:
-                                break
-                        referencer_attribute_index = referencer_relation.attributes.index(a)
-                        referencer_attribute_values = {t[referencer_attribute_index] for t in
-                                                       referencer_relation.tuples}
-                        intersection = referenced_attribute_values.intersection(referencer_attribute_values)
+                        intersection = {value for value in referenced_attribute_values if
+                                        referencer_relation.has_value(fk.referencer_attribute_name, value)}
                         if intersection:
                             raise ForeignKeyConstaintFailedException(intersection, line)
 
-        r.tuples.difference_update(tuples_to_delete)
+        r.remove_tuples(tuples_to_delete)
+        self.log('delete', r.name, list(tuples_to_delete))
+        self.propagate(r.name, (), tuples_to_delete)
+
+    def process_load(self, load, directory=''):
+        line = self.line_number(load)
+        r = self.get_relation_by_name(load.relation_name)
+        if not r:
+            raise RelationNotFoundException(load.relation_name, line)
+
+        if self.transaction:
+            delta = self.transaction.delta(r)
+            for t in read_tuples(r, os.path.join(directory, load.file_name), line):
+                delta.insert(t, line, load.load_type == '.load')
+            return
+
+        loaded_tuples = load_relation(r, os.path.join(directory, load.file_name), self.get_relation_by_name,
+                                      load.load_type == '.load', line)
+        self.log('insert', r.name, loaded_tuples)
+        self.propagate(r.name, loaded_tuples, ())
+
+    def process_save(self, save):
+        self.save_snapshot(save.file_name, self.line_number(save))
+
+    def process_open(self, open):
+        if self.transaction:
+            raise CommandInTransactionException('.open', self.line_number(open))
+        self.open_snapshot(open.file_name, self.line_number(open))
+
+    def save_snapshot(self, file_name, line=1):
+        try:
+            write_snapshot(self.relations, file_name, {name: view.definition for name, view in self.views.items()})
+        except OSError as e:
+            raise SnapshotNotSavedException(file_name, e.strerror or e, line)
+
+    def open_snapshot(self, file_name, line=1):
+        # the current relations are replaced by the ones of the snapshot
+        if not os.path.isfile(file_name):
+            raise SnapshotFileNotFoundException(file_name, line)
+        snapshot = read_snapshot(file_name)
+        if snapshot is None:
+            raise InvalidSnapshotException(file_name, line)
+        relations, view_definitions = snapshot
+        self.relations = Catalog(self.relations.columnar)
+        self.relations.update(relations)
+        # the versions of the opened relations do not tell whether they changed
+        self.result_cache.clear()
+        self.views = {}
+        for name, definition in view_definitions.items():
+            self.define_view(name, definition)
+        if self.journal:
+            # the journal does not record the opening, the opened state becomes its checkpoint
+            self.checkpoint()
+
+    def process_storage(self, storage):
+        self.set_columnar_storage(storage.storage_type == 'columns')
+
+    def set_columnar_storage(self, columnar):
+        self.relations.set_columnar(columnar)
+
+    def process_create_index(self, create_index):
+        line = self.line_number(create_index)
+        r = self.get_relation_by_name(create_index.relation_name)
+        if not r:
+            raise RelationNotFoundException(create_index.relation_name, line)
+        if create_index.attribute_name not in {a.name for a in r.attributes}:
+            raise IndexColumnNotDefinedException(r.name, create_index.attribute_name, line)
+
+        r.add_sorted_index(create_index.attribute_name)
+        self.log('index', r.name, create_index.attribute_name)
+
+    def open_journal(self, file_name, fsync=FSYNC_ALWAYS, fsync_interval=1.0):
+        # the state is restored from the last checkpoint and the records journaled since, then every change is
+        # journaled
+        if os.path.isfile(checkpoint_file_name(file_name)):
+            self.open_snapshot(checkpoint_file_name(file_name))
+        records, valid_size = read_records(file_name)
+        for record in records:
+            self.replay(record)
+        self.journal = Journal(file_name, valid_size, fsync, fsync_interval)
+
+    def replay(self, record):
+        # replaying records already held by the checkpoint (rashell stopped between writing the checkpoint and
+        # truncating the journal) gives the same state, relations are only created once
+        record_type, relation_name = record[0], record[1]
+        if record_type == 'relations':
+            self.add_relations([relation_from_schema(schema) for schema in record[1] if
+                                schema['name'] not in self.relations])
+        elif record_type == 'insert':
+            self.propagate(relation_name, self.get_relation_by_name(relation_name).add_tuples(record[2]), ())
+        elif record_type == 'delete':
+            self.propagate(relation_name, (), self.get_relation_by_name(relation_name).remove_tuples(record[2]))
+        elif record_type == 'view':
+            self.define_view(relation_name, record[2])
+        elif record_type == 'index':
+            self.get_relation_by_name(relation_name).add_sorted_index(record[2])
+        elif record_type == 'transaction':
+            for name, inserted, deleted in record[1]:
+                relation = self.get_relation_by_name(name)
+                self.propagate(name, relation.add_tuples(inserted), relation.remove_tuples(deleted))
+        elif record_type == 'assignment':
+            temp_relation = Relation(None, None, [Attribute(None, None, None, a) for a in record[2]], None)
+            temp_relation.tuples = set(record[3])
+            self.assign_relation(relation_name, temp_relation)
+
+    def log(self, *record):
+        if self.journal:
+            self.journal.append(record)
+
+    def commit_journal(self):
+        if self.journal:
+            self.journal.commit()
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def process_checkpoint(self, checkpoint):
+        if not self.journal:
+            raise JournalNotOpenedException()
+        self.checkpoint()
+
+    def checkpoint(self):
+        # compacts the journal: its records are replaced by a snapshot of the state
+        self.journal.commit()
+        self.save_snapshot(checkpoint_file_name(self.journal.file_name))
+        self.journal.truncate()
 
     def open_from_file(self, file_name):
-        self.program_mm = metamodel_from_file(os.path.join(os.path.dirname(__file__),
-                                                           'grammar_files/rashell_program_grammar.tx'),
-                                              classes=[Relation])
-        program = self.program_mm.model_from_file(file_name)
-        self.process_partial_relational_model(program.partial_relational_model)
-        for command in program.commands:
+        try:
+            self.process_program_file(file_name)
+        finally:
+            # the whole file is a single group of journal records
+            self.commit_journal()
+
+    def process_program_file(self, file_name):
+        self.program_mm = get_metamodel('rashell_program_grammar.tx')
+        self.commands_mm = get_metamodel('rashell_commands_grammar.tx')
+        directory = os.path.dirname(file_name)
+        # single-line inserts are read by program_scanner, everything else is parsed by textX
+        model_processed = False
+        for block in scan_program(file_name):
+            if isinstance(block, list):
+                if not model_processed:
+                    self.program_mm.model_from_str('')
+                for relation_name, inserts in groupby(block, key=itemgetter(1)):
+                    self.insert_rows(relation_name, [(line, insert_type, values) for
+                                                     line, _, insert_type, values in inserts])
+            else:
+                first_line, text = block
+                # padding keeps the line numbers of the file in textX locations and errors
+                text = '\n' * (first_line - 1) + text
+                if model_processed:
+                    commands = self.commands_mm.model_from_str(text).commands
+                else:
+                    program = self.program_mm.model_from_str(text)
+                    self.process_partial_relational_model(program.partial_relational_model)
+                    commands = program.commands
+                    model_processed = True
+                self.process_commands(commands, directory)
+        if not model_processed:
+            self.program_mm.model_from_str('')
+
+    def process_commands(self, commands, directory):
+        for command in commands:
             if textx_isinstance(command, self.instruction_mm['Assignment']):
                 self.process_assignment(command)
             elif textx_isinstance(command, self.instruction_mm['Insert']):
                 self.process_insert(command)
+            elif textx_isinstance(command, self.instruction_mm['Load']):
+                self.process_load(command, directory)
 
     def process_assignment(self, assignment):
-        line = get_location(assignment)['line']
+        line = self.line_number(assignment)
+        if self.transaction:
+            raise CommandInTransactionException('An assignment', line)
         existing_relation = self.get_relation_by_name(assignment.result_name)
         if existing_relation and not existing_relation.is_temporary:
             raise RelationAlreadyExistsException(assignment.result_name, line)
         else:
-            temp_relation = self.compute_relational_algebra_operation(assignment.relational_algebra_operation)
-            if existing_relation:
-                existing_relation.attributes = temp_relation.attributes
-                existing_relation.tuples = temp_relation.tuples
+            expression = self.compute_relational_algebra_expression(assignment.relational_algebra_operation)
+            plan = self.optimized_plan(expression)
+            if assignment.materialized and assignment.result_name in self.view_dependencies(plan):
+                raise RecursiveViewException(assignment.result_name, line)
+            temp_relation = self.relation_from_plan(plan)
+            self.assign_relation(assignment.result_name, temp_relation)
+            self.log('assignment', assignment.result_name, [a.name for a in temp_relation.attributes],
+                     list(temp_relation.tuples))
+            if assignment.materialized:
+                self.views[assignment.result_name] = MaterializedView(
+                    self.get_relation_by_name(assignment.result_name), plan, str(expression))
+                self.log('view', assignment.result_name, str(expression))
+
+    def assign_relation(self, name, temp_relation):
+        existing_relation = self.get_relation_by_name(name)
+        if existing_relation:
+            existing_relation.replace_tuples(temp_relation.attributes, temp_relation.tuples)
+        else:
+            temp_relation.name = name
+            temp_relation.foreign_keys = []
+            temp_relation.is_temporary = True
+            self.relations.add(temp_relation)
+        # an assignment replaces a view by a plain temporary relation, and the views defined on the relation are
+        # computed again (or dropped if the relation does not have the attributes they use anymore)
+        self.views.pop(name, None)
+        for view_name, view in list(self.views.items()):
+            if name in view.base_relation_names:
+                if view.is_valid():
+                    self.propagate(view_name, *view.synchronize())
+                else:
+                    del self.views[view_name]
+
+    def define_view(self, name, definition):
+        operation = self.instruction_mm.model_from_str(definition).operation_type
+        plan = self.optimized_plan(self.compute_relational_algebra_expression(operation))
+        self.views[name] = MaterializedView(self.get_relation_by_name(name), plan, definition)
+
+    def view_dependencies(self, plan):
+        # the relations a view computed by plan would depend on, directly or through other views
+        names = base_relation_names(plan)
+        pending = list(names)
+        while pending:
+            view = self.views.get(pending.pop())
+            if view:
+                pending.extend(view.base_relation_names - names)
+                names |= view.base_relation_names
+        return names
+
+    def propagate(self, relation_name, inserted, deleted):
+        # the changes of a relation are applied to the views defined on it, then to the views defined on these.
+        # Views whose counts are not computed yet are synchronized once every change is applied: counts computed
+        # in the middle could already hold changes propagated to them afterwards
+        unsynchronized_views = []
+        self.propagate_changes(relation_name, inserted, deleted, unsynchronized_views)
+        while unsynchronized_views:
+            view = unsynchronized_views.pop()
+            if view.counts is None:
+                self.propagate_changes(view.relation.name, *view.synchronize(), unsynchronized_views)
+
+    def propagate_changes(self, relation_name, inserted, deleted, unsynchronized_views):
+        if not inserted and not deleted:
+            return
+        for view in [view for view in self.views.values() if relation_name in view.base_relation_names]:
+            if view.counts is None:
+                unsynchronized_views.append(view)
             else:
-                temp_relation.name = assignment.result_name
-                temp_relation.foreign_keys = []
-                temp_relation.is_temporary = True
-                self.relations.add(temp_relation)
+                self.propagate_changes(view.relation.name, *view.apply(relation_name, inserted, deleted),
+                                       unsynchronized_views)
 
     def process_operation(self, operation):
         if textx_isinstance(operation.operation_type, self.instruction_mm['Assignment']):
             self.process_assignment(operation.operation_type)
         elif textx_isinstance(operation.operation_type, self.instruction_mm['RelationalAlgebraOperation']):
-            temp_relation = self.compute_relational_algebra_operation(operation.operation_type)
-            self.print_table(temp_relation)
+            plan = self.optimized_plan(self.compute_relational_algebra_expression(operation.operation_type))
+            analyzed = self.profile and any(operators for _, operators, _ in self.profile_hooks)
+            if analyzed:
+                analyze(plan)
+            self.print_tuples(plan.attributes, self.result_tuples(plan), operation.limit)
+            if analyzed:
+                self.profile.operators = operator_profiles(plan)
+
+    def process_transaction(self, transaction):
+        line = self.line_number(transaction)
+        if transaction.statement == 'BEGIN':
+            if self.transaction:
+                raise TransactionAlreadyOpenException(line)
+            self.transaction = Transaction()
+            return
+        if not self.transaction:
+            raise NoTransactionOpenException(transaction.statement, line)
+        # the transaction ends with COMMIT even if a constraint fails, its changes are then dropped as by ROLLBACK
+        staged_transaction, self.transaction = self.transaction, None
+        if transaction.statement == 'COMMIT':
+            self.commit_transaction(staged_transaction)
+
+    def commit_transaction(self, transaction):
+        transaction.check(self.relations)
+        changes = []
+        for delta in transaction.deltas.values():
+            r = delta.relation
+            # the deleted tuples first, their keys can be taken by the inserted ones
+            deleted_tuples = r.remove_tuples(delta.deleted)
+            added_tuples = r.add_tuples(delta.inserted)
+            if deleted_tuples or added_tuples:
+                changes.append((r.name, added_tuples, list(deleted_tuples)))
+                self.propagate(r.name, added_tuples, deleted_tuples)
+        # a single record, replayed as a whole or not at all
+        if changes:
+            self.log('transaction', changes)
+
+    def process_explain(self, explain):
+        from rich import box, print
+        from rich.table import Table
+
+        plan = self.optimized_plan(self.compute_relational_algebra_expression(explain.relation))
+        if explain.analyze:
+            # the query is computed without the result cache and its tuples are dropped
+            analyze(plan)
+            start = time.perf_counter()
+            rows = sum(1 for _ in plan)
+            seconds = time.perf_counter() - start
+        profiles = operator_profiles(plan)
+        if self.profile:
+            self.profile.operators = profiles
+
+        table = Table(box=box.HORIZONTALS, highlight=False, title='Query plan',
+                      caption='{} rows in {:.1f} ms'.format(rows, seconds * 1000) if explain.analyze else None)
+        columns = ['Operator', 'Algorithm', 'Estimated rows']
+        if explain.analyze:
+            columns += ['Rows in', 'Rows out', 'Time', 'Self time']
+        for column in columns:
+            table.add_column(column, justify='left' if column in ('Operator', 'Algorithm') else 'right')
+        for profile in profiles:
+            row = ['  ' * profile.depth + profile.label, profile.algorithm, str(profile.estimated_rows)]
+            if explain.analyze:
+                row += ['' if profile.input_rows is None else str(profile.input_rows),
+                        '' if profile.output_rows is None else str(profile.output_rows),
+                        '' if profile.seconds is None else '{:.1f} ms'.format(profile.seconds * 1000),
+                        '' if profile.self_seconds is None else '{:.1f} ms'.format(profile.self_seconds * 1000)]
+            table.add_row(*row)
+        print(table)
 
     def compute_relational_algebra_operation(self, operation):
-        if textx_isinstance(operation, self.instruction_mm['Projection']):
-            temp_relation = self.compute_projection(operation)
-        elif textx_isinstance(operation, self.instruction_mm['Restriction']):
-            temp_relation = self.compute_restriction(operation)
-        elif textx_isinstance(operation, self.instruction_mm['Join']):
-            temp_relation = self.compute_join(operation)
-        elif textx_isinstance(operation, self.instruction_mm['Union']):
-            temp_relation = self.compute_union(operation)
-        elif textx_isinstance(operation, self.instruction_mm['Intersection']):
-            temp_relation = self.compute_intersection(operation)
-        elif textx_isinstance(operation, self.instruction_mm['Difference']):
-            temp_relation = self.compute_difference(operation)
-        elif textx_isinstance(operation, self.instruction_mm['CartesianProduct']):
-            temp_relation = self.compute_cartesian_product(operation)
+        return self.relation_from_plan(self.optimized_plan(self.compute_relational_algebra_expression(operation)))
+
+    def optimized_plan(self, plan):
+        if self.optimize_queries:
+            plan = optimize(plan)
+        if self.workers > 1:
+            plan = parallelize(plan, self.workers, self.parallel_threshold)
+        return plan
+
+    @staticmethod
+    def result_key(plan):
+        return str(plan), tuple((scan.relation.name, scan.relation.version) for scan in scans(plan))
+
+    def relation_from_plan(self, plan):
+        # the cached results are immutable, every temporary relation gets its own copy
+        temp_relation = Relation(None, None, [Attribute(None, None, None, a) for a in plan.attributes], None)
+        key = self.result_key(plan)
+        tuples = self.result_cache.get(key)
+        if tuples is None:
+            tuples = frozenset(plan)
+            self.result_cache.put(key, tuples, len(plan.attributes))
+        temp_relation.tuples = set(tuples)
         return temp_relation
 
+    def compute_relational_algebra_expression(self, expression):
+        if textx_isinstance(expression, self.instruction_mm['RelationReference']):
+            operator = self.compute_relation_reference(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Projection']):
+            operator = self.compute_projection(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Restriction']):
+            operator = self.compute_restriction(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Aggregation']):
+            operator = self.compute_aggregation(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Join']):
+            operator = self.compute_join(expression)
+        elif textx_isinstance(expression, self.instruction_mm['SemiJoin']):
+            operator = self.compute_semi_join(expression, SemiJoin)
+        elif textx_isinstance(expression, self.instruction_mm['AntiJoin']):
+            operator = self.compute_semi_join(expression, AntiJoin)
+        elif textx_isinstance(expression, self.instruction_mm['Division']):
+            operator = self.compute_division(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Union']):
+            operator = self.compute_union(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Intersection']):
+            operator = self.compute_intersection(expression)
+        elif textx_isinstance(expression, self.instruction_mm['Difference']):
+            operator = self.compute_difference(expression)
+        elif textx_isinstance(expression, self.instruction_mm['CartesianProduct']):
+            operator = self.compute_cartesian_product(expression)
+        return operator
+
     def process_partial_relational_model(self, partial_relational_model):
-        line = get_location(partial_relational_model)['line']
+        line = self.line_number(partial_relational_model)
         relations_names = [r.name for r in partial_relational_model.relations]
         if len(set(relations_names)) != len(relations_names):
             seen = set()
@@ -172,64 +630,202 @@ class RelationalEngine:
                     raise ReferencedAttributenNotDefinedException(relation.name, foreign_key.referenced_attribute_name,
                                                                   line)
 
-        self.relations.update(partial_relational_model.relations)
+        self.add_relations(partial_relational_model.relations)
+        self.log('relations', [relation_schema(relation) for relation in partial_relational_model.relations])
 
-    def get_relation_by_name(self, name):
-        return next((r for r in self.relations if r.name == name), None)
+    def add_relations(self, relations):
+        self.relations.update(relations)
+        for relation in relations:
+            for foreign_key in relation.foreign_keys:
+                relation.add_value_index(foreign_key.referencer_attribute_name)
+                self.get_relation_by_name(foreign_key.referenced_relation_name).add_value_index(
+                    foreign_key.referenced_attribute_name)
 
-    @staticmethod
-    def print_table(relation):
-        table = Table(box=box.HORIZONTALS, highlight=False)
-        for a in [attribute.name for attribute in relation.attributes]:
-            table.add_column(a, justify="center")
-        for t in relation.tuples:
-            table.add_row(*(str(cell) for cell in t))
-        print(table)
+    def get_relation_by_name(self, name):
+        return self.relations.get(name)
 
     def process_insert(self, insert):
-        line = get_location(insert)['line']
-        r = self.get_relation_by_name(insert.relation_name)
-        if not r:
-            raise RelationNotFoundException(insert.relation_name, line)
-
-        if len(insert.values) != len(r.attributes):
-            raise TupleArityDifferentFromRelationArityException(len(insert.values), len(r.attributes), line)
-
-        pk_indexes = {index for index, a in enumerate(r.attributes) if a.is_primary_key}
-        pk_tuples = {tuple(t[pk_index] for pk_index in pk_indexes) for t in r.tuples}
-        pk_tuple = tuple(insert.values[pk_index] for pk_index in pk_indexes)
-        if pk_indexes and pk_tuple in pk_tuples:
-            raise PrimaryKeyConstraintFailed(pk_tuple, line)
-        if insert.insert_type == 'insert':
-            for referencer_attribute_name, referenced_relation_name, referenced_attribute_name in [
-                (fk.referencer_attribute_name, fk.referenced_relation_name,
-                 fk.referenced_attribute_name) for fk in r.foreign_keys]:
-                for a in r.attributes:
-                    if a.name == referencer_attribute_name:
-                        break
-                referencer_attribute_index = r.attributes.index(a)
-                referencer_attribute_value = insert.values[referencer_attribute_index]
-                referenced_relation = self.get_relation_by_name(referenced_relation_name)
-                for a in referenced_relation.attributes:
-                    if a.name == referenced_attribute_name:
-                        break
-                referenced_attribute_index = referenced_relation.attributes.index(a)
-                referenced_attribute_values = {t[referenced_attribute_index] for t in referenced_relation.tuples}
-                if referencer_attribute_value not in referenced_attribute_values:
-                    raise ForeignKeyConstaintFailedException(referencer_attribute_value, line)
+        line = self.line_number(insert)
+        self.insert_values(insert.relation_name, insert.insert_type, insert.values, line)
 
-        user_tuple = tuple(insert.values)
-        r.tuples.add(user_tuple)
+    def insert_values(self, relation_name, insert_type, values, line):
+        self.insert_rows(relation_name, [(line, insert_type, values)])
+
+    def insert_rows(self, relation_name, rows):
+        # rows are checked one after the other as if inserted one by one, but added together
+        r = self.get_relation_by_name(relation_name)
+        if not r:
+            raise RelationNotFoundException(relation_name, rows[0][0])
+
+        if self.transaction:
+            # keys are checked at commit
+            delta = self.transaction.delta(r)
+            for line, insert_type, values in rows:
+                if len(values) != len(r.attributes):
+                    raise TupleArityDifferentFromRelationArityException(len(values), len(r.attributes), line)
+                delta.insert(tuple(values), line, insert_type == 'insert')
+            return
+
+        pk_positions = r.pk_positions
+        foreign_keys = [(r.attribute_position(fk.referencer_attribute_name),
+                         self.get_relation_by_name(fk.referenced_relation_name),
+                         fk.referenced_attribute_name) for fk in r.foreign_keys]
+        pending_pk_tuples = set()
+        # values of the pending rows referenced by foreign keys of the relation itself
+        pending_referenced_values = {referenced_attribute_name: set() for _, referenced_relation,
+                                     referenced_attribute_name in foreign_keys if referenced_relation is r}
+        pending_referenced_positions = [(r.attribute_position(referenced_attribute_name), values) for
+                                        referenced_attribute_name, values in pending_referenced_values.items()]
+        user_tuples = []
+        try:
+            for line, insert_type, values in rows:
+                if len(values) != len(r.attributes):
+                    raise TupleArityDifferentFromRelationArityException(len(values), len(r.attributes), line)
+
+                pk_tuple = tuple(values[pk_position] for pk_position in pk_positions)
+                if pk_tuple and (pk_tuple in r.pk_index or pk_tuple in pending_pk_tuples):
+                    raise PrimaryKeyConstraintFailed(pk_tuple, line)
+                if insert_type == 'insert':
+                    for referencer_attribute_index, referenced_relation, referenced_attribute_name in foreign_keys:
+                        referencer_attribute_value = values[referencer_attribute_index]
+                        if not referenced_relation.has_value(referenced_attribute_name, referencer_attribute_value) \
+                                and referencer_attribute_value not in pending_referenced_values.get(
+                                    referenced_attribute_name if referenced_relation is r else None, ()):
+                            raise ForeignKeyConstaintFailedException(referencer_attribute_value, line)
+
+                pending_pk_tuples.add(pk_tuple)
+                for position, referenced_values in pending_referenced_positions:
+                    referenced_values.add(values[position])
+                user_tuples.append(tuple(values))
+        finally:
+            added_tuples = r.add_tuples(user_tuples)
+            if added_tuples:
+                self.log('insert', r.name, added_tuples)
+                self.propagate(r.name, added_tuples, ())
 
     def print_relation(self, print_relation):
-        line = get_location(print_relation)['line']
+        line = self.line_number(print_relation)
         r = self.get_relation_by_name(print_relation.relation_name)
         if not r:
             raise RelationNotFoundException(print_relation.relation_name, line)
 
-        self.print_table(r)
+        self.print_tuples([a.name for a in r.attributes], r.tuples, print_relation.limit)
+
+    def print_statistics(self, print_statistics):
+        from rich import box, print
+        from rich.table import Table
+
+        line = self.line_number(print_statistics)
+        r = self.get_relation_by_name(print_statistics.relation_name)
+        if not r:
+            raise RelationNotFoundException(print_statistics.relation_name, line)
+
+        table = Table(box=box.HORIZONTALS, highlight=False,
+                      title='{} ({} tuples)'.format(r.name, r.statistics.row_count))
+        for column in ['Attribute', 'Distinct', 'Min', 'Max', 'Nulls', 'Types']:
+            table.add_column(column, justify="center")
+        for a in r.attributes:
+            attribute_statistics = r.statistics.attribute(a.name)
+            table.add_row(
+                a.name,
+                str(r.statistics.distinct_values(a.name)),
+                str(attribute_statistics.minimum) if attribute_statistics.minimum is not None else '',
+                str(attribute_statistics.maximum) if attribute_statistics.maximum is not None else '',
+                str(attribute_statistics.null_count),
+                ', '.join('{}: {}'.format(type_name, count) for type_name, count in
+                          sorted(attribute_statistics.type_counts.items()))
+            )
+        print(table)
+
+    def result_tuples(self, plan):
+        # tuples of the result of plan as they are computed, or from the cache. A result read to the end is cached
+        # if it fits in the cache, a result read in part (with a limit or a pager) is not
+        key = self.result_key(plan)
+        tuples = self.result_cache.get(key)
+        if tuples is not None:
+            yield from tuples
+            return
+        arity = len(plan.attributes)
+        computed_tuples = []
+        for t in plan:
+            if computed_tuples is not None:
+                computed_tuples.append(t)
+                if not self.result_cache.fits(len(computed_tuples), arity):
+                    computed_tuples = None
+            yield t
+        if computed_tuples is not None:
+            self.result_cache.put(key, frozenset(computed_tuples), arity)
+
+    def print_tuples(self, attributes, tuples, limit=None):
+        # a LIMIT clause takes precedence over the .limit setting
+        if limit:
+            tuples = limited_tuples(tuples, limit.count, limit.offset)
+        elif self.row_limit is not None:
+            tuples = limited_tuples(tuples, self.row_limit, self.row_offset)
+        if not self.profile:
+            render_tuples(attributes, tuples, self.output_mode, self.pager)
+            return
+        timed_tuples = TimedTuples(tuples)
+        start = time.perf_counter()
+        render_tuples(attributes, timed_tuples, self.output_mode, self.pager)
+        self.profile.render_seconds += time.perf_counter() - start - timed_tuples.seconds
+
+    def process_row_limit(self, row_limit):
+        if row_limit.off:
+            self.row_limit, self.row_offset = None, 0
+        else:
+            self.row_limit, self.row_offset = row_limit.count, row_limit.offset
+
+    def process_output(self, output):
+        self.output_mode = output.output_mode
+
+    def process_pager(self, pager):
+        self.pager = pager.state == 'on'
+
+    def process_timing(self, timing):
+        self.timing = timing.state == 'on'
+
+    def process_workers(self, workers):
+        self.workers = max(workers.count, 1)
+        if workers.limited:
+            self.parallel_threshold = workers.threshold
+
+    def process_cache(self, cache):
+        from rich import box, print
+        from rich.table import Table
+
+        if cache.clear:
+            self.result_cache.clear()
+        elif cache.limited:
+            self.result_cache.set_memory_limit(cache.memory_limit << 20)
+
+        result_cache = self.result_cache
+        lookups = result_cache.hits + result_cache.misses
+        table = Table(box=box.HORIZONTALS, highlight=False, title='Query result cache')
+        for column in ['Results', 'Memory', 'Limit', 'Hits', 'Misses', 'Hit ratio']:
+            table.add_column(column, justify="center")
+        table.add_row(str(len(result_cache.results)), '{:.1f} MiB'.format(result_cache.size / (1 << 20)),
+                      '{} MiB'.format(result_cache.memory_limit >> 20), str(result_cache.hits),
+                      str(result_cache.misses), '{:.0%}'.format(result_cache.hits / lookups) if lookups else '')
+        print(table)
+
+    def print_indexes(self, print_indexes):
+        from rich import box, print
+        from rich.table import Table
+
+        table = Table(box=box.HORIZONTALS, highlight=False, title='Sorted indexes')
+        for column in ['Relation', 'Attribute', 'Distinct', 'Tuples']:
+            table.add_column(column, justify="center")
+        for r in self.relations:
+            for attribute_name, sorted_index in r.sorted_indexes.items():
+                table.add_row(r.name, attribute_name, str(len(sorted_index.tuples_by_value)), str(sorted_index.size))
+        print(table)
 
     def print_model(self, model_type):
+        from rich import print
+        from rich.panel import Panel
+        from rich.text import Text
+
         if model_type == '.raw_model':
             model_string = Text('\n'.join([
                 '{}({}){}'.format(
@@ -278,168 +874,121 @@ class RelationalEngine:
             ), expand=False)
         print(model_string)
 
-    def compute_projection(self, projection):
-        line = get_location(projection)['line']
-        r = self.get_relation_by_name(projection.relation_name)
+    def compute_relation_reference(self, relation_reference):
+        line = self.line_number(relation_reference)
+        r = self.get_relation_by_name(relation_reference.relation_name)
         if not r:
-            raise RelationNotFoundException(projection.relation_name, line)
+            raise RelationNotFoundException(relation_reference.relation_name, line)
 
-        unfound_projection_columns = set(projection.columns) - {a.name for a in r.attributes}
-        if unfound_projection_columns:
-            raise ProjectionColumnsNotDefinedException(projection.relation_name, unfound_projection_columns, line)
+        return Scan(r)
 
-        temp_relation = Relation(None, None, [Attribute(None, False, False, c) for c in projection.columns], None)
-
-        projection_indexes = {index for index, a in enumerate(r.attributes) if a.name in projection.columns}
-        temp_relation.tuples = {tuple(t[projection_index] for projection_index in projection_indexes) for t in r.tuples}
+    def compute_projection(self, projection):
+        line = self.line_number(projection)
+        child = self.compute_relational_algebra_expression(projection.relation)
 
-        return temp_relation
+        unfound_projection_columns = set(projection.columns) - set(child.attributes)
+        if unfound_projection_columns:
+            raise ProjectionColumnsNotDefinedException(child, unfound_projection_columns, line)
 
-    @staticmethod
-    def eval_condition(a, op, b):
-        if op == '=':
-            return a == b
-        elif op == '>':
-            return a > b
-        elif op == '>=':
-            return a >= b
-        elif op == '<=':
-            return a <= b
-        elif op == '<':
-            return a < b
-        elif op == '!=' or '<>':
-            return a != b
+        return Project(child, projection.columns)
 
     def compute_restriction(self, restriction):
-        line = get_location(restriction)['line']
+        line = self.line_number(restriction)
+        child = self.compute_relational_algebra_expression(restriction.relation)
+
+        # check if condition columns in relation.attributes
+        condition = condition_from_model(restriction.condition)
+        unfound_restriction_columns = condition.attribute_names - set(child.attributes)
+        if unfound_restriction_columns:
+            raise RestrictionColumnNotDefinedException(child, ', '.join(sorted(unfound_restriction_columns)), line)
+
+        return Restrict(child, condition)
+
+    def compute_aggregation(self, aggregation):
+        line = self.line_number(aggregation)
+        child = self.compute_relational_algebra_expression(aggregation.relation)
+
+        aggregates = [(aggregate.function, aggregate.attribute_name or None) for aggregate in aggregation.aggregates]
+        unfound_aggregation_columns = (set(aggregation.group_columns) | {attribute_name for _, attribute_name in
+                                                                         aggregates if attribute_name}) - \
+            set(child.attributes)
+        if unfound_aggregation_columns:
+            raise AggregationColumnsNotDefinedException(child, ', '.join(sorted(unfound_aggregation_columns)), line)
+
+        operator = Aggregate(child, aggregation.group_columns, aggregates)
+        duplicate_attributes = {a for a in operator.attributes if operator.attributes.count(a) > 1}
+        if duplicate_attributes:
+            raise DuplicateAttributesException(sorted(duplicate_attributes), line)
+        return operator
 
-        r = self.get_relation_by_name(restriction.relation_name)
-        if not r:
-            raise RelationNotFoundException(restriction.relation_name, line)
+    def compute_join(self, join):
+        line = self.line_number(join)
+        left_child = self.compute_relational_algebra_expression(join.left_relation)
+        right_child = self.compute_relational_algebra_expression(join.right_relation)
 
-        # check if condition column in relation.attributes
-        if restriction.condition.attribute_name not in {a.name for a in r.attributes}:
-            raise RestrictionColumnNotDefinedException(restriction.relation_name, restriction.condition.attribute_name,
-                                                       line)
+        if join.condition.left_attribute not in left_child.attributes:
+            raise JoinColumnNotDefinedException(left_child, join.condition.left_attribute, line)
+        if join.condition.right_attribute not in right_child.attributes:
+            raise JoinColumnNotDefinedException(right_child, join.condition.right_attribute, line)
 
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in r.attributes], None)
+        return Join(left_child, right_child, join.condition.left_attribute, join.condition.right_attribute)
 
-        for a in r.attributes:
-            if a.name == restriction.condition.attribute_name:
-                break
-        index = r.attributes.index(a)
+    def compute_semi_join(self, semi_join, operator_type):
+        line = self.line_number(semi_join)
+        left_child = self.compute_relational_algebra_expression(semi_join.left_relation)
+        right_child = self.compute_relational_algebra_expression(semi_join.right_relation)
 
-        temp_relation.tuples = {t for t in r.tuples if
-                                self.eval_condition(t[index], restriction.condition.operator,
-                                                    restriction.condition.value)}
-        return temp_relation
+        if semi_join.condition.left_attribute not in left_child.attributes:
+            raise JoinColumnNotDefinedException(left_child, semi_join.condition.left_attribute, line)
+        if semi_join.condition.right_attribute not in right_child.attributes:
+            raise JoinColumnNotDefinedException(right_child, semi_join.condition.right_attribute, line)
 
-    def compute_join(self, join):
-        line = get_location(join)['line']
-        left_r = self.get_relation_by_name(join.left_relation)
-        right_r = self.get_relation_by_name(join.right_relation)
-        if not left_r:
-            raise RelationNotFoundException(join.left_relation, line)
-        if not right_r:
-            raise RelationNotFoundException(join.right_relation, line)
-
-        if join.condition.left_attribute not in {a.name for a in left_r.attributes}:
-            raise JoinColumnNotDefinedException(join.left_relation, join.condition.left_attribute, line)
-        if join.condition.right_attribute not in {a.name for a in right_r.attributes}:
-            raise JoinColumnNotDefinedException(join.right_relation, join.condition.right_attribute, line)
-
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in left_r.attributes] + [
-            Attribute(None, None, None,
-                      f'{a.name}{"_" if a.name in [left_a.name for left_a in left_r.attributes] else ""}') for a in
-            right_r.attributes], None)
-
-        for left_attribute in left_r.attributes:
-            if left_attribute.name == join.condition.left_attribute:
-                break
-        left_index = left_r.attributes.index(left_attribute)
-
-        for right_attribute in right_r.attributes:
-            if right_attribute.name == join.condition.right_attribute:
-                break
-        right_index = right_r.attributes.index(right_attribute)
-
-        temp_relation.tuples = {
-            l_tuple + r_tuple for l_tuple in left_r.tuples for r_tuple in right_r.tuples if
-            l_tuple[left_index] == r_tuple[right_index]
-        }
+        return operator_type(left_child, right_child, semi_join.condition.left_attribute,
+                             semi_join.condition.right_attribute)
 
-        return temp_relation
+    def compute_division(self, division):
+        line = self.line_number(division)
+        left_child = self.compute_relational_algebra_expression(division.left_relation)
+        right_child = self.compute_relational_algebra_expression(division.right_relation)
 
-    def compute_union(self, union):
-        line = get_location(union)['line']
-        left_r = self.get_relation_by_name(union.left_relation)
-        right_r = self.get_relation_by_name(union.right_relation)
-        if not left_r:
-            raise RelationNotFoundException(union.left_relation, line)
-        if not right_r:
-            raise RelationNotFoundException(union.right_relation, line)
+        # the quotient has the attributes of the dividend that are not attributes of the divisor
+        if not set(right_child.attributes) < set(left_child.attributes):
+            raise DivisionRelationsHavingIncompatibleAttributes(left_child, right_child, line)
 
-        if len(left_r.attributes) != len(right_r.attributes):
-            raise UnionRelationsHavingDifferentNumberOfAttribute(union.left_relation, union.right_relation, line)
+        return Division(left_child, right_child)
 
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in left_r.attributes], None)
+    def compute_union(self, union):
+        line = self.line_number(union)
+        left_child = self.compute_relational_algebra_expression(union.left_relation)
+        right_child = self.compute_relational_algebra_expression(union.right_relation)
 
-        temp_relation.tuples = left_r.tuples.union(right_r.tuples)
-        return temp_relation
+        if len(left_child.attributes) != len(right_child.attributes):
+            raise UnionRelationsHavingDifferentNumberOfAttribute(left_child, right_child, line)
+
+        return Union(left_child, right_child)
 
     def compute_intersection(self, intersection):
-        line = get_location(intersection)
-        left_r = self.get_relation_by_name(intersection.left_relation)
-        right_r = self.get_relation_by_name(intersection.right_relation)
-        if not left_r:
-            raise RelationNotFoundException(intersection.left_relation, line)
-        if not right_r:
-            raise RelationNotFoundException(intersection.right_relation, line)
-
-        if len(left_r.attributes) != len(right_r.attributes):
-            raise RestrictionRelationsHavingDifferentNumberOfAttribute(intersection.left_relation,
-                                                                       intersection.right_relation,
-                                                                       line)
-
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in left_r.attributes], None)
-
-        temp_relation.tuples = left_r.tuples.intersection(right_r.tuples)
-        return temp_relation
+        line = self.line_number(intersection)
+        left_child = self.compute_relational_algebra_expression(intersection.left_relation)
+        right_child = self.compute_relational_algebra_expression(intersection.right_relation)
+
+        if len(left_child.attributes) != len(right_child.attributes):
+            raise RestrictionRelationsHavingDifferentNumberOfAttribute(left_child, right_child, line)
+
+        return Intersection(left_child, right_child)
 
     def compute_difference(self, difference):
-        line = get_location(difference)['line']
-        left_r = self.get_relation_by_name(difference.left_relation)
-        right_r = self.get_relation_by_name(difference.right_relation)
-        if not left_r:
-            raise RelationNotFoundException(difference.left_relation, line)
-        if not right_r:
-            raise RelationNotFoundException(difference.right_relation, line)
-
-        if len(left_r.attributes) != len(right_r.attributes):
-            raise DifferenceRelationsHavingDifferentNumberOfAttribute(difference.left_relation,
-                                                                      difference.right_relation,
-                                                                      line)
-
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in left_r.attributes], None)
-
-        temp_relation.tuples = left_r.tuples.difference(right_r.tuples)
-        return temp_relation
+        line = self.line_number(difference)
+        left_child = self.compute_relational_algebra_expression(difference.left_relation)
+        right_child = self.compute_relational_algebra_expression(difference.right_relation)
+
+        if len(left_child.attributes) != len(right_child.attributes):
+            raise DifferenceRelationsHavingDifferentNumberOfAttribute(left_child, right_child, line)
+
+        return Difference(left_child, right_child)
 
     def compute_cartesian_product(self, cartesian_product):
-        line = get_location(cartesian_product)['line']
-        left_r = self.get_relation_by_name(cartesian_product.left_relation)
-        right_r = self.get_relation_by_name(cartesian_product.right_relation)
-        if not left_r:
-            raise RelationNotFoundException(cartesian_product.left_relation, line)
-        if not right_r:
-            raise RelationNotFoundException(cartesian_product.right_relation, line)
-
-        temp_relation = Relation(None, None, [Attribute(None, None, None, a.name) for a in left_r.attributes] + [
-            Attribute(None, None, None,
-                      f'{a.name}{"_" if a.name in [left_a.name for left_a in left_r.attributes] else ""}') for a in
-            right_r.attributes], None)
-
-        temp_relation.tuples = {
-            l_tuple + r_tuple for l_tuple in left_r.tuples for r_tuple in right_r.tuples
-        }
-        return temp_relation
+        left_child = self.compute_relational_algebra_expression(cartesian_product.left_relation)
+        right_child = self.compute_relational_algebra_expression(cartesian_product.right_relation)
+
+        return CartesianProduct(left_child, right_child)
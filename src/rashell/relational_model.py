@@ -1,3 +1,9 @@
+from collections import Counter
+
+from rashell.columnar import ColumnarTuples
+from rashell.indexes import SortedIndex
+
+
 class Relation:
     def __init__(self, parent, name, attributes, foreign_keys):
         self.parent = parent
@@ -6,6 +12,145 @@ class Relation:
         self.foreign_keys = foreign_keys
         self.tuples = set()
         self.is_temporary = False
+        self.pk_index = set()
+        self.value_indexes = {}
+        self.sorted_indexes = {}
+        self.statistics = None
+        self.tuple_source = None
+        self.columnar = False
+        # incremented by every change of the tuples, cached query results are only valid for the same versions
+        self.version = 0
+
+    def __getattr__(self, name):
+        # tuples of a relation opened from a snapshot, and the indexes built on them, are read on first use
+        if name in ('tuples', 'pk_index', 'value_indexes', 'sorted_indexes') and self.__dict__.get('tuple_source'):
+            self.load_tuples()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    @property
+    def is_loaded(self):
+        return self.tuple_source is None
+
+    def defer_tuples(self, tuple_source):
+        del self.tuples, self.pk_index, self.value_indexes, self.sorted_indexes
+        self.tuple_source = tuple_source
+
+    def load_tuples(self):
+        tuple_source, self.tuple_source = self.tuple_source, None
+        self.tuples = self.tuple_set(len(self.attributes))
+        for block in tuple_source.read_blocks():
+            self.tuples.update(block)
+        self.rebuild_indexes(tuple_source.value_index_names, tuple_source.sorted_index_names)
+        if self.statistics and not tuple_source.statistics:
+            self.statistics.rebuild()
+
+    def set_columnar(self, columnar):
+        # tuples, and primary keys, are stored in sets or column by column in less memory (see columnar.py)
+        if columnar == self.columnar:
+            return
+        self.columnar = columnar
+        if self.is_loaded:
+            self.tuples = self.tuple_set(len(self.attributes), self.tuples)
+            self.pk_index = self.tuple_set(len(self.pk_positions), self.pk_index)
+
+    def tuple_set(self, arity, tuples=()):
+        return ColumnarTuples(arity, tuples) if self.columnar else set(tuples)
+
+    def column_values(self, position):
+        if self.columnar:
+            return self.tuples.columns[position].values()
+        return (t[position] for t in self.tuples)
+
+    def columns(self):
+        if self.columnar:
+            return [column.values() for column in self.tuples.columns]
+        return zip(*self.tuples)
+
+    @property
+    def pk_positions(self):
+        return tuple(index for index, a in enumerate(self.attributes) if a.is_primary_key)
+
+    def pk_tuple(self, values):
+        return tuple(values[pk_position] for pk_position in self.pk_positions)
+
+    def attribute_position(self, attribute_name):
+        return next(index for index, a in enumerate(self.attributes) if a.name == attribute_name)
+
+    def add_value_index(self, attribute_name):
+        if attribute_name not in self.value_indexes:
+            position = self.attribute_position(attribute_name)
+            self.value_indexes[attribute_name] = Counter(self.column_values(position))
+
+    def add_sorted_index(self, attribute_name):
+        if attribute_name not in self.sorted_indexes:
+            self.sorted_indexes[attribute_name] = SortedIndex(self.attribute_position(attribute_name), self.tuples)
+
+    def has_value(self, attribute_name, value):
+        return value in self.value_indexes[attribute_name]
+
+    def add_tuples(self, tuples):
+        tuples = [t for t in dict.fromkeys(tuples) if t not in self.tuples]
+        if tuples:
+            self.version += 1
+        self.tuples.update(tuples)
+        pk_positions = self.pk_positions
+        if pk_positions:
+            self.pk_index.update(tuple(t[pk_position] for pk_position in pk_positions) for t in tuples)
+        for attribute_name, value_index in self.value_indexes.items():
+            position = self.attribute_position(attribute_name)
+            value_index.update(t[position] for t in tuples)
+        for sorted_index in self.sorted_indexes.values():
+            sorted_index.add(tuples)
+        if self.statistics and tuples:
+            self.statistics.add_many(tuples)
+        return tuples
+
+    def remove_tuples(self, tuples):
+        tuples = self.tuples.intersection(tuples)
+        if tuples:
+            self.version += 1
+        self.tuples.difference_update(tuples)
+        pk_positions = self.pk_positions
+        if pk_positions:
+            self.pk_index.difference_update(tuple(t[pk_position] for pk_position in pk_positions) for t in tuples)
+        for attribute_name, value_index in self.value_indexes.items():
+            position = self.attribute_position(attribute_name)
+            for t in tuples:
+                value = t[position]
+                value_index[value] -= 1
+                if not value_index[value]:
+                    del value_index[value]
+        for sorted_index in self.sorted_indexes.values():
+            sorted_index.remove(tuples)
+        if self.statistics:
+            self.statistics.remove(tuples)
+        return tuples
+
+    def replace_tuples(self, attributes, tuples):
+        attribute_names = [a.name for a in attributes]
+        indexed_attribute_names = [name for name in self.value_indexes if name in attribute_names]
+        sorted_index_names = [name for name in self.sorted_indexes if name in attribute_names]
+        self.attributes = attributes
+        self.tuples = ColumnarTuples(len(attributes), tuples) if self.columnar else tuples
+        self.version += 1
+        self.rebuild_indexes(indexed_attribute_names, sorted_index_names)
+        if self.statistics:
+            self.statistics.rebuild()
+
+    def rebuild_indexes(self, indexed_attribute_names, sorted_index_names):
+        pk_positions = self.pk_positions
+        if self.columnar:
+            pk_tuples = self.tuples.gather(None, pk_positions)
+        else:
+            pk_tuples = (tuple(t[pk_position] for pk_position in pk_positions) for t in self.tuples)
+        self.pk_index = self.tuple_set(len(pk_positions), pk_tuples if pk_positions else ())
+        self.value_indexes = {}
+        for attribute_name in indexed_attribute_names:
+            self.add_value_index(attribute_name)
+        self.sorted_indexes = {}
+        for attribute_name in sorted_index_names:
+            self.add_sorted_index(attribute_name)
 
 
 class Attribute:
@@ -14,3 +159,11 @@ class Attribute:
         self.is_primary_key = is_primary_key
         self.is_foreign_key = is_foreign_key
         self.name = name
+
+
+class ForeignKey:
+    def __init__(self, parent, referencer_attribute_name, referenced_relation_name, referenced_attribute_name):
+        self.parent = parent
+        self.referencer_attribute_name = referencer_attribute_name
+        self.referenced_relation_name = referenced_relation_name
+        self.referenced_attribute_name = referenced_attribute_name
@@ -0,0 +1,123 @@
+import csv
+import json
+import marshal
+import shutil
+import struct
+import sys
+from itertools import islice
+
+OUTPUT_MODES = ['table', 'csv', 'tsv', 'jsonl', 'binary']
+# lines of a page taken by the borders and the header of the table and by the pager prompt
+PAGE_MARGIN = 6
+
+# binary output: every result is a stream of messages, its attributes, batches of tuples stored column by column and
+# an empty message ending it. As in Arrow IPC streams, each message is preceded by a continuation marker and its
+# length; the messages are marshaled
+CONTINUATION = b'\xff\xff\xff\xff'
+MESSAGE_LENGTH = struct.Struct('<I')
+BINARY_BATCH_SIZE = 65536
+MARSHAL_VERSION = 4
+
+
+def limited_tuples(tuples, limit=None, offset=0):
+    return islice(tuples, offset, None if limit is None else offset + limit)
+
+
+def render_tuples(attributes, tuples, output_mode='table', pager=False):
+    # tuples are rendered as they are produced: rows are written one by one in csv and tsv, and the pager only
+    # builds the table of the current page
+    if output_mode in ('csv', 'tsv'):
+        write_delimited(attributes, tuples, ',' if output_mode == 'csv' else '\t')
+    elif output_mode == 'jsonl':
+        write_json_lines(attributes, tuples)
+    elif output_mode == 'binary':
+        write_binary(attributes, tuples)
+    elif pager:
+        print_pages(attributes, iter(tuples))
+    else:
+        print_table(attributes, tuples)
+
+
+def write_delimited(attributes, tuples, delimiter):
+    writer = csv.writer(sys.stdout, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(attributes)
+    writer.writerows(tuples)
+    sys.stdout.flush()
+
+
+def write_json_lines(attributes, tuples):
+    write = sys.stdout.write
+    for t in tuples:
+        write(json.dumps(dict(zip(attributes, t)), ensure_ascii=False))
+        write('\n')
+    sys.stdout.flush()
+
+
+def write_message(stream, message):
+    data = marshal.dumps(message, MARSHAL_VERSION) if message is not None else b''
+    stream.write(CONTINUATION + MESSAGE_LENGTH.pack(len(data)) + data)
+
+
+def write_binary(attributes, tuples):
+    stream = sys.stdout.buffer
+    write_message(stream, list(attributes))
+    tuples = iter(tuples)
+    while True:
+        batch = list(islice(tuples, BINARY_BATCH_SIZE))
+        if not batch:
+            break
+        write_message(stream, [list(column) for column in zip(*batch)])
+    write_message(stream, None)
+    stream.flush()
+
+
+def read_message(stream):
+    header = stream.read(len(CONTINUATION) + MESSAGE_LENGTH.size)
+    if len(header) < len(CONTINUATION) + MESSAGE_LENGTH.size:
+        return None
+    length, = MESSAGE_LENGTH.unpack_from(header, len(CONTINUATION))
+    return marshal.loads(stream.read(length)) if length else None
+
+
+def read_binary(stream):
+    # yields the attributes and the tuples of each result written by the binary output mode to a binary stream
+    while True:
+        attributes = read_message(stream)
+        if attributes is None:
+            return
+        tuples = []
+        while True:
+            columns = read_message(stream)
+            if columns is None:
+                break
+            tuples.extend(zip(*columns))
+        yield attributes, tuples
+
+
+def print_table(attributes, tuples):
+    from rich import box, print
+    from rich.table import Table
+
+    table = Table(box=box.HORIZONTALS, highlight=False)
+    for a in attributes:
+        table.add_column(a, justify="center")
+    for t in tuples:
+        table.add_row(*(str(cell) for cell in t))
+    print(table)
+
+
+def print_pages(attributes, tuples):
+    page_size = max(shutil.get_terminal_size().lines - PAGE_MARGIN, 1)
+    page = list(islice(tuples, page_size))
+    first_row = 1
+    while True:
+        print_table(attributes, page)
+        next_page = list(islice(tuples, page_size))
+        if not next_page:
+            return
+        answer = input('-- rows {}-{}, enter for the next page, q to stop -- '.format(
+            first_row, first_row + len(page) - 1))
+        if answer.strip().lower() == 'q':
+            return
+        first_row += len(page)
+        page = next_page
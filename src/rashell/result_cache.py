@@ -0,0 +1,57 @@
+import sys
+from collections import OrderedDict
+
+# approximate memory of a cached tuple besides its values, which are mostly shared with the base relations
+TUPLE_SIZE = sys.getsizeof(())
+POINTER_SIZE = 8
+
+
+def estimated_size(tuples, arity):
+    return sys.getsizeof(tuples) + len(tuples) * (TUPLE_SIZE + arity * POINTER_SIZE)
+
+
+class ResultCache:
+    # results of queries keyed by their optimized plan and the versions of the relations they read. A change of a
+    # relation makes the keys of the results computed from it unreachable, they are evicted as the least recently
+    # used ones once the results take more than memory_limit bytes
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.results = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result[0]
+
+    def fits(self, count, arity):
+        return count * (TUPLE_SIZE + arity * POINTER_SIZE) <= self.memory_limit
+
+    def put(self, key, tuples, arity):
+        size = estimated_size(tuples, arity)
+        if size > self.memory_limit:
+            return
+        if key in self.results:
+            self.size -= self.results.pop(key)[1]
+        self.results[key] = tuples, size
+        self.size += size
+        self.evict(self.memory_limit)
+
+    def evict(self, memory_limit):
+        while self.size > memory_limit:
+            _, (_, size) = self.results.popitem(last=False)
+            self.size -= size
+
+    def set_memory_limit(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.evict(memory_limit)
+
+    def clear(self):
+        self.results.clear()
+        self.size = 0
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from textx import TextXError, textx_isinstance
+
+from rashell.exceptions import RashellException, RelationNotFoundException, CommandNotServedException
+from rashell.rendering import limited_tuples
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7654
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_THREADS = 4
+# longest command line read from a client, in bytes
+REQUEST_LIMIT = 1 << 20
+
+# commands reading the model, run concurrently, and commands changing it, run one at a time. The other commands
+# change the settings of the shell or its output and are refused
+READ_COMMANDS = {'Operation', 'PrintRelation'}
+WRITE_COMMANDS = {'PartialRelationalModel', 'Insert', 'Delete', 'Load', 'CreateIndex', 'Save', 'Checkpoint'}
+
+
+class ReadWriteLock:
+    # held by any number of readers or by a single writer. A waiting writer goes before the readers arriving after
+    # it, a stream of queries does not delay the changes forever
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @asynccontextmanager
+    async def reading(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writer and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                self.condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writer and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class Server:
+    # one engine shared by the clients of a socket. Commands are parsed by the event loop and run by a pool of
+    # threads: queries run together while no change is made, changes wait for the running queries and are made one
+    # at a time, so every query reads the model as it is between two changes.
+    # Protocol: a client sends one command per line. Each command is answered by a JSON object on one line, with
+    # status "ok" or "error" (and its message), the time spent waiting for the other commands and the total time in
+    # ms. The answer of a query also holds its attributes and its number of rows, followed by one line by row,
+    # a JSON array of the values of the tuple
+    def __init__(self, engine, threads=DEFAULT_THREADS, max_connections=DEFAULT_MAX_CONNECTIONS, log=sys.stderr):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max(threads, 1), thread_name_prefix='rashell')
+        self.max_connections = max_connections
+        self.connections = 0
+        self.log = log
+        # created in the event loop
+        self.lock = None
+        # planning reads the statistics, refreshing them, and the result cache: queries are planned one at a time
+        self.planning_lock = threading.Lock()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        self.lock = ReadWriteLock()
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, socket_path, limit=REQUEST_LIMIT)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=REQUEST_LIMIT)
+            address = '{}:{}'.format(*server.sockets[0].getsockname()[:2])
+        self.write_log('Serving on {}, at most {} connections'.format(address, self.max_connections))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        peer = '{}:{}'.format(*peer[:2]) if isinstance(peer, tuple) else 'unix socket'
+        if self.connections >= self.max_connections:
+            writer.write(response_line({'status': 'error', 'message': 'Too many connections, at most {}'.format(
+                self.max_connections)}))
+            await close_writer(writer)
+            return
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(response_line({'status': 'error', 'message': 'Command longer than {} bytes'.format(
+                        REQUEST_LIMIT)}))
+                    break
+                if not line:
+                    break
+                text = line.decode('utf-8', errors='replace').strip()
+                if not text:
+                    continue
+                if text == '.exit':
+                    break
+                writer.write(await self.respond(text, peer))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            await close_writer(writer)
+
+    async def respond(self, text, peer):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        waited = 0.0
+        body = b''
+        try:
+            instruction = self.engine.parse_instruction(text)
+            rule_name = self.engine.rule_name(instruction)
+            if rule_name == 'Operation' and textx_isinstance(instruction.operation_type,
+                                                             self.engine.instruction_mm['Assignment']):
+                rule_name = 'Assignment'
+            queued = time.perf_counter()
+            if rule_name in READ_COMMANDS:
+                async with self.lock.reading():
+                    waited = time.perf_counter() - queued
+                    header, body = await loop.run_in_executor(self.executor, self.query, instruction)
+            elif rule_name in WRITE_COMMANDS or rule_name == 'Assignment':
+                async with self.lock.writing():
+                    waited = time.perf_counter() - queued
+                    await loop.run_in_executor(self.executor, self.engine.process_instruction, instruction)
+                header = {'status': 'ok'}
+            else:
+                raise CommandNotServedException(rule_name)
+        except TextXError as e:
+            header = {'status': 'error', 'message': 'Line {}: {}'.format(e.line, e.message)}
+        except (RashellException, OSError) as e:
+            header = {'status': 'error', 'message': str(e)}
+        except Exception as e:
+            # a failure of the engine answers the command, the connection and the server go on
+            self.write_log(traceback.format_exc().rstrip())
+            header = {'status': 'error', 'message': '{}: {}'.format(type(e).__name__, e)}
+        header['wait_ms'] = round(waited * 1000, 3)
+        header['ms'] = round((time.perf_counter() - start) * 1000, 3)
+        self.write_log('{} {} {:.1f} ms (waited {:.1f} ms){}: {}'.format(
+            peer, header['status'], header['ms'], header['wait_ms'],
+            ', {} rows'.format(header['rows']) if 'rows' in header else '', text))
+        return response_line(header) + body
+
+    def query(self, instruction):
+        # run by the threads of the pool while no change is made
+        engine = self.engine
+        cache_key = None
+        with self.planning_lock:
+            if engine.rule_name(instruction) == 'PrintRelation':
+                relation = engine.get_relation_by_name(instruction.relation_name)
+                if not relation:
+                    raise RelationNotFoundException(instruction.relation_name, engine.line_number(instruction))
+                attributes, tuples = [a.name for a in relation.attributes], relation.tuples
+            else:
+                plan = engine.optimized_plan(engine.compute_relational_algebra_expression(
+                    instruction.operation_type))
+                prepare(plan)
+                attributes = plan.attributes
+                cache_key = engine.result_key(plan)
+                tuples = engine.result_cache.get(cache_key)
+                if tuples is not None:
+                    cache_key = None
+                elif instruction.limit:
+                    # a result read in part is not cached
+                    tuples, cache_key = plan, None
+                else:
+                    tuples = plan
+        limit = instruction.limit
+        rows = list(limited_tuples(tuples, limit.count, limit.offset) if limit else tuples)
+        if cache_key is not None:
+            with self.planning_lock:
+                if engine.result_cache.fits(len(rows), len(attributes)):
+                    engine.result_cache.put(cache_key, frozenset(rows), len(attributes))
+        body = ''.join(json.dumps(list(t), ensure_ascii=False) + '\n' for t in rows).encode('utf-8')
+        return {'status': 'ok', 'attributes': list(attributes), 'rows': len(rows)}, body
+
+    def write_log(self, message):
+        if self.log:
+            print(message, file=self.log, flush=True)
+
+
+def prepare(plan):
+    # the tuples of relations opened from a snapshot are read, and the statistics refreshed by the estimates, before
+    # the threads read them together
+    for child in plan.children:
+        prepare(child)
+    relation = getattr(plan, 'relation', None)
+    if relation is not None:
+        relation.tuples
+    plan.estimated_cardinality()
+
+
+def response_line(header):
+    return (json.dumps(header, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+async def close_writer(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+
+def run_server(engine, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, threads=DEFAULT_THREADS,
+               max_connections=DEFAULT_MAX_CONNECTIONS):
+    server = Server(engine, threads, max_connections)
+    try:
+        asyncio.run(server.serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,129 @@
+import marshal
+import mmap
+import os
+import struct
+from itertools import islice
+
+from rashell.relational_model import Relation, Attribute, ForeignKey
+
+# file layout: header, blocks of marshaled tuples, directory of the relations (marshaled as well)
+MAGIC = b'RASHSNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sIQQ')
+MARSHAL_VERSION = 4
+BLOCK_SIZE = 65536
+
+
+class RelationBlocks:
+    # tuples of a relation that stay in the mapped snapshot until the relation is first used
+    def __init__(self, snapshot_map, blocks, value_index_names, sorted_index_names, statistics):
+        self.snapshot_map = snapshot_map
+        self.blocks = blocks
+        self.value_index_names = value_index_names
+        self.sorted_index_names = sorted_index_names
+        self.statistics = statistics
+
+    def read_blocks(self):
+        for offset, length in self.blocks:
+            yield marshal.loads(self.snapshot_map[offset:offset + length])
+
+    def raw_blocks(self):
+        for offset, length in self.blocks:
+            yield self.snapshot_map[offset:offset + length]
+
+
+def tuple_blocks(relation):
+    tuple_source = relation.tuple_source
+    if tuple_source:
+        # not read since the snapshot was opened, the blocks are copied as they are
+        yield from tuple_source.raw_blocks()
+        return
+    tuples = iter(relation.tuples)
+    while True:
+        block = list(islice(tuples, BLOCK_SIZE))
+        if not block:
+            return
+        yield marshal.dumps(block, MARSHAL_VERSION)
+
+
+def relation_statistics(relation):
+    if relation.tuple_source:
+        return relation.tuple_source.statistics
+    return relation.statistics.state() if relation.statistics else None
+
+
+def relation_schema(relation):
+    return {
+        'name': relation.name,
+        'attributes': [(a.name, bool(a.is_primary_key), bool(a.is_foreign_key)) for a in relation.attributes],
+        'foreign_keys': [(fk.referencer_attribute_name, fk.referenced_relation_name, fk.referenced_attribute_name)
+                         for fk in relation.foreign_keys],
+        'is_temporary': relation.is_temporary
+    }
+
+
+def relation_from_schema(schema):
+    relation = Relation(None, schema['name'],
+                        [Attribute(None, is_primary_key, is_foreign_key, name) for
+                         name, is_primary_key, is_foreign_key in schema['attributes']],
+                        [ForeignKey(None, *foreign_key) for foreign_key in schema['foreign_keys']])
+    relation.is_temporary = schema['is_temporary']
+    return relation
+
+
+def relation_entry(relation, blocks, view_definition):
+    entry = relation_schema(relation)
+    entry['view'] = view_definition
+    entry['value_indexes'] = list(relation.tuple_source.value_index_names if relation.tuple_source else
+                                  relation.value_indexes)
+    entry['sorted_indexes'] = list(relation.tuple_source.sorted_index_names if relation.tuple_source else
+                                   relation.sorted_indexes)
+    entry['statistics'] = relation_statistics(relation)
+    entry['blocks'] = blocks
+    return entry
+
+
+def write_snapshot(relations, file_name, view_definitions=None):
+    # written next to the snapshot and renamed, an existing snapshot is never left half written
+    temporary_file_name = file_name + '.tmp'
+    with open(temporary_file_name, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        directory = []
+        for relation in relations:
+            blocks = []
+            for block in tuple_blocks(relation):
+                blocks.append((f.tell(), len(block)))
+                f.write(block)
+            directory.append(relation_entry(relation, blocks, (view_definitions or {}).get(relation.name)))
+        directory_offset = f.tell()
+        directory_bytes = marshal.dumps(directory, MARSHAL_VERSION)
+        f.write(directory_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, directory_offset, len(directory_bytes)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_file_name, file_name)
+
+
+def read_snapshot(file_name):
+    # only the directory is read, the tuples of each relation are read from the mapped file on first use.
+    # returns the relations and the definitions of the materialized views, or None if the file is not a snapshot
+    with open(file_name, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return None
+        snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, directory_offset, directory_length = HEADER.unpack_from(snapshot_map)
+    if magic != MAGIC or version != VERSION or directory_offset + directory_length > len(snapshot_map):
+        snapshot_map.close()
+        return None
+
+    relations = []
+    view_definitions = {}
+    for entry in marshal.loads(snapshot_map[directory_offset:directory_offset + directory_length]):
+        relation = relation_from_schema(entry)
+        relation.defer_tuples(RelationBlocks(snapshot_map, entry['blocks'], entry['value_indexes'],
+                                             entry.get('sorted_indexes', []), entry['statistics']))
+        relations.append(relation)
+        if entry.get('view'):
+            view_definitions[relation.name] = entry['view']
+    return relations, view_definitions
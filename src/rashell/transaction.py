@@ -0,0 +1,134 @@
+from collections import Counter
+from itertools import compress
+from operator import itemgetter
+
+from rashell.exceptions import PrimaryKeyConstraintFailed, ForeignKeyConstaintFailedException
+from rashell.operators import Scan, Restrict
+
+
+class RelationDelta:
+    # changes of a relation staged by a transaction: the tuples it will gain and the tuples of the relation it will
+    # lose, with the line of the command staging each of them. The foreign keys of the tuples inserted or deleted by
+    # force_insert, force_delete and .force_load are not checked
+    def __init__(self, relation):
+        self.relation = relation
+        self.inserted = {}
+        self.deleted = {}
+        self.unchecked = set()
+        # keys of the tuples inserted again, in the relation or in the transaction, and the lines inserting them
+        self.duplicate_keys = []
+
+    def insert(self, t, line, checked=True):
+        if t in self.deleted:
+            # the tuple stays in the relation
+            del self.deleted[t]
+            self.unchecked.discard(t)
+        elif t in self.inserted or t in self.relation.tuples:
+            # outside a transaction, the key of the tuple already taken is refused
+            if self.relation.pk_positions:
+                self.duplicate_keys.append((self.relation.pk_tuple(t), line))
+        else:
+            self.inserted[t] = line
+            if not checked:
+                self.unchecked.add(t)
+
+    def delete(self, condition, line, checked=True):
+        # deletes the tuples matching condition in the relation as changed by the transaction
+        tuples = [t for t in Restrict(Scan(self.relation), condition) if t not in self.deleted]
+        inserted = list(self.inserted)
+        for t in compress(inserted, condition.compile([a.name for a in self.relation.attributes])(inserted)):
+            del self.inserted[t]
+            self.unchecked.discard(t)
+        for t in tuples:
+            self.deleted[t] = line
+            if not checked:
+                self.unchecked.add(t)
+
+    def checked_tuples(self, tuples):
+        return (t for t in tuples if t not in self.unchecked)
+
+    def value_changes(self, position):
+        # how many more (or fewer) tuples hold each value at position once the changes are made
+        changes = Counter(t[position] for t in self.inserted)
+        changes.subtract(t[position] for t in self.deleted)
+        return changes
+
+
+class Transaction:
+    # changes staged between BEGIN and COMMIT, by relation name. Constraints are checked at commit on the deltas,
+    # with set operations, instead of tuple by tuple
+    def __init__(self):
+        self.deltas = {}
+
+    def delta(self, relation):
+        delta = self.deltas.get(relation.name)
+        if delta is None:
+            delta = self.deltas[relation.name] = RelationDelta(relation)
+        return delta
+
+    def check(self, relations):
+        # raises the first constraint failure, the relations are not changed
+        for delta in self.deltas.values():
+            check_primary_key(delta)
+        check_foreign_keys(relations, self.deltas)
+
+
+def check_primary_key(delta):
+    relation = delta.relation
+    if not relation.pk_positions or not delta.inserted and not delta.duplicate_keys:
+        return
+    # the failure of the first line is reported
+    failures = list(delta.duplicate_keys)
+    inserted_pk_tuples = [relation.pk_tuple(t) for t in delta.inserted]
+    distinct_pk_tuples = set(inserted_pk_tuples)
+    # the keys of the deleted tuples can be taken by the inserted ones
+    clashes = {pk_tuple for pk_tuple in distinct_pk_tuples if pk_tuple in relation.pk_index} - {
+        relation.pk_tuple(t) for t in delta.deleted}
+    if clashes or len(distinct_pk_tuples) != len(inserted_pk_tuples):
+        seen = set()
+        for pk_tuple, line in zip(inserted_pk_tuples, delta.inserted.values()):
+            if pk_tuple in clashes or pk_tuple in seen:
+                failures.append((pk_tuple, line))
+                break
+            seen.add(pk_tuple)
+    if failures:
+        raise PrimaryKeyConstraintFailed(*min(failures, key=itemgetter(1)))
+
+
+def check_foreign_keys(relations, deltas):
+    value_changes = {}
+
+    def present_values(relation, attribute_name, values):
+        # the values still held by an attribute once the changes of the transaction are made
+        key = relation.name, attribute_name
+        if key not in value_changes:
+            delta = deltas.get(relation.name)
+            value_changes[key] = delta.value_changes(relation.attribute_position(attribute_name)) if delta else \
+                Counter()
+        value_index, changes = relation.value_indexes[attribute_name], value_changes[key]
+        return {value for value in values if value_index.get(value, 0) + changes[value] > 0}
+
+    for relation in relations:
+        delta = deltas.get(relation.name)
+        for fk in relation.foreign_keys:
+            referenced_relation = relations.get(fk.referenced_relation_name)
+            referenced_delta = deltas.get(referenced_relation.name)
+            if delta:
+                # values of the inserted tuples missing from the referenced relation
+                position = relation.attribute_position(fk.referencer_attribute_name)
+                values = {t[position] for t in delta.checked_tuples(delta.inserted)}
+                missing_values = values - present_values(referenced_relation, fk.referenced_attribute_name, values)
+                if missing_values:
+                    t, line = next((t, line) for t, line in delta.inserted.items() if
+                                   t[position] in missing_values and t not in delta.unchecked)
+                    raise ForeignKeyConstaintFailedException(t[position], line)
+            if referenced_delta:
+                # values of the deleted tuples gone from the referenced relation but still referenced
+                position = referenced_relation.attribute_position(fk.referenced_attribute_name)
+                values = {t[position] for t in referenced_delta.checked_tuples(referenced_delta.deleted)}
+                removed_values = values - present_values(referenced_relation, fk.referenced_attribute_name, values)
+                referenced_values = present_values(relation, fk.referencer_attribute_name, removed_values)
+                if referenced_values:
+                    line = next(line for t, line in referenced_delta.deleted.items() if
+                                t[position] in referenced_values and t not in referenced_delta.unchecked)
+                    raise ForeignKeyConstaintFailedException(referenced_values, line)
@@ -0,0 +1,317 @@
+from collections import defaultdict
+from itertools import compress
+from operator import itemgetter
+
+from rashell.aggregation import aggregate_group
+from rashell.operators import Scan, Restrict, Project, Aggregate, Join, CartesianProduct, SemiJoin, Division, \
+    Union, Intersection, scans, base_relation_names
+
+
+# a materialized view keeps, for every tuple of the result of each operator, the number of ways it is derived from
+# the base relations (a projection can derive a tuple from several ones). Changes of a base relation are propagated
+# as signed counts (+1 for an inserted tuple, -1 for a deleted one) from the scans up to the result, and a tuple
+# leaves the result only once none of its derivations is left.
+# Joins and products keep the counts of both inputs grouped by join value, intersections and differences the counts
+# of both inputs, to combine the changes of one input with the other input without computing it again.
+# Aggregations keep their input grouped, the groups changed by a delta are aggregated again, semi-joins their left
+# input grouped by join value and the counts of the join values of their right input, and divisions the dividend
+# grouped by quotient tuple and the divisor
+
+
+def add_counts(counts, delta):
+    for t, count in delta.items():
+        count += counts.get(t, 0)
+        if count:
+            counts[t] = count
+        else:
+            counts.pop(t, None)
+
+
+def join_keys(operator):
+    if isinstance(operator, (Join, SemiJoin)):
+        return (itemgetter(operator.left.attributes.index(operator.left_attribute)),
+                itemgetter(operator.right.attributes.index(operator.right_attribute)))
+    return (lambda t: None), (lambda t: None)
+
+
+def grouped_counts(counts, key):
+    groups = defaultdict(dict)
+    for t, count in counts.items():
+        groups[key(t)][t] = count
+    return groups
+
+
+def add_grouped_counts(groups, delta, key):
+    for t, count in delta.items():
+        group = groups[key(t)]
+        count += group.get(t, 0)
+        if count:
+            group[t] = count
+        else:
+            del group[t]
+            if not group:
+                del groups[key(t)]
+
+
+def joined_counts(left_groups, right_groups):
+    # counts of the joined tuples of two inputs grouped by join value, the smallest one is iterated
+    joined = {}
+    if len(left_groups) > len(right_groups):
+        for value, right_counts in right_groups.items():
+            for l_tuple, l_count in left_groups.get(value, {}).items():
+                for r_tuple, r_count in right_counts.items():
+                    joined[l_tuple + r_tuple] = joined.get(l_tuple + r_tuple, 0) + l_count * r_count
+        return joined
+    for value, left_counts in left_groups.items():
+        for r_tuple, r_count in right_groups.get(value, {}).items():
+            for l_tuple, l_count in left_counts.items():
+                joined[l_tuple + r_tuple] = joined.get(l_tuple + r_tuple, 0) + l_count * r_count
+    return joined
+
+
+def group_key(operator):
+    positions = [operator.child.attributes.index(c) for c in operator.group_columns]
+    return lambda t: tuple(t[position] for position in positions)
+
+
+def aggregated_tuple(operator, groups, key):
+    # None for a group without tuples, except the single group of an aggregation without grouping attributes
+    group = groups.get(key)
+    if not group and operator.group_columns:
+        return None
+    aggregates = [(function, None if attribute_name is None else operator.child.attributes.index(attribute_name))
+                  for function, attribute_name in operator.aggregates]
+    return aggregate_group(key, group or (), aggregates)
+
+
+def semi_joined_counts(operator, left_groups, right_values, value):
+    # counts of the tuples of left with the join value that are in the result of a semi-join or an anti-join
+    if (value in right_values) != operator.anti:
+        return left_groups.get(value, {})
+    return {}
+
+
+def division_keys(operator):
+    quotient_key = itemgetter(*[operator.left.attributes.index(a) for a in operator.attributes])
+    divisor_key = itemgetter(*[operator.left.attributes.index(a) for a in operator.right.attributes])
+    return (lambda t: tuple_key(quotient_key(t), operator.attributes),
+            lambda t: tuple_key(divisor_key(t), operator.right.attributes))
+
+
+def tuple_key(key, attributes):
+    # itemgetter returns a value instead of a tuple for a single attribute
+    return (key,) if len(attributes) == 1 else key
+
+
+def is_quotient(quotient_groups, divisor_counts, quotient_tuple):
+    group = quotient_groups.get(quotient_tuple)
+    return group is not None and len(group) >= len(divisor_counts) and all(t in group for t in divisor_counts)
+
+
+def add_divided_counts(operator, quotient_groups, delta):
+    # the counts of the dividend are kept as the counts of the divisor tuples of each quotient tuple
+    quotient_key, divisor_key = division_keys(operator)
+    for t, count in delta.items():
+        quotient_tuple, divisor_tuple = quotient_key(t), divisor_key(t)
+        group = quotient_groups[quotient_tuple]
+        count += group.get(divisor_tuple, 0)
+        if count:
+            group[divisor_tuple] = count
+        else:
+            del group[divisor_tuple]
+            if not group:
+                del quotient_groups[quotient_tuple]
+
+
+def is_member(operator, left_counts, right_counts, t):
+    if isinstance(operator, Intersection):
+        return t in left_counts and t in right_counts
+    return t in left_counts and t not in right_counts
+
+
+def initial_counts(operator, state):
+    # counts of the result of operator computed from the base relations, the inputs of joins, products,
+    # intersections and differences are kept in state
+    if isinstance(operator, Scan):
+        return dict.fromkeys(operator.relation.tuples, 1)
+    elif isinstance(operator, Restrict):
+        counts = initial_counts(operator.child, state)
+        tuples = list(counts)
+        return {t: counts[t] for t in compress(tuples, operator.condition.compile(operator.attributes)(tuples))}
+    elif isinstance(operator, Project):
+        return projected_counts(operator, initial_counts(operator.child, state))
+    elif isinstance(operator, Aggregate):
+        groups = state[operator] = grouped_counts(initial_counts(operator.child, state), group_key(operator))
+        keys = list(groups) if groups or operator.group_columns else [()]
+        return {aggregated_tuple(operator, groups, key): 1 for key in keys}
+    elif isinstance(operator, SemiJoin):
+        left_key, right_key = join_keys(operator)
+        left_groups = grouped_counts(initial_counts(operator.left, state), left_key)
+        right_values = value_counts(initial_counts(operator.right, state), right_key)
+        state[operator] = left_groups, right_values
+        return {t: count for value in left_groups for t, count in
+                semi_joined_counts(operator, left_groups, right_values, value).items()}
+    elif isinstance(operator, Division):
+        quotient_groups = defaultdict(dict)
+        add_divided_counts(operator, quotient_groups, initial_counts(operator.left, state))
+        divisor_counts = initial_counts(operator.right, state)
+        state[operator] = quotient_groups, divisor_counts
+        return {t: 1 for t in quotient_groups if is_quotient(quotient_groups, divisor_counts, t)}
+    elif isinstance(operator, (Join, CartesianProduct)):
+        left_key, right_key = join_keys(operator)
+        left_groups = grouped_counts(initial_counts(operator.left, state), left_key)
+        right_groups = grouped_counts(initial_counts(operator.right, state), right_key)
+        state[operator] = left_groups, right_groups
+        return joined_counts(left_groups, right_groups)
+    elif isinstance(operator, Union):
+        counts = initial_counts(operator.left, state)
+        add_counts(counts, initial_counts(operator.right, state))
+        return counts
+    left_counts = initial_counts(operator.left, state)
+    right_counts = initial_counts(operator.right, state)
+    state[operator] = left_counts, right_counts
+    return {t: 1 for t in left_counts if is_member(operator, left_counts, right_counts, t)}
+
+
+def value_counts(counts, key):
+    values = {}
+    for t, count in counts.items():
+        values[key(t)] = values.get(key(t), 0) + count
+    return {value: count for value, count in values.items() if count}
+
+
+def projected_counts(operator, counts):
+    indexes = [operator.child.attributes.index(c) for c in operator.columns]
+    projected = {}
+    for t, count in counts.items():
+        projected_tuple = tuple(t[index] for index in indexes)
+        projected[projected_tuple] = projected.get(projected_tuple, 0) + count
+    return {t: count for t, count in projected.items() if count}
+
+
+def delta_counts(operator, state, relation_name, inserted, deleted):
+    # changes of the counts of the result of operator when tuples are inserted in or deleted from a base relation
+    if isinstance(operator, Scan):
+        if operator.relation.name != relation_name:
+            return {}
+        delta = dict.fromkeys(inserted, 1)
+        delta.update(dict.fromkeys(deleted, -1))
+        return delta
+    elif isinstance(operator, Restrict):
+        delta = delta_counts(operator.child, state, relation_name, inserted, deleted)
+        if not delta:
+            return delta
+        tuples = list(delta)
+        return {t: delta[t] for t in compress(tuples, operator.condition.compile(operator.attributes)(tuples))}
+    elif isinstance(operator, Project):
+        return projected_counts(operator, delta_counts(operator.child, state, relation_name, inserted, deleted))
+    elif isinstance(operator, Union):
+        delta = delta_counts(operator.left, state, relation_name, inserted, deleted)
+        add_counts(delta, delta_counts(operator.right, state, relation_name, inserted, deleted))
+        return delta
+    elif isinstance(operator, Aggregate):
+        child_delta = delta_counts(operator.child, state, relation_name, inserted, deleted)
+        groups, key = state[operator], group_key(operator)
+        changed_keys = {key(t) for t in child_delta}
+        before = [aggregated_tuple(operator, groups, changed_key) for changed_key in changed_keys]
+        add_grouped_counts(groups, child_delta, key)
+        after = [aggregated_tuple(operator, groups, changed_key) for changed_key in changed_keys]
+        delta = {}
+        add_counts(delta, {t: -1 for t in before if t is not None})
+        add_counts(delta, {t: 1 for t in after if t is not None})
+        return delta
+
+    left_delta = delta_counts(operator.left, state, relation_name, inserted, deleted)
+    right_delta = delta_counts(operator.right, state, relation_name, inserted, deleted)
+    if not left_delta and not right_delta:
+        return {}
+    if isinstance(operator, (Join, CartesianProduct)):
+        # Δ(L ⋈ R) = ΔL ⋈ R + L ⋈ ΔR + ΔL ⋈ ΔR, with L and R before the change
+        left_groups, right_groups = state[operator]
+        left_key, right_key = join_keys(operator)
+        left_delta_groups = grouped_counts(left_delta, left_key)
+        right_delta_groups = grouped_counts(right_delta, right_key)
+        delta = joined_counts(left_delta_groups, right_groups)
+        add_counts(delta, joined_counts(left_groups, right_delta_groups))
+        add_counts(delta, joined_counts(left_delta_groups, right_delta_groups))
+        add_grouped_counts(left_groups, left_delta, left_key)
+        add_grouped_counts(right_groups, right_delta, right_key)
+        return {t: count for t, count in delta.items() if count}
+    elif isinstance(operator, SemiJoin):
+        # the tuples of left with a changed join value, or whose join value appeared in or left right
+        left_groups, right_values = state[operator]
+        left_key, right_key = join_keys(operator)
+        changed_values = {left_key(t) for t in left_delta} | {right_key(t) for t in right_delta}
+        delta = {}
+        for value in changed_values:
+            add_counts(delta, {t: -count for t, count in
+                               semi_joined_counts(operator, left_groups, right_values, value).items()})
+        add_grouped_counts(left_groups, left_delta, left_key)
+        add_counts(right_values, value_counts(right_delta, right_key))
+        for value in changed_values:
+            add_counts(delta, semi_joined_counts(operator, left_groups, right_values, value))
+        return delta
+    elif isinstance(operator, Division):
+        # a change of the divisor can change every quotient tuple
+        quotient_groups, divisor_counts = state[operator]
+        quotient_key, _ = division_keys(operator)
+        previous_divisor = set(divisor_counts)
+        add_counts(divisor_counts, right_delta)
+        changed_tuples = {quotient_key(t) for t in left_delta}
+        if previous_divisor != set(divisor_counts):
+            changed_tuples |= set(quotient_groups)
+        before = {t for t in changed_tuples if is_quotient(quotient_groups, previous_divisor, t)}
+        add_divided_counts(operator, quotient_groups, left_delta)
+        after = {t for t in changed_tuples if is_quotient(quotient_groups, divisor_counts, t)}
+        delta = dict.fromkeys(after - before, 1)
+        delta.update(dict.fromkeys(before - after, -1))
+        return delta
+
+    left_counts, right_counts = state[operator]
+    changed_tuples = set(left_delta) | set(right_delta)
+    before = {t for t in changed_tuples if is_member(operator, left_counts, right_counts, t)}
+    add_counts(left_counts, left_delta)
+    add_counts(right_counts, right_delta)
+    after = {t for t in changed_tuples if is_member(operator, left_counts, right_counts, t)}
+    delta = dict.fromkeys(after - before, 1)
+    delta.update(dict.fromkeys(before - after, -1))
+    return delta
+
+
+class MaterializedView:
+    # temporary relation kept up to date with the base relations of its definition. The counts are computed on the
+    # first change of a base relation, a view opened from a snapshot costs nothing until then
+    def __init__(self, relation, plan, definition):
+        self.relation = relation
+        self.plan = plan
+        self.definition = definition
+        self.base_relation_names = base_relation_names(plan)
+        self.counts = None
+        self.state = {}
+
+    def is_valid(self):
+        # a base relation assigned again may not have the attributes the view was defined with anymore
+        return all(scan.attributes == [a.name for a in scan.relation.attributes] for scan in scans(self.plan))
+
+    def synchronize(self):
+        # computes the counts from the base relations and changes the relation to match them
+        self.state = {}
+        self.counts = initial_counts(self.plan, self.state)
+        tuples = self.relation.tuples
+        return self.change([t for t in self.counts if t not in tuples],
+                           [t for t in tuples if t not in self.counts])
+
+    def apply(self, relation_name, inserted, deleted):
+        # returns the tuples added to and removed from the view, the counts must have been computed before the change
+        added, removed = [], []
+        for t, count in delta_counts(self.plan, self.state, relation_name, inserted, deleted).items():
+            previous_count = self.counts.get(t, 0)
+            add_counts(self.counts, {t: count})
+            if not previous_count:
+                added.append(t)
+            elif t not in self.counts:
+                removed.append(t)
+        return self.change(added, removed)
+
+    def change(self, added, removed):
+        return self.relation.add_tuples(added), list(self.relation.remove_tuples(removed))
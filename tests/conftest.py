@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# the tests run from a checkout, without installing rashell
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from rashell.relational_engine import RelationalEngine  # noqa: E402
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+def run(engine, command):
+    engine.execute(command)
+
+
+@pytest.fixture
+def movies():
+    engine = RelationalEngine()
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    return engine
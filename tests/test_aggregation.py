@@ -0,0 +1,33 @@
+from collections import defaultdict
+
+import pytest
+
+from conftest import run
+from rashell.aggregation import hash_aggregate
+
+AGGREGATES = [('count', None), ('sum', 1), ('min', 1), ('max', 2), ('avg', 1)]
+
+
+@pytest.mark.parametrize('maximum_groups', [2, 7, 50])
+def test_spilled_aggregation_matches_the_in_memory_one(maximum_groups):
+    tuples = [(i % 97, i, 'v{:03}'.format(i % 13)) for i in range(3000)]
+    in_memory_tuples = list(hash_aggregate(tuples, [0], AGGREGATES))
+    assert len(in_memory_tuples) == 97
+    # 97 groups spill past maximum_groups, the smallest limits spill the partitions again
+    assert sorted(hash_aggregate(tuples, [0], AGGREGATES, maximum_groups)) == sorted(in_memory_tuples)
+
+
+def test_aggregation_of_movies(movies):
+    run(movies, 'T = γ DirectorID; count(*), min(Year), avg(Year) (Movie)')
+    years = defaultdict(list)
+    for t in movies.get_relation_by_name('Movie').tuples:
+        years[t[4]].append(t[3])
+    assert movies.get_relation_by_name('T').tuples == {
+        (director_id, len(y), min(y), sum(y) / len(y)) for director_id, y in years.items()}
+    run(movies, 'T = σ count > 3 (γ DirectorID; count(*) (Movie))')
+    assert movies.get_relation_by_name('T').tuples == {(k, len(y)) for k, y in years.items() if len(y) > 3}
+
+
+def test_aggregation_without_groups(movies):
+    run(movies, "T = γ ; count(*), sum(Year) (σ Year > 3000 (Movie))")
+    assert movies.get_relation_by_name('T').tuples == {(0, 0)}
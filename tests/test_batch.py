@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import EXAMPLES_DIRECTORY
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+SCRIPT = """R(_A, B)
+R.insert(1, 'a')
+R.insert(2, 'b')
+
+π B (R)
+{}
+R.insert(3, 'c')
+π A (R)
+"""
+
+
+def rashell(*arguments, stdin=''):
+    return subprocess.run([sys.executable, '-m', 'rashell.rashell'] + list(arguments), input=stdin,
+                          capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=SOURCE_DIRECTORY))
+
+
+def test_script_runs_every_command(tmp_path):
+    script = tmp_path / 'script.ra'
+    script.write_text(SCRIPT.format("R.insert(4, 'd')"))
+    result = rashell('-f', str(script))
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert lines[0] == 'B' and sorted(lines[1:3]) == ['a', 'b']
+    assert lines[3] == 'A' and sorted(lines[4:]) == ['1', '2', '3', '4']
+
+
+@pytest.mark.parametrize('error, message', [
+    ("R.insert(1, 'z')", 'Line 6: '),
+    ('π C (R)', 'Line 6: '),
+    ('π B (R', 'Line 6'),
+])
+def test_first_error_stops_the_script_with_its_line(tmp_path, error, message):
+    script = tmp_path / 'script.ra'
+    script.write_text(SCRIPT.format(error))
+    for arguments, stdin in ((['-f', str(script)], ''), ([], script.read_text())):
+        result = rashell(*arguments, stdin=stdin)
+        assert result.returncode == 1
+        assert result.stderr.startswith(message), result.stderr
+        # the commands before the error have run, the ones after it have not
+        lines = result.stdout.splitlines()
+        assert lines[0] == 'B' and sorted(lines[1:]) == ['a', 'b']
+
+
+def test_jsonl_output():
+    result = rashell(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'), '--output', 'jsonl', '-c',
+                     "σ Nationality = 'FR' (Director)")
+    assert result.returncode == 0, result.stderr
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {'Id': 4, 'Name': 'Luc besson', 'Nationality': 'FR'}]
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from conftest import EXAMPLES_DIRECTORY
+from rashell.columnar import ColumnarTuples
+from rashell.relational_engine import RelationalEngine
+
+
+def query_results(columnar, query):
+    engine = RelationalEngine()
+    engine.set_columnar_storage(columnar)
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    operation = engine.instruction_mm.model_from_str(query).operation_type
+    return engine.compute_relational_algebra_operation(operation).tuples
+
+
+@pytest.mark.parametrize('query', [
+    # the optimizer projects one input of the product on no attribute
+    'π Title (Movie X Director)',
+    'π Title (σ Year > 1990 (Movie X Director))',
+    'π Name (Director X Movie)',
+])
+def test_projection_over_product(query):
+    row_tuples = query_results(False, query)
+    assert row_tuples
+    assert set(query_results(True, query)) == set(row_tuples)
+
+
+def test_columnar_tuples_are_a_set():
+    tuples = {(i, 'name {}'.format(i % 7), i / 4) for i in range(1000)}
+    columnar_tuples = ColumnarTuples(3, tuples)
+    columnar_tuples.update([(1, 'name 1', 0.25), (1000, 'new', 1.5)])
+    tuples.add((1000, 'new', 1.5))
+    removed = {t for t in tuples if t[0] % 3 == 0}
+    # deleted rows are replaced by the last ones, every remaining tuple must still be found
+    columnar_tuples.difference_update(removed)
+    tuples -= removed
+    assert len(columnar_tuples) == len(tuples)
+    assert set(columnar_tuples) == tuples
+    assert all(t in columnar_tuples for t in tuples)
+    assert not any(t in columnar_tuples for t in removed)
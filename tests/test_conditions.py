@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import run
+
+# condition and the same test on a tuple of Movie(Code, Title, Genre, Year, DirectorID)
+CONDITIONS = [
+    ("Year > 1990 AND Genre = 'Drama'", lambda t: t[3] > 1990 and t[2] == 'Drama'),
+    ("Year < 1980 OR DirectorID = 3", lambda t: t[3] < 1980 or t[4] == 3),
+    ("NOT (Genre = 'Action' OR Genre = 'Crime')", lambda t: not (t[2] == 'Action' or t[2] == 'Crime')),
+    ("¬ Year >= 1997 ∧ DirectorID != 2", lambda t: not t[3] >= 1997 and t[4] != 2),
+    ("Year <> 1997 AND Code > DirectorID", lambda t: t[3] != 1997 and t[0] > t[4]),
+]
+
+
+@pytest.mark.parametrize('storage', ['rows', 'columns'])
+@pytest.mark.parametrize('condition, test', CONDITIONS)
+def test_compiled_condition_matches_the_tuples(movies, storage, condition, test):
+    run(movies, '.storage {}'.format(storage))
+    run(movies, 'T = σ {} (Movie)'.format(condition))
+    movie_tuples = movies.get_relation_by_name('Movie').tuples
+    assert set(movies.get_relation_by_name('T').tuples) == {t for t in movie_tuples if test(t)}
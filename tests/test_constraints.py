@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import run
+from rashell.exceptions import PrimaryKeyConstraintFailed, ForeignKeyConstaintFailedException
+
+
+def test_insert_of_a_taken_key_fails(movies):
+    with pytest.raises(PrimaryKeyConstraintFailed):
+        run(movies, "Director.insert(1, 'Jane Campion', 'NZ')")
+    assert len(movies.get_relation_by_name('Director').tuples) == 4
+
+
+def test_key_index_follows_inserts_and_deletes(movies):
+    directors = movies.get_relation_by_name('Director')
+    run(movies, "Director.insert(5, 'Jane Campion', 'NZ')")
+    run(movies, "Director.force_delete(Id = 4)")
+    assert directors.pk_index == {(1,), (2,), (3,), (5,)}
+    # the key of a deleted tuple can be taken again
+    run(movies, "Director.insert(4, 'Agnes Varda', 'FR')")
+    with pytest.raises(PrimaryKeyConstraintFailed):
+        run(movies, "Director.insert(5, 'Chantal Akerman', 'BE')")
+    assert directors.pk_index == {directors.pk_tuple(t) for t in directors.tuples}
+
+
+def test_insert_of_a_missing_referenced_value_fails(movies):
+    with pytest.raises(ForeignKeyConstaintFailedException):
+        run(movies, "Movie.insert(1, 'Piano', 'Drama', 1993, 5)")
+    run(movies, "Movie.force_insert(1, 'Piano', 'Drama', 1993, 5)")
+    assert movies.get_relation_by_name('Movie').value_indexes['DirectorID'][5] == 1
+
+
+def test_delete_of_a_referenced_value_fails(movies):
+    with pytest.raises(ForeignKeyConstaintFailedException):
+        run(movies, 'Director.delete(Id = 1)')
+    # once the movies of the director are deleted, the director is not referenced anymore
+    run(movies, 'Movie.delete(DirectorID = 1)')
+    run(movies, 'Director.delete(Id = 1)')
+    assert 1 not in movies.get_relation_by_name('Movie').value_indexes['DirectorID']
+    assert 1 not in movies.get_relation_by_name('Director').value_indexes['Id']
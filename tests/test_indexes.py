@@ -0,0 +1,33 @@
+import operator
+
+import pytest
+
+from conftest import run
+from rashell.exceptions import RestrictionValuesNotComparableException
+from rashell.indexes import SortedIndex
+
+OPERATORS = {'=': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+@pytest.mark.parametrize('comparison', sorted(OPERATORS))
+def test_lookup_finds_the_compared_tuples(comparison):
+    tuples = {(i, i % 10) for i in range(100)}
+    sorted_index = SortedIndex(1, tuples)
+    removed = {t for t in tuples if t[0] % 7 == 0}
+    sorted_index.remove(removed)
+    tuples -= removed
+    for value in (-1, 0, 4, 9, 10):
+        assert set(sorted_index.lookup(comparison, value)) == \
+            {t for t in tuples if OPERATORS[comparison](t[1], value)}
+
+
+@pytest.mark.parametrize('indexed', [False, True])
+@pytest.mark.parametrize('storage', ['rows', 'columns'])
+def test_numbers_compared_with_a_string_fail_with_or_without_index(movies, indexed, storage):
+    run(movies, '.storage {}'.format(storage))
+    if indexed:
+        run(movies, '.index Movie(Year)')
+    with pytest.raises(RestrictionValuesNotComparableException, match="Year > 'x' compares numbers with strings"):
+        run(movies, "T = σ Year > 'x' (Movie)")
+    run(movies, "T = σ Year = 'x' (Movie)")
+    assert not movies.get_relation_by_name('T').tuples
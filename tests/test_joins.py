@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import run
+from rashell import operators
+from rashell.operators import Join
+from rashell.optimizer import optimize
+
+QUERIES = ['Movie ⋈ Director | DirectorID = Id', 'π Title, Name (Movie ⋈ Director | DirectorID = Id)']
+
+
+def joined_tuples(engine):
+    run(engine, 'T = Movie ⋈ Director | DirectorID = Id')
+    return engine.get_relation_by_name('T').tuples
+
+
+def plan_of(engine, query):
+    operation = engine.instruction_mm.model_from_str(query).operation_type
+    return optimize(engine.compute_relational_algebra_expression(operation))
+
+
+def join_of(plan):
+    if isinstance(plan, Join):
+        return plan
+    return next(join for join in map(join_of, plan.children) if join)
+
+
+def test_sort_merge_join_matches_hash_join(movies, monkeypatch):
+    expected_tuples = joined_tuples(movies)
+    # past the limit, the inputs are sorted and merged, hash_join is not called
+    monkeypatch.setattr(operators, 'HASH_JOIN_LIMIT', 0)
+    monkeypatch.setattr(operators, 'hash_join', None)
+    assert joined_tuples(movies) == expected_tuples
+    assert len(expected_tuples) == 14 and all(t[4] == t[5] for t in expected_tuples)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_sort_merge_join_on_sorted_indexes(movies, monkeypatch, query):
+    hash_plan = plan_of(movies, query)
+    hash_tuples = set(hash_plan)
+    assert not join_of(hash_plan).sorted_inputs()
+    run(movies, '.index Movie(DirectorID)')
+    run(movies, '.index Director(Id)')
+    merge_plan = plan_of(movies, query)
+    assert join_of(merge_plan).sorted_inputs()
+    monkeypatch.setattr(operators, 'hash_join', None)
+    assert set(merge_plan) == hash_tuples and hash_tuples
@@ -0,0 +1,64 @@
+import os
+
+from conftest import EXAMPLES_DIRECTORY, run
+from rashell.journal import checkpoint_file_name
+from rashell.relational_engine import RelationalEngine
+
+
+def relation_contents(engine):
+    return {relation.name: ([a.name for a in relation.attributes], relation.tuples) for relation in engine.relations}
+
+
+def test_replay_restores_the_journaled_state(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'movies.journal')
+    engine = RelationalEngine()
+    engine.open_journal(file_name)
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    run(engine, "Director.insert(5, 'Agnes Varda', 'FR')")
+    run(engine, "Director.insert(6, 'Jane Campion', 'NZ')")
+    run(engine, "Director.delete(Id = 5)")
+    run(engine, "T = π Name (Director)")
+    engine.close_journal()
+
+    reopened = RelationalEngine()
+    reopened.open_journal(file_name)
+    assert relation_contents(reopened) == relation_contents(engine)
+
+
+def test_checkpoint_compacts_the_journal(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'movies.journal')
+    engine = RelationalEngine()
+    engine.open_journal(file_name)
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    run(engine, "Director.insert(5, 'Agnes Varda', 'FR')")
+    run(engine, '.checkpoint')
+    assert os.path.getsize(file_name) == 0
+    assert os.path.isfile(checkpoint_file_name(file_name))
+    run(engine, "Director.insert(6, 'Jane Campion', 'NZ')")
+    engine.close_journal()
+
+    reopened = RelationalEngine()
+    reopened.open_journal(file_name)
+    assert relation_contents(reopened) == relation_contents(engine)
+
+
+def test_torn_record_is_dropped(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'movies.journal')
+    engine = RelationalEngine()
+    engine.open_journal(file_name)
+    run(engine, 'R(_A, B)')
+    run(engine, "R.insert(1, 'a')")
+    engine.close_journal()
+    complete_size = os.path.getsize(file_name)
+    engine = RelationalEngine()
+    engine.open_journal(file_name)
+    run(engine, "R.insert(2, 'b')")
+    engine.close_journal()
+    with open(file_name, 'r+b') as f:
+        f.truncate(os.path.getsize(file_name) - 1)
+
+    reopened = RelationalEngine()
+    reopened.open_journal(file_name)
+    assert reopened.get_relation_by_name('R').tuples == {(1, 'a')}
+    # the torn record is cut off, the journal goes on after the valid records
+    assert os.path.getsize(file_name) == complete_size
@@ -0,0 +1,46 @@
+import re
+
+import pytest
+
+from conftest import run
+from rashell.exceptions import LoadRowsRejectedException
+from rashell.loader import coerce_value
+
+
+@pytest.mark.parametrize('text, value', [
+    ('12', 12), (' 12', 12), ('-3 ', -3), ('1.5', 1.5), ('', ''), (' Drama', ' Drama'), ('1e', '1e'),
+])
+def test_coerce_value(text, value):
+    assert coerce_value(text) == value and type(coerce_value(text)) is type(value)
+
+
+def test_load_csv_and_tsv(movies, tmp_path):
+    csv_file = tmp_path / 'directors.csv'
+    csv_file.write_text('Id,Name,Nationality\n5,Jane Campion,NZ\n 6,"Varda, Agnes",FR\n')
+    tsv_file = tmp_path / 'movies.tsv'
+    tsv_file.write_text('1\tThe Piano\tDrama\t1993\t5\n2\tCleo from 5 to 7\tDrama\t1962\t6\n')
+    run(movies, ".load Director '{}'".format(csv_file))
+    run(movies, ".load Movie '{}'".format(tsv_file))
+    assert {(5, 'Jane Campion', 'NZ'), (6, 'Varda, Agnes', 'FR')} <= movies.get_relation_by_name('Director').tuples
+    assert (2, 'Cleo from 5 to 7', 'Drama', 1962, 6) in movies.get_relation_by_name('Movie').tuples
+
+
+@pytest.mark.parametrize('rows, error', [
+    ('1,The Piano,Drama,1993,4\n3,Short,Drama\n', 'row 2: Arity of tuple is 3. Expected 5'),
+    ('1,The Piano,Drama,1993,4\n1,Cleo from 5 to 7,Drama,1962,4\n', 'row 2: Primary Key constraint failed (1,)'),
+    ('1,The Piano,Drama,1993,4\n2,Cleo from 5 to 7,Drama,1962,6\n', 'row 2: Foreign Key constraint failed 6'),
+])
+def test_rejected_rows_leave_the_relation_unchanged(movies, tmp_path, rows, error):
+    csv_file = tmp_path / 'movies.csv'
+    csv_file.write_text(rows)
+    movie_tuples = set(movies.get_relation_by_name('Movie').tuples)
+    with pytest.raises(LoadRowsRejectedException, match=re.escape(error)):
+        run(movies, ".load Movie '{}'".format(csv_file))
+    assert movies.get_relation_by_name('Movie').tuples == movie_tuples
+
+
+def test_force_load_does_not_check_foreign_keys(movies, tmp_path):
+    csv_file = tmp_path / 'movies.csv'
+    csv_file.write_text('1,The Piano,Drama,1993,4\n2,Cleo from 5 to 7,Drama,1962,6\n')
+    run(movies, ".force_load Movie '{}'".format(csv_file))
+    assert len(movies.get_relation_by_name('Movie').tuples) == 16
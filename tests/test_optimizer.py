@@ -0,0 +1,46 @@
+import pytest
+
+from rashell.operators import CartesianProduct, Restrict, Scan, indexed_conjunct
+from rashell.optimizer import optimize
+
+
+def plan_of(engine, query):
+    return engine.compute_relational_algebra_expression(engine.instruction_mm.model_from_str(query).operation_type)
+
+
+def restricted_scans(operator):
+    # names of the relations scanned under a restriction of plan
+    names = set()
+    if isinstance(operator, Restrict) and isinstance(operator.child, Scan):
+        names.add(operator.child.relation.name)
+    for child in operator.children:
+        names |= restricted_scans(child)
+    return names
+
+
+@pytest.mark.parametrize('query', [
+    'σ Year > 1990 (σ DirectorID < Id (Movie X Director))',
+    'σ DirectorID < Id (σ Year > 1990 (Movie X Director))',
+    'σ DirectorID < Id AND Year > 1990 (Movie X Director)',
+    'σ Year > 1990 AND DirectorID < Id (Movie X Director)',
+])
+def test_restriction_goes_below_the_restrictions_it_cannot_pass(movies, query):
+    plan = plan_of(movies, query)
+    optimized_plan = optimize(plan)
+    assert restricted_scans(optimized_plan) == {'Movie'}
+    # the comparison of the two inputs stays over their product
+    assert isinstance(optimized_plan, Restrict) and isinstance(optimized_plan.child, CartesianProduct)
+    assert set(optimized_plan) == set(plan) and set(plan)
+
+
+@pytest.mark.parametrize('query', [
+    "σ Genre = 'Drama' AND Year > 1990 (Movie)",
+    "σ Year > 1990 AND Genre = 'Drama' (Movie)",
+    "σ Genre = 'Drama' (σ Year > 1990 (Movie))",
+])
+def test_conjuncts_use_the_sorted_index(movies, query):
+    expected_tuples = set(plan_of(movies, query))
+    movies.execute('.index Movie(Year)')
+    plan = optimize(plan_of(movies, query))
+    assert isinstance(plan, Restrict) and indexed_conjunct(plan).attribute_name == 'Year'
+    assert set(plan) == expected_tuples and expected_tuples
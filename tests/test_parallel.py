@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import run
+from rashell.exceptions import RestrictionValuesNotComparableException
+from rashell.parallel import ParallelCartesianProduct, ParallelJoin, ParallelRestrict
+
+QUERIES = [
+    ('Movie ⋈ Director | DirectorID = Id', ParallelJoin),
+    ('π Title, Name (σ Year > 1990 (Movie ⋈ Director | DirectorID = Id))', ParallelJoin),
+    ("σ Genre = 'Drama' OR Year < 1980 (Movie)", ParallelRestrict),
+    ('Movie X Director', ParallelCartesianProduct),
+    ('(Movie X Director) X Director', ParallelCartesianProduct),
+]
+
+
+def operator_types(operator):
+    types = {type(operator)}
+    for child in operator.children:
+        types |= operator_types(child)
+    return types
+
+
+def result_of(engine, query):
+    operation = engine.instruction_mm.model_from_str(query).operation_type
+    plan = engine.optimized_plan(engine.compute_relational_algebra_expression(operation))
+    return plan, set(plan)
+
+
+@pytest.mark.parametrize('query, parallel_type', QUERIES)
+def test_parallel_result_matches_the_serial_one(movies, query, parallel_type):
+    _, serial_tuples = result_of(movies, query)
+    run(movies, '.workers 2 threshold 0')
+    plan, parallel_tuples = result_of(movies, query)
+    assert parallel_type in operator_types(plan)
+    assert parallel_tuples == serial_tuples and serial_tuples
+
+
+def test_parallel_restriction_reports_incomparable_values(movies):
+    run(movies, '.workers 2 threshold 0')
+    with pytest.raises(RestrictionValuesNotComparableException):
+        run(movies, "T = σ Year > 'x' (Movie)")
@@ -0,0 +1,36 @@
+from conftest import run
+from rashell import operators
+
+
+def profiles_of(engine, command):
+    profiles = []
+    engine.add_profile_hook(profiles.append, operators=True, memory=True)
+    run(engine, command)
+    engine.remove_profile_hook(profiles.append)
+    return profiles
+
+
+def test_profile_hook_gets_the_operators(movies, capsys):
+    profile, = profiles_of(movies, 'π Name (σ Year > 1990 (Movie ⋈ Director | DirectorID = Id))')
+    assert profile.instruction == 'Operation' and profile.error is None
+    assert profile.peak_memory > 0
+    rows = {p.label: p.output_rows for p in profile.operators}
+    movie_tuples = movies.get_relation_by_name('Movie').tuples
+    assert rows['σ Year > 1990'] == len({t for t in movie_tuples if t[3] > 1990})
+    assert rows['π Name'] == len(capsys.readouterr().out.splitlines()) - 4
+    assert profile.operators[0].depth == 0 and profile.operators[0].label == 'π Name'
+
+
+def test_explain_shows_the_algorithms(movies, capsys, monkeypatch):
+    run(movies, 'EXPLAIN Movie ⋈ Director | DirectorID = Id')
+    assert 'hash join, build right' in capsys.readouterr().out
+    monkeypatch.setattr(operators, 'HASH_JOIN_LIMIT', 0)
+    run(movies, 'EXPLAIN Movie ⋈ Director | DirectorID = Id')
+    assert 'sort-merge join, inputs sorted' in capsys.readouterr().out
+    run(movies, '.index Movie(Year)')
+    run(movies, 'EXPLAIN ANALYZE σ Year > 1990 (Movie)')
+    assert '8 rows' in capsys.readouterr().out
+    profile, = profiles_of(movies, 'σ Year > 1990 (Movie)')
+    assert [p.algorithm for p in profile.operators] == ['sorted index on Year', 'scan']
+    # the tuples of the scan are not read, the index finds them
+    assert profile.operators[0].output_rows == 8 and profile.operators[1].output_rows is None
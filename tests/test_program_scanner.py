@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from textx import metamodel_from_file
+
+import rashell
+from rashell.exceptions import PrimaryKeyConstraintFailed
+from rashell.program_scanner import scan_insert
+from rashell.relational_engine import RelationalEngine
+from rashell.relational_model import Relation
+
+COMMANDS_GRAMMAR = os.path.join(os.path.dirname(rashell.__file__), 'grammar_files', 'rashell_commands_grammar.tx')
+
+
+@pytest.mark.parametrize('line_text', [
+    "Movie.insert(0120663, 'Eyes wide shut' , 'Drama' , 1999, 2)\n",
+    'Movie.force_insert(-1, "A \\"Space\\" Odyssey", \'It\\\'s\', 1.5e3, +2)',
+    "  R . insert ( .5 , 'a, b' )  \n",
+])
+def test_scanned_values_are_the_parsed_ones(line_text):
+    insert = metamodel_from_file(COMMANDS_GRAMMAR, classes=[Relation]).model_from_str(line_text).commands[0]
+    assert scan_insert(line_text) == (insert.relation_name, insert.insert_type, insert.values)
+
+
+@pytest.mark.parametrize('line_text', [
+    "Movie.insert(1, 'Lost Highway',\n",
+    "Movie.insert(1, Lost)\n",
+    "T = π Title (Movie)\n",
+])
+def test_other_lines_are_left_to_the_parser(line_text):
+    assert scan_insert(line_text) is None
+
+
+def test_program_keeps_the_order_and_the_lines_of_the_file(tmp_path):
+    program_file = tmp_path / 'program.ra'
+    program_file.write_text('\n'.join([
+        'R(_A, B)',
+        '',
+        "R.insert(1, 'a')",
+        "R.insert(2,",
+        "         'b')",
+        'T = π B (R)',
+        "R.insert(3, 'c')",
+        "R.insert(1, 'd')",
+    ]))
+    engine = RelationalEngine()
+    with pytest.raises(PrimaryKeyConstraintFailed, match='Line 8'):
+        engine.open_from_file(str(program_file))
+    # the assignment sees the inserts before it only
+    assert engine.get_relation_by_name('T').tuples == {('a',), ('b',)}
+    assert engine.get_relation_by_name('R').tuples == {(1, 'a'), (2, 'b'), (3, 'c')}
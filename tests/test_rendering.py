@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from conftest import run
+from rashell import operators, rendering
+
+
+def printed_rows(capsys):
+    return capsys.readouterr().out.splitlines()
+
+
+@pytest.mark.parametrize('output_mode, delimiter', [('csv', ','), ('tsv', '\t')])
+def test_delimited_output(movies, capsys, output_mode, delimiter):
+    run(movies, '.output {}'.format(output_mode))
+    run(movies, 'π Id, Name (Director)')
+    rows = printed_rows(capsys)
+    assert rows[0] == delimiter.join(['Id', 'Name'])
+    assert sorted(rows[1:]) == sorted(delimiter.join([str(t[0]), t[1]]) for t in
+                                      movies.get_relation_by_name('Director').tuples)
+
+
+def test_limit_and_offset(movies, capsys):
+    run(movies, '.output csv')
+    run(movies, '(Movie X Movie) X Movie LIMIT 5 OFFSET 2')
+    assert len(printed_rows(capsys)) == 6
+    # the .limit setting applies until a LIMIT clause replaces it or it is turned off
+    run(movies, '.limit 3')
+    run(movies, 'Movie')
+    assert len(printed_rows(capsys)) == 4
+    run(movies, 'Movie LIMIT 1')
+    assert len(printed_rows(capsys)) == 2
+    run(movies, '.limit off')
+    run(movies, 'Movie')
+    assert len(printed_rows(capsys)) == 15
+
+
+def test_limit_stops_the_computation(movies, capsys, monkeypatch):
+    scanned_tuples = []
+
+    def counted_iter(scan):
+        for t in scan.relation.tuples:
+            scanned_tuples.append(t)
+            yield t
+    monkeypatch.setattr(operators.Scan, '__iter__', counted_iter)
+    run(movies, '.output csv')
+    run(movies, '(Movie X Movie) X Movie LIMIT 1')
+    assert len(printed_rows(capsys)) == 2
+    limited_scans = len(scanned_tuples)
+    scanned_tuples.clear()
+    run(movies, '(Movie X Movie) X Movie')
+    assert len(printed_rows(capsys)) == 14 ** 3 + 1
+    # the product is not computed past the displayed tuple
+    assert limited_scans < len(scanned_tuples)
+
+
+def test_pager_stops_on_q(movies, monkeypatch):
+    pages = []
+    answers = iter(['', 'q'])
+    monkeypatch.setattr(rendering.shutil, 'get_terminal_size', lambda: os.terminal_size((80, rendering.PAGE_MARGIN + 3)))
+    monkeypatch.setattr(rendering, 'print_table', lambda attributes, page: pages.append(page))
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    run(movies, '.pager on')
+    run(movies, 'Movie')
+    assert [len(page) for page in pages] == [3, 3]
+    assert len(set().union(*pages)) == 6
@@ -0,0 +1,40 @@
+from conftest import run
+from rashell.result_cache import ResultCache, estimated_size
+
+
+def result_of(engine, query):
+    run(engine, 'T = {}'.format(query))
+    return engine.get_relation_by_name('T').tuples
+
+
+def test_cached_result_follows_the_changes(movies):
+    query = "π Title (σ Year > 1990 (Movie ⋈ Director | DirectorID = Id))"
+    result = result_of(movies, query)
+    assert result_of(movies, query) == result
+    assert movies.result_cache.hits == 1
+    run(movies, "Movie.insert(1, 'Vagabond', 'Drama', 1995, 4)")
+    assert result_of(movies, query) == result | {('Vagabond',)}
+    assert movies.result_cache.hits == 1
+    # the temporary relations do not share the cached tuples
+    movies.get_relation_by_name('T').tuples.clear()
+    assert result_of(movies, query) == result | {('Vagabond',)}
+    assert movies.result_cache.hits == 2
+
+
+def test_least_recently_used_results_are_evicted():
+    results = {key: {(i, key) for i in range(10)} for key in 'abc'}
+    result_cache = ResultCache(2 * estimated_size(results['a'], 2))
+    result_cache.put('a', results['a'], 2)
+    result_cache.put('b', results['b'], 2)
+    assert result_cache.get('a') == results['a']
+    result_cache.put('c', results['c'], 2)
+    assert result_cache.get('b') is None
+    assert result_cache.get('a') == results['a'] and result_cache.get('c') == results['c']
+    assert result_cache.size <= result_cache.memory_limit
+
+
+def test_cache_without_memory_keeps_nothing(movies):
+    run(movies, '.cache limit 0')
+    result_of(movies, 'π Name (Director)')
+    result_of(movies, 'π Name (Director)')
+    assert not movies.result_cache.results and not movies.result_cache.hits
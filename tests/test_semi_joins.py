@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import run
+from rashell.exceptions import DivisionRelationsHavingIncompatibleAttributes
+
+
+def tuples_of(engine, query):
+    run(engine, 'T = {}'.format(query))
+    return engine.get_relation_by_name('T').tuples
+
+
+@pytest.fixture
+def directed(movies):
+    # Agnes Varda has no movie in movies.ra
+    run(movies, "Director.insert(5, 'Agnes Varda', 'FR')")
+    return movies
+
+
+def test_semi_join_and_anti_join(directed):
+    directors = directed.get_relation_by_name('Director').tuples
+    director_ids = {t[4] for t in directed.get_relation_by_name('Movie').tuples}
+    with_movies = {t for t in directors if t[0] in director_ids}
+    assert tuples_of(directed, 'Director ⋉ Movie | Id = DirectorID') == with_movies
+    assert tuples_of(directed, 'Director ▷ Movie | Id = DirectorID') == directors - with_movies
+    assert tuples_of(directed, "Director ⋉ σ Year > 2000 (Movie) | Id = DirectorID") == {
+        t for t in directors if t[0] in {3, 4}}
+
+
+def test_restriction_of_a_semi_join(directed):
+    assert tuples_of(directed, "σ Nationality = 'US' (Director ▷ Movie | Id = DirectorID)") == set()
+    assert tuples_of(directed, "σ Nationality = 'FR' (Director ▷ Movie | Id = DirectorID)") == {
+        (5, 'Agnes Varda', 'FR')}
+
+
+def test_division(movies):
+    run(movies, "R(_Student, _Course)")
+    run(movies, "C(_Course)")
+    for student, course in [('ann', 'db'), ('ann', 'os'), ('bob', 'db'), ('cid', 'os'), ('cid', 'db'),
+                            ('cid', 'ai')]:
+        run(movies, "R.insert('{}', '{}')".format(student, course))
+    run(movies, "C.insert('db')")
+    run(movies, "C.insert('os')")
+    assert tuples_of(movies, 'R ÷ C') == {('ann',), ('cid',)}
+    genres = tuples_of(movies, 'π DirectorID, Genre (Movie) ÷ π Genre (σ Year > 1995 (Movie))')
+    movie_genres = {(t[4], t[2]) for t in movies.get_relation_by_name('Movie').tuples}
+    recent_genres = {t[2] for t in movies.get_relation_by_name('Movie').tuples if t[3] > 1995}
+    assert genres == {(d,) for d, _ in movie_genres if all((d, g) in movie_genres for g in recent_genres)}
+
+
+def test_division_needs_a_subset_of_the_attributes(movies):
+    with pytest.raises(DivisionRelationsHavingIncompatibleAttributes):
+        run(movies, 'T = π Genre (Movie) ÷ π Genre (Movie)')
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+from rashell.relational_engine import RelationalEngine
+from rashell.server import Server, ReadWriteLock
+
+
+def header_and_lines(server, text):
+    async def respond():
+        server.lock = ReadWriteLock()
+        return await server.respond(text, 'test')
+    lines = asyncio.run(respond()).splitlines()
+    return json.loads(lines[0]), lines[1:]
+
+
+def test_failure_of_a_command_is_answered():
+    engine = RelationalEngine()
+    for command in ['R(_A, C)', 'R.insert(1, 1)', "R.insert(2, 'x')"]:
+        engine.execute(command)
+    server = Server(engine, log=None)
+
+    # the values of C cannot be compared
+    header, _ = header_and_lines(server, 'σ C <= 1 (R)')
+    assert header == dict(header, status='error', message='Restriction C <= 1 compares numbers with strings')
+    assert header_and_lines(server, 'π A (R)')[0]['rows'] == 2
+
+
+def test_failure_of_the_engine_is_answered(monkeypatch):
+    engine = RelationalEngine()
+    engine.execute('R(_A, C)')
+    server = Server(engine, log=None)
+
+    def broken_plan(plan):
+        raise RuntimeError('broken')
+    monkeypatch.setattr(engine, 'optimized_plan', broken_plan)
+    header, _ = header_and_lines(server, 'π A (R)')
+    assert header['status'] == 'error' and header['message'] == 'RuntimeError: broken'
+    monkeypatch.undo()
+    assert header_and_lines(server, 'π A (R)')[0]['status'] == 'ok'
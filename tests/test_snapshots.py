@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from conftest import EXAMPLES_DIRECTORY
+from rashell.exceptions import PrimaryKeyConstraintFailed, SnapshotNotSavedException
+from rashell.relational_engine import RelationalEngine
+
+
+def test_save_in_a_missing_directory_fails(tmp_path):
+    engine = RelationalEngine()
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    file_name = os.path.join(str(tmp_path), 'missing', 'movies.snap')
+    with pytest.raises(SnapshotNotSavedException, match='missing'):
+        engine.execute(".save '{}'".format(file_name))
+    assert not os.path.exists(os.path.dirname(file_name))
+
+
+def test_opened_snapshot_holds_the_saved_relations(tmp_path):
+    engine = RelationalEngine()
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    file_name = os.path.join(str(tmp_path), 'movies.snap')
+    engine.execute(".save '{}'".format(file_name))
+
+    opened = RelationalEngine()
+    opened.execute(".open '{}'".format(file_name))
+    assert len(opened.relations) == len(engine.relations)
+    for relation in engine.relations:
+        assert opened.relations.get(relation.name).tuples == relation.tuples
+    # the keys of the deferred tuples are still checked
+    with pytest.raises(PrimaryKeyConstraintFailed):
+        opened.execute("Director.insert(1, 'Copy', 'US')")
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from conftest import EXAMPLES_DIRECTORY
+from rashell.exceptions import PrimaryKeyConstraintFailed
+from rashell.relational_engine import RelationalEngine
+
+
+@pytest.mark.parametrize('commands', [
+    # a tuple of the relation
+    ["Director.insert(1, 'Robert Zemeckis', 'US')"],
+    ["Director.force_insert(1, 'Robert Zemeckis', 'US')"],
+    # a tuple inserted twice
+    ["Director.insert(5, 'Jane Campion', 'NZ')", "Director.insert(5, 'Jane Campion', 'NZ')"],
+])
+def test_insert_of_an_existing_tuple_fails_as_outside_a_transaction(commands):
+    engine = RelationalEngine()
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    with pytest.raises(PrimaryKeyConstraintFailed):
+        for command in commands:
+            engine.execute(command)
+
+    engine = RelationalEngine()
+    engine.open_from_file(os.path.join(EXAMPLES_DIRECTORY, 'movies.ra'))
+    directors = set(engine.get_relation_by_name('Director').tuples)
+    engine.execute('BEGIN')
+    for command in commands:
+        engine.execute(command)
+    with pytest.raises(PrimaryKeyConstraintFailed):
+        engine.execute('COMMIT')
+    assert set(engine.get_relation_by_name('Director').tuples) == directors
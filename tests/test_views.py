@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import run
+
+VIEWS = [
+    "π Title, Name (Movie ⋈ Director | DirectorID = Id)",
+    "σ Year > 1990 AND Genre = 'Drama' (Movie)",
+    "π Nationality (Director) - π Nationality (σ Year < 1980 (Movie ⋈ Director | DirectorID = Id))",
+    "π Id (Director) ∩ π DirectorID (Movie)",
+    "π Name (Director) U π Title (Movie)",
+    "π Name, Genre (Director X Movie)",
+    "γ DirectorID; count(*), max(Year), avg(Year) (Movie)",
+    "Director ⋉ σ Year > 1980 (Movie) | Id = DirectorID",
+    "Director ▷ Movie | Id = DirectorID",
+    "π DirectorID, Genre (Movie) ÷ π Genre (σ DirectorID = 1 (Movie))",
+]
+
+CHANGES = [
+    "Director.insert(5, 'Agnes Varda', 'FR')",
+    "Movie.insert(1, 'Cleo from 5 to 7', 'Drama', 1962, 5)",
+    "Movie.insert(2, 'Vagabond', 'Drama', 1985, 5)",
+    "Movie.delete(Code = 109830)",
+    "Movie.delete(Year < 1980)",
+    "Movie.insert(3, 'Forrest Gump', 'Drama', 1994, 1)",
+    "Movie.delete(DirectorID = 5)",
+    "Director.delete(Id = 5)",
+]
+
+
+@pytest.mark.parametrize('view', VIEWS)
+def test_view_matches_its_recomputation(movies, view):
+    run(movies, 'V := {}'.format(view))
+    for change in CHANGES:
+        run(movies, change)
+        run(movies, 'W = {}'.format(view))
+        assert movies.get_relation_by_name('V').tuples == movies.get_relation_by_name('W').tuples, change
+
+
+def test_view_of_a_view_follows_the_changes(movies):
+    run(movies, 'Drama := σ Genre = \'Drama\' (Movie)')
+    run(movies, 'DramaDirectors := π Name (Drama ⋈ Director | DirectorID = Id)')
+    for change in CHANGES:
+        run(movies, change)
+        run(movies, "W = π Name (σ Genre = 'Drama' (Movie) ⋈ Director | DirectorID = Id)")
+        assert movies.get_relation_by_name('DramaDirectors').tuples == movies.get_relation_by_name('W').tuples